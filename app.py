@@ -2,23 +2,38 @@ import customtkinter as ctk
 import tkinter as tk
 from customtkinter import filedialog
 import random
-import sounddevice as sd
-import numpy as np
-from scipy.io.wavfile import write, read
 import threading
 import time
-import matplotlib.pyplot as plt
-from PIL import Image, ImageTk
 import os
-import json
-import queue
+from concurrent.futures import ThreadPoolExecutor
 
-from core import Clip
-from components import TrackFrame, TransportFrame, WaveformCanvas, MixerFrame, MixerChannelStrip, AccordionCategory
+from core import Clip, SAMPLE_RATE, CHANNELS
+from cache import clip_store
+from components import TransportFrame, MixerFrame, AccordionCategory, LoadProgressFrame, PerformancePanel, EffectChainWindow, NORMAL_BG_COLORS
 from views import ContentFrame, ArrangementFrame
-from settings import AudioSettingsWindow
+from settings import AudioSettingsWindow, prefetch_audio_devices
+from engine import ArrangementEngine, BLOCK_SIZE
+from project import read_project, write_project
+from peaks import build_peaks, get_peaks
+from recorder import StreamingRecorder, round_trip_latency_frames
+from prerender import PrerenderScheduler, array_source
+from metronome import Metronome
+from meters import MeterBank
+from mixer import MixerState
+from dsp import EffectChain, Delay, Equalizer, Compressor, ConvolutionReverb, LookaheadLimiter
+from freeze import freeze_cache
+from arrangement import Arrangement
+from tracks import Track
+from importer import import_audio, import_batch
+from perf import CallbackMonitor
+from audio_backend import get_backend
+from transport import TransportClock
+
+METER_REFRESH_MS = 33 # ~30 quadros por segundo
+PLAYHEAD_REFRESH_MS = 16 # playhead e relógio na taxa da tela
+LOAD_POLL_MS = 30
+TRACKS_PER_LOAD_TICK = 4 # trilhas criadas por passada do loop do Tk durante o carregamento
 
-SAMPLE_RATE = 44100; CHANNELS = 1
 
 class App(ctk.CTk):
     def __init__(self):
@@ -36,13 +51,16 @@ class App(ctk.CTk):
         self.grid_columnconfigure(2, weight=5) # Área Principal (5x maior que o browser)
 
         # --- Variáveis de Estado ---
-        self.tracks, self.track_count, self.output_filename_count = [], 0, 1; self.active_track = None 
-        self.is_recording, self.recording_frames, self.recording_thread = False, [], None
-        self.is_playing, self.playback_thread, self.metronome_thread = False, None, None
-        self.bpm = ctk.IntVar(value=120); self.is_metronome_on = ctk.BooleanVar(value=True); self._generate_metronome_clicks()
-        self.arrangement_data = []; self.arrangement_insert_beat = 0
-        self.current_view = 'session'; self.playback_start_time = 0; self.playhead_position_pixels = 0
-        self.metering_queue = queue.Queue()
+        self.tracks, self.track_count, self.output_filename_count = [], 0, 1; self.active_track = None; self.effects_windows = {}
+        self.is_recording, self.recorder = False, None
+        self.is_playing, self.playback_thread = False, None
+        self.bpm = ctk.IntVar(value=120); self.is_metronome_on = ctk.BooleanVar(value=True)
+        self.metronome = Metronome(self.bpm.get()); self.bpm.trace_add("write", self._on_bpm_changed); self.is_metronome_on.trace_add("write", self._on_metronome_toggled)
+        self.arrangement_data = Arrangement(self.bpm.get()); self.arrangement_insert_beat = 0; self.arrangement_engine = None
+        self.monitor_input = ctk.BooleanVar(value=False); self.monitor_input.trace_add("write", self._on_monitor_toggled); self.overdub = None
+        self.current_view = 'session'; self.transport = TransportClock(); self._shown_transport = None  # posição vem do relógio do stream, não do relógio de parede
+        self.meters = MeterBank(); self.mixer = MixerState(); self.perf = CallbackMonitor()
+        self._load_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4); self._load_generation = 0; self.is_loading = False
 
         # --- CRIAÇÃO DOS PAINÉIS PRINCIPAIS ---
         self.browser_frame = ctk.CTkFrame(self, corner_radius=0, fg_color="#2B2B2B")
@@ -81,7 +99,8 @@ class App(ctk.CTk):
         self.arrangement_view = ArrangementFrame(self.main_view_container, self)
         self.arrangement_view.place(relx=0, rely=0, relwidth=1, relheight=1)
         
-        self.setup_ui_controls(); self.show_session_view(); self._update_meters()
+        self.setup_ui_controls(); self.show_session_view(); self._update_meters(); self._update_transport_display()
+        self.after(500, prefetch_audio_devices) # aquece o PortAudio depois que a janela já apareceu
 
     def _on_vertical_drag(self, event):
         new_width = self.browser_frame.winfo_x() + event.x
@@ -99,8 +118,10 @@ class App(ctk.CTk):
         
         self.setup_browser()
         
-        transport_frame = TransportFrame(self.top_bar_frame, self)
-        transport_frame.pack(side="left", padx=10, pady=10)
+        self.transport_frame = TransportFrame(self.top_bar_frame, self)
+        self.transport_frame.pack(side="left", padx=10, pady=10)
+        self.performance_panel = PerformancePanel(self.top_bar_frame, self); self.performance_panel.pack(side="left", padx=10, pady=10)
+        self.load_progress = LoadProgressFrame(self.top_bar_frame)
         
         view_controls = ctk.CTkFrame(self.top_bar_frame, fg_color="transparent")
         view_controls.pack(side="right", padx=10, pady=10)
@@ -116,6 +137,9 @@ class App(ctk.CTk):
         delay_button = ctk.CTkButton(effects_category.content_frame, text="Delay", fg_color="#444444",
                                      command=lambda: self.apply_delay_to_track(self.active_track))
         delay_button.pack(padx=10, pady=2, anchor="w", fill="x")
+        for effect_class in (Equalizer, Compressor, ConvolutionReverb):
+            ctk.CTkButton(effects_category.content_frame, text=effect_class.label, fg_color="#444444",
+                          command=lambda cls=effect_class: self.insert_effect(self.active_track, cls)).pack(padx=10, pady=2, anchor="w", fill="x")
 
         samples_category = AccordionCategory(self.browser_frame, title="Samples")
         samples_category.pack(fill="x", padx=10, pady=5)
@@ -127,7 +151,7 @@ class App(ctk.CTk):
 
     def _create_menubar(self):
         menubar = tk.Menu(self)
-        file_menu = tk.Menu(menubar, tearoff=0); file_menu.add_command(label="Salvar Projeto", command=self.save_project); file_menu.add_command(label="Carregar Projeto", command=self.load_project); file_menu.add_separator(); file_menu.add_command(label="Sair", command=self.quit); menubar.add_cascade(label="Arquivo", menu=file_menu)
+        file_menu = tk.Menu(menubar, tearoff=0); file_menu.add_command(label="Salvar Projeto", command=self.save_project); file_menu.add_command(label="Carregar Projeto", command=self.load_project); file_menu.add_command(label="Importar Áudio...", command=self.import_audio_files); file_menu.add_separator(); file_menu.add_command(label="Sair", command=self.quit); menubar.add_cascade(label="Arquivo", menu=file_menu)
         settings_menu = tk.Menu(menubar, tearoff=0); settings_menu.add_command(label="Áudio...", command=self.open_audio_settings); menubar.add_cascade(label="Configurações", menu=settings_menu)
         self.config(menu=menubar)
         
@@ -138,192 +162,318 @@ class App(ctk.CTk):
     def show_session_view(self): self.current_view = 'session'; self.session_view.tkraise()
     def show_arrangement_view(self): self.current_view = 'arrangement'; self.arrangement_view.tkraise(); self.arrangement_view.redraw()
     def set_active_track(self, track_to_activate):
-        for track in self.tracks: track.set_normal_appearance()
-        if track_to_activate in self.tracks:
-            self.active_track = track_to_activate; self.active_track.set_selected_appearance()
+        if track_to_activate in self.tracks: self.active_track = track_to_activate; self.session_view.update_selection()
     def add_track(self):
-        track_name = f"Trilha {self.track_count + 1}"; new_track = self.session_view.add_new_track(track_name, self.track_count)
-        self.tracks.append(new_track); self.mixer_frame.add_channel_strip(new_track); self.set_active_track(new_track); self.track_count += 1
-        self.arrangement_view.redraw()
+        # Durante o carregamento os índices das trilhas pertencem ao projeto (o arranjo já usa esses números)
+        if self.is_loading: print("Aguarde o projeto terminar de carregar."); return
+        new_track = Track(f"Trilha {self.track_count + 1}", self.track_count, color=random.choice(NORMAL_BG_COLORS))
+        self._register_track(new_track); self._refresh_track_views(); self.set_active_track(new_track)
+    def _register_track(self, track):
+        # O modelo é a fonte do estado; o mixer recebe uma cópia a cada mudança, com ou sem widget na tela
+        self.tracks.append(track); self.track_count = len(self.tracks)
+        self.meters.resize(self.track_count); self.mixer.resize(self.track_count)
+        track.watch(self._sync_track_to_mixer); self._sync_track_to_mixer(track)
+        self.mixer.inserts[track.track_index] = None if track.is_frozen else track.effect_chain
+    def _sync_track_to_mixer(self, track):
+        index = track.track_index
+        self.mixer.set_volume(index, track.volume); self.mixer.set_muted(index, track.is_muted); self.mixer.set_soloed(index, track.is_soloed)
+    def _refresh_track_views(self):
+        self.session_view.refresh(); self.mixer_frame.refresh(); self.arrangement_view.redraw()
     def toggle_solo_for_track(self, track_index):
         target_track = self.tracks[track_index]
-        new_solo_state = not target_track.is_soloed.get()
-        if new_solo_state:
-            for i, track in enumerate(self.tracks): track.is_soloed.set(i == track_index)
-        else: target_track.is_soloed.set(False)
+        if not target_track.is_soloed:
+            for i, track in enumerate(self.tracks): track.set_soloed(i == track_index)
+        else: target_track.set_soloed(False)
     def _update_meters(self):
-        while not self.metering_queue.empty():
-            try:
-                track_index, level = self.metering_queue.get_nowait()
-                if track_index in self.mixer_frame.channel_strips: self.mixer_frame.channel_strips[track_index].set_meter_level(level)
-            except queue.Empty: continue
-        self.after(50, self._update_meters)
+        # Lê o estado compartilhado na taxa de quadros, no ponto do transporte que está soando; cada faixa só repinta se o valor mudou
+        values = self.meters.snapshot(self.transport.position())
+        for track_index, strip in self.mixer_frame.channel_strips.items():
+            if track_index < len(values) - 1: strip.set_meter_values(values[track_index])
+        self.mixer_frame.master_strip.set_meter_values(values[-1])
+        self.performance_panel.update_stats(self.perf.stats())
+        self.after(METER_REFRESH_MS, self._update_meters)
     def on_playback_finished(self):
-        self.is_playing = False; self.playhead_position_pixels = 0
-        for strip in self.mixer_frame.channel_strips.values(): strip.set_meter_level(0)
-    def _record_worker(self):
-        with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype='float32') as stream:
-            while self.is_recording: frames, overflowed = stream.read(SAMPLE_RATE // 10); self.recording_frames.append(frames)
+        self.is_playing = False; self.transport.stop()
+        self.meters.reset()
+    def _finish_recording(self, track, clip):
+        # A forma de onda é calculada fora da thread da interface e exibida quando fica pronta
+        if self._generate_waveform_peaks(clip.audio_file_path): self.after(0, track.add_clip, clip)
     def _playback_worker_with_metering(self, tracks_to_play):
         playhead_pos_samples = 0; active_streams = []; max_len = 0
         for track in tracks_to_play:
             clip = track.get_active_clip()
             if not clip: continue
-            audio_data = clip.get_trimmed_data()
-            if audio_data.size > 0:
-                audio_data_float = (audio_data.astype(np.float32) / np.iinfo(np.int16).max) * track.volume.get()
-                active_streams.append({"data": audio_data_float, "pos": 0, "track_index": track.track_index})
+            audio_data_float = self._frozen_source(clip, track.track_index)
+            if audio_data_float is None: audio_data_float = clip.get_trimmed_float()  # fatia sem cópia do cache compartilhado
+            if audio_data_float.size > 0 and track.track_index < self.mixer.num_tracks:
+                active_streams.append((track.track_index, audio_data_float))
                 if len(audio_data_float) > max_len: max_len = len(audio_data_float)
-        block_size = 1024
+        self.mixer.prepare_playback(); limiter = LookaheadLimiter(); tail_samples = self.mixer.tail_samples() + limiter.tail_samples()
+        # Fatias dos clips e inserts são renderizadas adiantadas pelas threads de trabalho; o callback só soma
+        scheduler = self._start_prerender([(track_index, array_source(data)) for track_index, data in active_streams])
         def callback(outdata, frames, time, status):
             nonlocal playhead_pos_samples
-            if status: print(status)
-            outdata.fill(0); chunk = np.zeros((frames, CHANNELS), dtype=np.float32)
-            for stream in active_streams:
-                remaining = len(stream["data"]) - stream["pos"]
-                if remaining > 0:
-                    samples_to_process = min(frames, remaining)
-                    audio_chunk = stream["data"][stream["pos"] : stream["pos"] + samples_to_process]
-                    chunk[:samples_to_process, 0] += audio_chunk
-                    level = np.max(np.abs(audio_chunk)) if audio_chunk.size > 0 else 0.0
-                    self.metering_queue.put((stream["track_index"], level)); stream["pos"] += samples_to_process
-                else: self.metering_queue.put((stream["track_index"], 0.0))
-            outdata[:] = chunk; playhead_pos_samples += frames
+            self.transport.publish(playhead_pos_samples, time, frames)
+            # Volume, mute e solo são lidos do mixer a cada bloco, então mexer no fader tem efeito na hora
+            self.mixer.mix(scheduler.read(playhead_pos_samples, frames), outdata, self.meters, apply_inserts=False, position=playhead_pos_samples)
+            outdata[:] = limiter.process(outdata); playhead_pos_samples += frames
         try:
-            with sd.OutputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, callback=callback, blocksize=block_size, dtype='float32', finished_callback=self.on_playback_finished):
-                while self.is_playing and playhead_pos_samples < max_len: time.sleep(0.1)
+            stream = get_backend().open_output(self.perf.instrument(callback), SAMPLE_RATE, CHANNELS, BLOCK_SIZE, finished_callback=self.on_playback_finished)
+            self.transport.start(stream, delay_samples=limiter.latency_samples())
+            with stream:
+                while self.is_playing and playhead_pos_samples < max_len + tail_samples: time.sleep(0.1)
         except Exception as e: print(f"Erro no stream de áudio: {e}")
-        finally: self.on_playback_finished()
-    def _play_arrangement_worker(self, final_mix):
-        try: sd.play(final_mix, SAMPLE_RATE); sd.wait()
-        finally: self.is_playing = False
-    def _metronome_worker(self):
-        beat_count = 0
-        while self.is_playing or self.is_recording:
-            try:
-                current_bpm = self.bpm.get();
-                if current_bpm <= 0: time.sleep(0.1); continue
-                if beat_count % 4 == 0: sd.play(self.click_strong, SAMPLE_RATE)
-                else: sd.play(self.click_weak, SAMPLE_RATE)
-                beat_count += 1; interval = 60.0 / current_bpm; time.sleep(interval)
-            except: break
-    def _update_playhead(self):
-        if not self.is_playing or self.current_view != 'arrangement': return
-        elapsed_time = time.time() - self.playback_start_time; beats_per_second = self.bpm.get() / 60.0
-        pixels_per_second = beats_per_second * self.arrangement_view.pixels_per_beat
-        self.playhead_position_pixels = elapsed_time * pixels_per_second
-        self.arrangement_view.move_playhead(self.playhead_position_pixels); self.after(30, self._update_playhead)
-    def _generate_metronome_clicks(self): t_strong = np.linspace(0., 0.05, int(SAMPLE_RATE * 0.05), endpoint=False); self.click_strong = 0.5 * np.sin(2. * np.pi * 1200 * t_strong); t_weak = np.linspace(0., 0.05, int(SAMPLE_RATE * 0.05), endpoint=False); self.click_weak = 0.5 * np.sin(2. * np.pi * 880 * t_weak)
-    def _generate_waveform_image(self, wav_path, image_path):
-        try: samplerate, data = read(wav_path); fig, ax = plt.subplots(figsize=(8, 1.5)); ax.plot(data, color='cyan'); ax.axis('off'); fig.patch.set_facecolor('#343638'); plt.savefig(image_path, bbox_inches='tight', pad_inches=0, dpi=100); plt.close(fig); return True
-        except: return False
-    def apply_delay_to_track(self, track):
-        if not track: print("Nenhuma trilha selecionada para aplicar o efeito."); return
-        clip = track.get_active_clip()
-        if not clip or not os.path.exists(clip.audio_file_path): print(f"A trilha '{track.track_name}' não tem clip de áudio para aplicar efeito."); return
-        samplerate, audio_data_int = read(clip.audio_file_path); original_dtype = audio_data_int.dtype
-        dtype_info = np.iinfo(original_dtype); audio_data_float = audio_data_int.astype(np.float32) / dtype_info.max
-        delay_seconds = 0.5; decay = 0.6; delay_samples = int(delay_seconds * samplerate)
-        output_data_float = np.zeros(len(audio_data_float) + delay_samples, dtype=np.float32)
-        output_data_float[:len(audio_data_float)] = audio_data_float; output_data_float[delay_samples:] += audio_data_float * decay
-        peak = np.max(np.abs(output_data_float));
-        if peak > 1.0: output_data_float /= peak
-        final_audio_int16 = (output_data_float * dtype_info.max).astype(original_dtype)
-        base, ext = os.path.splitext(clip.audio_file_path);
-        if not base.endswith('_delay'): base = f"{base}_delay"
-        new_audio_path = f"{base}{ext}"; write(new_audio_path, samplerate, final_audio_int16)
-        new_clip = Clip(new_audio_path); track.clips[0] = new_clip
-        if self._generate_waveform_image(new_clip.audio_file_path, new_clip.waveform_image_path): track.display_waveform(new_clip.waveform_image_path)
+        finally: scheduler.stop(); self.on_playback_finished()
+    def _start_prerender(self, sources, start=0):
+        # Backend sem relógio real (simulado/offline): o callback espera cada bloco em vez de tocar silêncio
+        scheduler = PrerenderScheduler(self.mixer, blocking=not get_backend().realtime)
+        for track_index, source in sources: scheduler.add_track(track_index, source, start)
+        scheduler.start()  # espera os buffers encherem antes de abrir o stream
+        return scheduler
+    def _play_arrangement_worker(self, metronome, bpm):
+        # O motor é montado aqui e não na thread do Tk: renders congeladas que faltam (trim mudou) podem levar segundos
+        try: engine = self._build_engine(metronome, bpm)
+        except Exception as e: print(f"Erro ao preparar o arranjo: {e}"); self.is_playing = False; return
+        if engine.total_samples == 0 or not self.is_playing: self.is_playing = False; return  # vazio, ou stop durante a preparação
+        self.mixer.prepare_playback(); self.arrangement_engine = engine
+        engine.prerender = self._start_prerender([(index, engine.track_source(index)) for index in engine.track_indices()], engine.position)
+        try:
+            stream = get_backend().open_output(self.perf.instrument(engine.callback), SAMPLE_RATE, CHANNELS, BLOCK_SIZE)
+            engine.transport = self.transport; self.transport.start(stream, delay_samples=engine.output_latency_samples())
+            with stream:
+                while self.is_playing and not engine.finished: time.sleep(0.05)
+        except Exception as e: print(f"Erro no stream de áudio: {e}")
+        finally: engine.prerender.stop(); self.transport.stop(); self.is_playing = False; self.arrangement_engine = None; self.meters.reset()
+    def _on_bpm_changed(self, *args):
+        try: bpm = self.bpm.get()
+        except (tk.TclError, ValueError): return  # campo de BPM vazio ou sendo editado
+        self.metronome.set_bpm(bpm); self.arrangement_data.set_bpm(bpm)
+        if self.current_view == 'arrangement': self.arrangement_view.redraw()
+    def _on_metronome_toggled(self, *args): self.metronome.enabled = self.is_metronome_on.get()
+    def _on_monitor_toggled(self, *args):
+        # Liga/desliga o retorno da entrada durante o overdub sem reabrir o stream
+        if self.overdub: self.overdub["engine"].monitor_track = self.overdub["track"].track_index if self.monitor_input.get() else None
+    def _prepare_metronome(self):
+        # O metrônomo é só mais uma fonte no callback: posiciona a grade no início do transporte
+        self.metronome.enabled = self.is_metronome_on.get(); self.metronome.prepare(); self.metronome.reset(0)
+        return self.metronome
+    def _update_transport_display(self):
+        # Uma leitura do relógio do transporte por quadro alimenta o relógio da barra e o playhead do arranjo
+        position = self.transport.position(); key = (position, self.current_view)
+        if key != self._shown_transport:
+            self._shown_transport = key
+            self.transport_frame.set_time(position / SAMPLE_RATE if position is not None else 0.0)
+            if self.current_view == 'arrangement':
+                # Só o arranjo tem posição na linha do tempo; sessão e gravação avulsa deixam o playhead no início
+                playing_arrangement = position is not None and self.arrangement_engine is not None
+                self.arrangement_view.move_playhead(self.arrangement_view.samples_to_pixels(position) if playing_arrangement else 0, follow=playing_arrangement)
+        self.after(PLAYHEAD_REFRESH_MS, self._update_transport_display)
+    def _generate_waveform_peaks(self, wav_path):
+        try: return build_peaks(wav_path) is not None
+        except Exception as e: print(f"Erro ao gerar a forma de onda: {e}"); return False
+    def insert_effect(self, track, effect_class):
+        # O efeito entra na cadeia de inserts da trilha e é processado ao vivo no callback
+        if not track: print("Nenhuma trilha selecionada para aplicar o efeito."); return None
+        effect = effect_class(); track.effect_chain.add(effect); self.open_effects_window(track)
+        return effect
+    def open_effects_window(self, track):
+        window = self.effects_windows.get(track)
+        if window is not None and window.winfo_exists(): window.refresh()
+        else: window = self.effects_windows[track] = EffectChainWindow(self, track)
+        window.focus()
+    def apply_delay_to_track(self, track): return self.insert_effect(track, Delay)
+    def toggle_freeze(self, track):
+        if self.is_playing or self.is_recording: print("Pare a reprodução antes de congelar/descongelar uma trilha."); return
+        if track.is_frozen:
+            track.set_frozen(None); self.mixer.inserts[track.track_index] = track.effect_chain
+            return
+        effects = track.effect_chain.to_list(); track.set_freezing()
+        clips = [track.get_active_clip()] + [item["clip"] for item in self.arrangement_data.items_on_track(track.track_index)]
+        threading.Thread(target=self._freeze_worker, args=(track, [c for c in clips if c], effects), daemon=True).start()
+    def _freeze_worker(self, track, clips, effects):
+        # Renderiza (ou acha no cache) cada clip da trilha; depois disso a trilha toca sem processar efeitos
+        try:
+            for clip in clips: freeze_cache.freeze(clip, effects)
+        except Exception as e: print(f"Erro ao congelar a trilha: {e}"); self.after(0, track.set_frozen, None); return
+        self.after(0, self._on_track_frozen, track, effects)
+    def _on_track_frozen(self, track, effects):
+        if track not in self.tracks: return  # projeto trocado enquanto congelava
+        track.set_frozen(effects); self.mixer.inserts[track.track_index] = None
+    def _frozen_source(self, clip, track_index):
+        # Render congelada do clip, ou None se a trilha toca ao vivo; renders que faltam (trim mudou) são feitas aqui,
+        # então só é chamada fora da thread do Tk (montagem do motor e worker da sessão)
+        effects = self.tracks[track_index].frozen_effects if track_index < len(self.tracks) else None
+        if effects is None: return None
+        return freeze_cache.freeze(clip, effects)
     def save_project(self):
         filepath = filedialog.asksaveasfilename(defaultextension=".dawpe", filetypes=[("Projetos DAW Pernambucana", "*.dawpe")]);
         if not filepath: return
-        project_data = {"bpm": self.bpm.get(), "tracks": [{"name": t.track_name, "volume": t.volume.get(), "is_muted": t.is_muted.get(), "is_soloed": t.is_soloed.get(), "clips": [c.to_dict() for c in t.clips]} for t in self.tracks], "arrangement": [{"clip": item["clip"].to_dict(), "track_index": item["track_index"], "start_beat": item["start_beat"]} for item in self.arrangement_data]}
-        with open(filepath, 'w') as f: json.dump(project_data, f, indent=4)
+        write_project(filepath, self.bpm.get(), [track.to_dict() for track in self.tracks], self.arrangement_data)
         print(f"Projeto salvo em: {filepath}")
     def load_project(self):
         filepath = filedialog.askopenfilename(filetypes=[("Projetos DAW Pernambucana", "*.dawpe")]);
         if not filepath: return
-        for strip in self.mixer_frame.channel_strips.values(): strip.destroy()
-        for track in self.tracks: track.destroy()
-        self.tracks, self.track_count, self.active_track = [], 0, None;
-        with open(filepath, 'r') as f: project_data = json.load(f)
-        self.bpm.set(project_data.get("bpm", 120))
-        for i, track_data in enumerate(project_data.get("tracks", [])):
-            new_track = self.session_view.add_new_track(track_data["name"], i)
-            new_track.volume.set(track_data.get("volume", 0.8)); new_track.is_muted.set(track_data.get("is_muted", False)); new_track.is_soloed.set(track_data.get("is_soloed", False))
-            for clip_data in track_data.get("clips", []):
-                new_clip = Clip.from_dict(clip_data); new_track.add_clip(new_clip)
-            self.tracks.append(new_track)
-            self.mixer_frame.add_channel_strip(new_track)
-        self.track_count = len(self.tracks)
-        self.arrangement_data = []
-        for item_data in project_data.get("arrangement", []):
-            clip_obj = Clip.from_dict(item_data["clip"]); self.arrangement_data.append({"clip": clip_obj, "track_index": item_data["track_index"], "start_beat": item_data["start_beat"]})
-        self.arrangement_view.redraw()
+        if self.is_playing or self.is_recording: self.stop_music()
+        for window in self.effects_windows.values():
+            if window.winfo_exists(): window.destroy()
+        self.tracks, self.track_count, self.active_track, self.effects_windows = [], 0, None, {}
+        self.meters.resize(0); self.mixer.resize(0)
+        self.arrangement_data = Arrangement(self.bpm.get()); self._refresh_track_views()
+        clip_store.invalidate()  # fecha os mapas do projeto anterior
+        # Uma nova carga invalida os resultados que ainda chegarem da anterior
+        self._load_generation += 1; generation = self._load_generation
+        self._set_loading(True); self.load_progress.pack(side="left", padx=10); self.load_progress.set_progress("Lendo projeto", 0, 1)
+        self._poll_project_load(generation, filepath, self._load_pool.submit(read_project, filepath))
+    def _poll_project_load(self, generation, filepath, future):
+        if generation != self._load_generation: return
+        if not future.done(): self.after(LOAD_POLL_MS, self._poll_project_load, generation, filepath, future); return
+        try: project_data = future.result()
+        except Exception as e: print(f"Erro ao carregar o projeto: {e}"); self._set_loading(False); return
+        self.bpm.set(project_data["bpm"])
+        # O arranjo entra já; o motor ignora as trilhas que ainda não existem no mixer
+        self.arrangement_data = Arrangement(self.bpm.get()); self.arrangement_data.extend(project_data["arrangement"])
+        jobs = [self._load_pool.submit(self._prepare_track_media, index, track_data, project_data["arrangement"]) for index, track_data in enumerate(project_data["tracks"])]
+        self._add_loaded_tracks(generation, filepath, project_data["tracks"], jobs, 0)
+    def _prepare_track_media(self, track_index, track_data, arrangement):
+        # Roda no pool: picos da forma de onda, PCM float no cache e renders congeladas, tudo fora da thread do Tk.
+        # Os Clips são compartilhados com a interface, então só devolve (clip, caminho convertido) para a thread do Tk aplicar
+        clips = track_data["clips"] + [item["clip"] for item in arrangement if item["track_index"] == track_index]; converted = []
+        for clip in clips:
+            if not os.path.exists(clip.audio_file_path): continue
+            converted_path = import_audio(clip.audio_file_path)  # arquivos fora do formato do projeto passam a usar a versão convertida
+            if converted_path != clip.audio_file_path:
+                converted.append((clip, converted_path)); clip = Clip.from_dict(dict(clip.to_dict(), audio_file_path=converted_path))  # cópia privada para aquecer os caches
+            get_peaks(clip.audio_file_path); clip.get_trimmed_float()
+            if track_data["frozen"]: freeze_cache.freeze(clip, track_data["effects"])
+        return converted
+    def _add_loaded_tracks(self, generation, filepath, tracks_data, jobs, loaded):
+        # Cria as trilhas na ordem, algumas por vez, assim que a mídia de cada uma fica pronta; as listas só desenham as visíveis.
+        # `loaded` conta as trilhas desta carga; cada uma fica no índice que tem no projeto (Adicionar Trilha está bloqueado até o fim)
+        if generation != self._load_generation: return
+        created = 0
+        while loaded < len(tracks_data) and created < TRACKS_PER_LOAD_TICK and jobs[loaded].done():
+            index = loaded; track_data = tracks_data[index]; loaded += 1
+            try:
+                for clip, converted_path in jobs[index].result(): clip.set_audio_file(converted_path)
+            except Exception as e: print(f"Erro ao preparar a mídia da trilha {track_data['name']}: {e}")
+            new_track = Track(track_data["name"], index, track_data["volume"], track_data["is_muted"], track_data["is_soloed"], color=random.choice(NORMAL_BG_COLORS))
+            new_track.effect_chain = EffectChain.from_list(track_data["effects"]); new_track.clips = list(track_data["clips"][-1:])
+            if track_data["frozen"]: new_track.frozen_effects = track_data["effects"]  # a render já está no cache
+            self._register_track(new_track)
+            created += 1
+        if created: self.arrangement_data.invalidate(); self._refresh_track_views()  # durações mudam se algum clip foi convertido
+        self.load_progress.set_progress("Carregando trilhas", loaded, len(tracks_data))
+        if loaded < len(tracks_data): self.after(LOAD_POLL_MS, self._add_loaded_tracks, generation, filepath, tracks_data, jobs, loaded); return
+        self._set_loading(False)
         print(f"Projeto '{filepath}' carregado.")
+    def _set_loading(self, loading):
+        # Adicionar trilhas fica bloqueado até todas as trilhas do projeto ocuparem os seus índices
+        self.is_loading = loading; self.add_track_button.configure(state="disabled" if loading else "normal")
+        if not loading: self.load_progress.pack_forget()
+    def import_audio_files(self):
+        paths = filedialog.askopenfilenames(filetypes=[("Áudio WAV", "*.wav")])
+        if not paths: return
+        threading.Thread(target=self._import_worker, args=(list(paths),), daemon=True).start()
+    def _import_worker(self, paths):
+        # Conversão em paralelo fora da interface; cada arquivo importado vira uma trilha nova
+        imported = [path for path in import_batch(paths) if path]
+        for path in imported: self._generate_waveform_peaks(path)
+        self.after(0, self._add_imported_clips, imported)
+    def _add_imported_clips(self, paths):
+        if self.is_loading: self.after(LOAD_POLL_MS, self._add_imported_clips, paths); return  # entram depois do projeto
+        for path in paths:
+            self.add_track(); self.tracks[-1].add_clip(Clip(path))
+        if paths: print(f"{len(paths)} arquivo(s) importado(s).")
+    def dump_callback_trace(self):
+        # Salva o histograma e os últimos callbacks (tempo, frames, xruns) para análise fora do app
+        filepath = filedialog.asksaveasfilename(defaultextension=".json", initialfile="callback_trace.json", filetypes=[("JSON", "*.json")])
+        if not filepath: return
+        try: count = self.perf.dump_trace(filepath); print(f"Rastro de {count} callbacks salvo em: {filepath}")
+        except OSError as e: print(f"Erro ao salvar o rastro: {e}")
     def add_clip_to_arrangement(self, clip, track_index):
-        arrangement_item = {"clip": clip, "track_index": track_index, "start_beat": self.arrangement_insert_beat}
-        self.arrangement_data.append(arrangement_item);
+        self.arrangement_data.add(clip, track_index, self.arrangement_insert_beat)
         clip_duration_beats = (clip.duration_seconds * self.bpm.get()) / 60.0; self.arrangement_insert_beat += clip_duration_beats; self.arrangement_view.redraw()
     def play_music(self):
         if self.is_playing or self.is_recording: return
         if self.current_view == 'arrangement': self._play_arrangement()
         else: self._play_session()
     def stop_music(self):
-        if self.is_recording:
+        if self.is_recording and self.overdub: self._stop_overdub()
+        elif self.is_recording:
             self.is_recording = False
-            if self.recording_thread: self.recording_thread.join()
-            audio_data_float = np.concatenate(self.recording_frames, axis=0); audio_data_int16 = (audio_data_float * np.iinfo(np.int16).max).astype(np.int16)
-            wav_filename = f"gravacao_{self.output_filename_count}.wav"; self.output_filename_count += 1
-            write(wav_filename, SAMPLE_RATE, audio_data_int16)
+            wav_filename = self.recorder.stop(); self.recorder = None  # só drena o buffer circular; o WAV já está no disco
             if self.active_track:
-                new_clip = Clip(wav_filename)
-                if self._generate_waveform_image(new_clip.audio_file_path, new_clip.waveform_image_path): self.active_track.add_clip(new_clip)
+                new_clip = Clip(wav_filename); self.active_track.clips = [new_clip]  # já pode ser tocado
+                threading.Thread(target=self._finish_recording, args=(self.active_track, new_clip), daemon=True).start()
         elif self.is_playing:
-            self.is_playing = False; sd.stop()
-            self.playhead_position_pixels = 0
-            if hasattr(self, 'arrangement_view'): self.arrangement_view.move_playhead(0)
+            engine = self.arrangement_engine
+            if engine: engine.stop()
+            self.is_playing = False
     def record_audio(self):
-        if self.current_view != 'session': print("Mude para a Visão de Sessão para poder gravar."); return
         if self.is_recording or self.is_playing: return
         if not self.active_track: print("Nenhuma trilha selecionada!"); return
-        if self.is_metronome_on.get(): self.metronome_thread = threading.Thread(target=self._metronome_worker); self.metronome_thread.start()
-        self.is_recording = True; self.recording_frames = []; self.recording_thread = threading.Thread(target=self._record_worker); self.recording_thread.start()
+        if self.current_view == 'arrangement': self._start_overdub(); return
+        wav_filename = f"gravacao_{self.output_filename_count}.wav"; self.output_filename_count += 1
+        monitor = self._prepare_metronome().render if self.is_metronome_on.get() else None
+        self.perf.reset(); self.recorder = StreamingRecorder(wav_filename, monitor=monitor, instrument=self.perf.instrument, transport=self.transport)
+        try: self.recorder.start()
+        except Exception as e: print(f"Erro ao abrir a entrada de áudio: {e}"); self.recorder.stop(); self.recorder = None; return
+        self.is_recording = True
+    def _build_engine(self, metronome, bpm):
+        # Fora da thread do Tk: pode esperar o hash/render das trilhas congeladas (ver _frozen_source)
+        return ArrangementEngine(self.arrangement_data, self.mixer, bpm, metronome=metronome, meters=self.meters, frozen_source=self._frozen_source)
+    def _start_overdub(self):
+        # Overdub: o arranjo toca e a entrada é gravada no mesmo stream duplex, então o take e os clips
+        # compartilham o relógio de amostras; só falta descontar a latência de ida e volta do dispositivo.
+        # O motor é montado numa thread; o stream abre depois, de volta na thread do Tk
+        self.is_playing = True
+        threading.Thread(target=self._prepare_overdub, args=(self.active_track, self._prepare_metronome(), self.bpm.get()), daemon=True).start()
+    def _prepare_overdub(self, track, metronome, bpm):
+        try: engine = self._build_engine(metronome, bpm)
+        except Exception as e: print(f"Erro ao preparar o arranjo: {e}"); self.is_playing = False; return
+        self.after(0, self._open_overdub, track, engine)
+    def _open_overdub(self, track, engine):
+        if not self.is_playing: return  # stop durante a preparação
+        wav_filename = f"gravacao_{self.output_filename_count}.wav"; self.output_filename_count += 1
+        engine.stop_at_end = False  # continua gravando depois do último clip até o stop
+        recorder = StreamingRecorder(wav_filename); engine.input_sink = recorder.callback; engine.transport = self.transport
+        engine.monitor_track = track.track_index if self.monitor_input.get() else None
+        self.mixer.prepare_playback(); self.perf.reset()
+        try:
+            stream = get_backend().open_duplex(self.perf.instrument(engine.duplex_callback), SAMPLE_RATE, CHANNELS, BLOCK_SIZE)
+            # O take começa no que foi tocado junto com a amostra 0: latência do dispositivo + atraso do limitador do master
+            recorder.skip_frames = round_trip_latency_frames(stream) + engine.output_latency_samples()
+            self.transport.start(stream, "duplex", engine.output_latency_samples())  # o playhead mostra o que está soando
+            recorder.start(open_stream=False); stream.start()
+        except Exception as e:
+            print(f"Erro ao abrir o stream duplex: {e}"); self.transport.stop(); recorder.stop(); self.is_playing = False; return
+        self.recorder = recorder; self.arrangement_engine = engine
+        self.overdub = {"stream": stream, "engine": engine, "track": track, "start_sample": engine.position}
+        self.is_recording = True
+    def _stop_overdub(self):
+        overdub = self.overdub; self.overdub = None
+        try: overdub["stream"].stop(); overdub["stream"].close()
+        except Exception as e: print(f"Erro ao fechar o stream duplex: {e}")
+        overdub["engine"].stop(); self.transport.stop()
+        wav_filename = self.recorder.stop(); self.recorder = None
+        self.is_recording = False; self.is_playing = False; self.arrangement_engine = None; self.meters.reset()
+        samples_per_beat = self.arrangement_data.samples_per_beat; start_beat = overdub["start_sample"] / samples_per_beat if samples_per_beat else 0
+        threading.Thread(target=self._finish_overdub, args=(overdub["track"], Clip(wav_filename), start_beat), daemon=True).start()
+    def _finish_overdub(self, track, clip, start_beat):
+        if clip.duration_samples == 0: return
+        self._generate_waveform_peaks(clip.audio_file_path); self.after(0, self._place_overdub_take, track, clip, start_beat)
+    def _place_overdub_take(self, track, clip, start_beat):
+        # O take entra no arranjo no ponto em que a gravação começou; a latência já foi descontada no WAV
+        track.add_clip(clip); self.arrangement_data.add(clip, track.track_index, start_beat)
+        if self.current_view == 'arrangement': self.arrangement_view.redraw()
     def _play_session(self):
-        tracks_to_play = []; has_solo = any(t.is_soloed.get() for t in self.tracks)
-        for track in self.tracks:
-            clip = track.get_active_clip()
-            if not clip: continue
-            if has_solo:
-                if track.is_soloed.get(): tracks_to_play.append(track)
-            elif not track.is_muted.get(): tracks_to_play.append(track)
+        # Todas as trilhas com clip entram no stream; mute/solo são aplicados ao vivo pelo mixer
+        tracks_to_play = [track for track in self.tracks if track.get_active_clip()]
         if not tracks_to_play: return
-        self.is_playing = True
+        self.is_playing = True; self.perf.reset()
         self.playback_thread = threading.Thread(target=self._playback_worker_with_metering, args=(tracks_to_play,)); self.playback_thread.start()
     def _play_arrangement(self):
         if not self.arrangement_data: print("Arranjo está vazio."); return
-        bpm = self.bpm.get(); samples_per_beat = int(SAMPLE_RATE * 60.0 / bpm)
-        total_duration_beats = 0
-        for item in self.arrangement_data:
-            clip = item["clip"]; trimmed_duration_seconds = clip.duration_seconds * (clip.trim_end_ratio - clip.trim_start_ratio)
-            clip_duration_beats = (trimmed_duration_seconds * bpm) / 60.0; end_beat = item["start_beat"] + clip_duration_beats
-            if end_beat > total_duration_beats: total_duration_beats = end_beat
-        total_samples = int(total_duration_beats * samples_per_beat)
-        if total_samples == 0: return
-        mixer_buffer = np.zeros(total_samples, dtype=np.float32)
-        for item in self.arrangement_data:
-            clip, track_index, start_beat = item["clip"], item["track_index"], item["start_beat"]
-            if track_index >= len(self.tracks): continue
-            track = self.tracks[track_index]; audio_data = clip.get_trimmed_data()
-            if audio_data.size == 0: continue
-            audio_data_float = (audio_data.astype(np.float32) / np.iinfo(np.int16).max) * track.volume.get()
-            start_sample = int(start_beat * samples_per_beat); end_sample = start_sample + len(audio_data_float)
-            if end_sample > len(mixer_buffer): end_sample = len(mixer_buffer); audio_data_float = audio_data_float[:end_sample - start_sample]
-            mixer_buffer[start_sample:end_sample] += audio_data_float
-        peak = np.max(np.abs(mixer_buffer));
-        if peak > 1.0: mixer_buffer /= peak
-        final_audio_int16 = (mixer_buffer * np.iinfo(np.int16).max).astype(np.int16)
-        self.is_playing = True
-        if self.is_metronome_on.get(): self.metronome_thread = threading.Thread(target=self._metronome_worker); self.metronome_thread.start()
-        self.playback_thread = threading.Thread(target=self._play_arrangement_worker, args=(final_audio_int16,)); self.playback_thread.start()
-        self.playback_start_time = time.time(); self.arrangement_view.move_playhead(0); self._update_playhead()
\ No newline at end of file
+        # Nada é renderizado antes de tocar: as threads de pré-renderização leem só os blocos que estão para tocar
+        self.perf.reset(); self.is_playing = True
+        self.playback_thread = threading.Thread(target=self._play_arrangement_worker, args=(self._prepare_metronome(), self.bpm.get())); self.playback_thread.start()
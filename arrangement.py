@@ -0,0 +1,103 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from core import SAMPLE_RATE
+
+# --- MODELO DO ARRANJO INDEXADO NO TEMPO ---
+# Os itens continuam sendo dicts {"clip", "track_index", "start_beat"} (o formato do .dawpe),
+# mas cada trilha tem arrays ordenados de início/fim em amostras. "O que toca em [t0, t1)" e
+# "qual clip está em (trilha, t)" viram buscas binárias em vez de varrer a lista inteira.
+# Qualquer edição só marca o índice como sujo; ele é refeito uma vez, na próxima consulta.
+
+
+class TrackIndex:
+    # Intervalos [início, fim) de uma trilha; também usado pelo motor sobre as regiões que ele vai tocar
+    def __init__(self, spans):
+        spans.sort(key=lambda span: span[0])
+        self.starts = [span[0] for span in spans]; self.ends = [span[1] for span in spans]; self.items = [span[2] for span in spans]
+        # Maior fim até cada posição (não decrescente): tudo antes do primeiro valor > t0 já acabou
+        self.max_ends = list(accumulate(self.ends, max))
+
+    def overlapping(self, t0, t1):
+        lo = bisect_right(self.max_ends, t0); hi = bisect_left(self.starts, t1)
+        return [self.items[i] for i in range(lo, hi) if self.ends[i] > t0]
+
+
+class Arrangement:
+    def __init__(self, bpm=120, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate; self.bpm = bpm
+        self.items = []
+        self._tracks = {}; self._spans = {}; self._end = 0; self._dirty = True
+
+    def __len__(self): return len(self.items)
+    def __iter__(self): return iter(list(self.items))
+
+    @property
+    def samples_per_beat(self): return self.sample_rate * 60.0 / self.bpm if self.bpm > 0 else 0.0
+
+    def set_bpm(self, bpm):
+        if bpm != self.bpm: self.bpm = bpm; self._dirty = True
+
+    def add(self, clip, track_index, start_beat):
+        item = {"clip": clip, "track_index": track_index, "start_beat": start_beat}
+        self.items.append(item); self._dirty = True
+        return item
+
+    def extend(self, items):
+        self.items.extend(items); self._dirty = True
+
+    def remove(self, item):
+        self.items = [i for i in self.items if i is not item]; self._dirty = True
+
+    def move(self, item, track_index, start_beat):
+        item["track_index"] = track_index; item["start_beat"] = start_beat; self._dirty = True
+
+    def invalidate(self):
+        # Chamar depois de mudar o trim de um clip (o mesmo Clip pode estar em vários itens)
+        self._dirty = True
+
+    def _rebuild(self):
+        samples_per_beat = self.samples_per_beat; per_track = {}; spans = {}
+        for item in self.items:
+            clip = item["clip"]
+            # Mesma conta do motor: o trecho aparado começa em start_beat
+            trim_start, trim_end = clip._trim_bounds(clip.duration_samples)
+            start = int(round(item["start_beat"] * samples_per_beat)); span = (start, start + trim_end - trim_start)
+            spans[id(item)] = span; per_track.setdefault(item["track_index"], []).append((span[0], span[1], item))
+        self._tracks = {track_index: TrackIndex(track_spans) for track_index, track_spans in per_track.items()}
+        self._spans = spans; self._end = max([span[1] for span in spans.values()] + [0])
+        self._dirty = False
+
+    def _index(self):
+        if self._dirty: self._rebuild()
+        return self._tracks
+
+    def span(self, item):
+        # (início, fim) do item em amostras
+        self._index()
+        return self._spans[id(item)]
+
+    def end_sample(self):
+        self._index()
+        return self._end
+
+    def track_indices(self): return sorted(self._index())
+
+    def items_on_track(self, track_index):
+        index = self._index().get(track_index)
+        return list(index.items) if index else []
+
+    def query(self, t0, t1, tracks=None):
+        # Itens que se sobrepõem a [t0, t1) nas trilhas pedidas (todas se None), por trilha e início
+        index = self._index(); result = []
+        for track_index in (sorted(index) if tracks is None else tracks):
+            track = index.get(track_index)
+            if track: result.extend(track.overlapping(t0, t1))
+        return result
+
+    def item_at(self, track_index, sample):
+        # Item que toca na amostra `sample` da trilha; se houver sobreposição, o que começa por último
+        track = self._index().get(track_index)
+        if track is None: return None
+        hits = track.overlapping(sample, sample + 1)
+        return hits[-1] if hits else None
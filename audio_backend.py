@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+
+from core import SAMPLE_RATE, CHANNELS
+from cache import clip_store
+from engine import fit_channels
+from lazy import lazy_import
+
+sd = lazy_import("sounddevice")
+wavfile = lazy_import("scipy.io.wavfile")
+
+# --- BACKENDS DE ÁUDIO ---
+# O transporte só pede streams de saída, entrada ou duplex com um callback no formato do
+# sounddevice: (outdata, frames, time, status), (indata, frames, time, status) ou
+# (indata, outdata, frames, time, status). O backend simulado chama os mesmos callbacks a partir
+# de um relógio de amostras próprio, lendo a entrada de um WAV e guardando a saída de cada stream (num WAV ou array),
+# então reprodução, gravação e metrônomo rodam sem placa de som e mais rápido que o tempo real.
+# Escolha com DAW_AUDIO_BACKEND=sounddevice (padrão) ou simulated (+ DAW_SIM_INPUT, DAW_SIM_OUTPUT, DAW_SIM_REALTIME, DAW_SIM_LATENCY_MS).
+
+
+class SoundDeviceBackend:
+    name = "sounddevice"
+    realtime = True
+
+    def open_output(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=0, finished_callback=None):
+        return sd.OutputStream(samplerate=sample_rate, channels=channels, callback=callback, blocksize=blocksize, dtype='float32', finished_callback=finished_callback)
+
+    def open_input(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=0, finished_callback=None):
+        return sd.InputStream(samplerate=sample_rate, channels=channels, callback=callback, blocksize=blocksize, dtype='float32', finished_callback=finished_callback)
+
+    def open_duplex(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=0, finished_callback=None):
+        return sd.Stream(samplerate=sample_rate, channels=channels, callback=callback, blocksize=blocksize, dtype='float32', finished_callback=finished_callback)
+
+
+class SimulatedFlags:
+    # Mesmo formato do CallbackFlags do sounddevice, sempre sem xrun
+    output_underflow = output_overflow = input_underflow = input_overflow = priming_output = False
+    def __bool__(self): return False
+
+
+class SimulatedStream:
+    DEFAULT_BLOCKSIZE = 1024
+
+    def __init__(self, backend, kind, callback, sample_rate, channels, blocksize, finished_callback):
+        self.backend = backend; self.kind = kind; self.callback = callback
+        self.samplerate = sample_rate; self.channels = channels; self.blocksize = blocksize or self.DEFAULT_BLOCKSIZE
+        self.finished_callback = finished_callback
+        half = backend.latency_seconds / 2
+        self.latency = (half, half) if kind == "duplex" else half
+        self.frames = 0; self.active = False; self.closed = False
+        self._thread = None; self._stop_event = threading.Event(); self._status = SimulatedFlags()
+        self._outdata = np.zeros((self.blocksize, channels), dtype=np.float32)
+        self.output_blocks = []  # só com o backend guardando a saída (output_path ou capture_output)
+
+    @property
+    def time(self): return self.frames / self.samplerate  # relógio do stream = amostras já processadas
+
+    def process_block(self):
+        # Um callback, exatamente como o PortAudio chamaria
+        frames = self.blocksize; now = self.time
+        time_info = SimpleNamespace(inputBufferAdcTime=now, outputBufferDacTime=now, currentTime=now)
+        indata = self.backend.read_input(self.frames - self.input_delay_frames(), frames, self.channels) if self.kind != "output" else None
+        if self.kind != "input": self._outdata.fill(0)
+        if self.kind == "output": self.callback(self._outdata, frames, time_info, self._status)
+        elif self.kind == "input": self.callback(indata, frames, time_info, self._status)
+        else: self.callback(indata, self._outdata, frames, time_info, self._status)
+        if self.kind != "input" and self.backend.keeps_output: self.output_blocks.append(self._outdata.copy())
+        self.frames += frames
+
+    def input_delay_frames(self):
+        # No duplex, o "músico" toca o WAV de entrada junto com o que ouve: a captura chega com a latência de ida e volta
+        return int(round(self.backend.latency_seconds * self.samplerate)) if self.kind == "duplex" else 0
+
+    def run(self, frames):
+        # Modo síncrono (testes/render offline): processa `frames` amostras sem thread nem espera
+        target = self.frames + frames
+        while self.frames < target: self.process_block()
+
+    def _loop(self):
+        start = time.perf_counter(); start_frames = self.frames
+        try:
+            while not self._stop_event.is_set():
+                self.process_block()
+                if self.backend.realtime:
+                    ahead = (self.frames - start_frames) / self.samplerate - (time.perf_counter() - start)
+                    if ahead > 0: self._stop_event.wait(ahead)
+                else: time.sleep(0)  # cede o GIL para quem está esperando o fim da reprodução
+        except Exception as e: print(f"Erro no callback simulado: {e}")
+        finally:
+            self.active = False
+            if self.finished_callback: self.finished_callback()
+
+    def start(self):
+        if self.active: return
+        self.active = True; self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True); self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread(): self._thread.join()
+        self._thread = None
+
+    abort = stop
+
+    def close(self):
+        if self.closed: return
+        self.stop(); self.closed = True; self.backend.stream_closed(self)
+
+    def __enter__(self): self.start(); return self
+    def __exit__(self, *exc): self.close()
+
+
+class SimulatedBackend:
+    name = "simulated"
+
+    def __init__(self, input_path=None, output_path=None, realtime=False, latency_seconds=0.0, capture_output=False):
+        # realtime=True segura o relógio no ritmo real (útil com a interface); False roda o mais rápido possível.
+        # latency_seconds é a latência de ida e volta informada (metade entrada, metade saída) e aplicada à captura duplex.
+        # A saída só é guardada com output_path (gravada no WAV ao fechar cada stream) ou capture_output=True (lida com `output()`)
+        self.input_path = input_path; self.output_path = output_path; self.realtime = realtime; self.latency_seconds = latency_seconds
+        self.capture_output = capture_output; self.keeps_output = capture_output or output_path is not None
+        self._input = None; self._last_output_stream = None
+
+    def _stream(self, kind, callback, sample_rate, channels, blocksize, finished_callback):
+        stream = SimulatedStream(self, kind, callback, sample_rate, channels, blocksize, finished_callback)
+        if kind != "input": self._last_output_stream = stream  # a saída de streams anteriores é solta aqui
+        return stream
+
+    def open_output(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=0, finished_callback=None): return self._stream("output", callback, sample_rate, channels, blocksize, finished_callback)
+    def open_input(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=0, finished_callback=None): return self._stream("input", callback, sample_rate, channels, blocksize, finished_callback)
+    def open_duplex(self, callback, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocksize=0, finished_callback=None): return self._stream("duplex", callback, sample_rate, channels, blocksize, finished_callback)
+
+    def read_input(self, position, frames, channels):
+        # Entrada vinda do WAV (no formato do projeto); silêncio sem arquivo ou depois do fim
+        if self._input is None: self._input = clip_store.get_float(self.input_path) if self.input_path else np.zeros(0, dtype=np.float32)
+        block = np.zeros((frames, channels), dtype=np.float32); lead = max(0, -position)  # antes do início: silêncio
+        chunk = self._input[max(0, position):position + frames] if position + frames > 0 else self._input[:0]
+        if len(chunk): block[lead:lead + len(chunk)] = fit_channels(chunk, channels)
+        return block
+
+    def output(self, stream=None):
+        # O que o stream de saída (por padrão o último aberto) produziu até agora, em ordem
+        stream = stream or self._last_output_stream; blocks = list(stream.output_blocks) if stream else []
+        return np.concatenate(blocks) if blocks else np.zeros((0, CHANNELS), dtype=np.float32)
+
+    def clear_output(self):
+        if self._last_output_stream: self._last_output_stream.output_blocks = []
+
+    def stream_closed(self, stream):
+        # Cada stream grava só a própria saída
+        if self.output_path and stream.kind != "input":
+            audio = self.output(stream)
+            wavfile.write(self.output_path, stream.samplerate, audio[:, 0] if audio.shape[1] == 1 else audio)
+            if not self.capture_output: stream.output_blocks = []
+
+
+def backend_from_environment():
+    if os.environ.get("DAW_AUDIO_BACKEND", "sounddevice") == "simulated":
+        return SimulatedBackend(os.environ.get("DAW_SIM_INPUT"), os.environ.get("DAW_SIM_OUTPUT"), os.environ.get("DAW_SIM_REALTIME", "1") != "0",
+                                float(os.environ.get("DAW_SIM_LATENCY_MS", "0")) / 1000.0)
+    return SoundDeviceBackend()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None: _backend = backend_from_environment()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
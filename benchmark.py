@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from scipy.io.wavfile import write
+
+from core import Clip, SAMPLE_RATE, CHANNELS
+from cache import clip_store
+from engine import ArrangementEngine, BLOCK_SIZE, fit_channels
+from mixer import MixerState
+from meters import MeterBank
+from dsp import Delay
+from peaks import compute_peaks, render_waveform_image
+from project import read_project, write_project
+from bounce import render_project
+
+# --- BENCHMARKS DO MOTOR (SEM INTERFACE) ---
+# Uso: python benchmark.py [-t 8] [-c 4] [--clip-seconds 10] [-r 3] [-o resultado.json]
+# Gera um projeto sintético (.dawpe + WAVs) e mede os caminhos quentes; o JSON de saída
+# guarda a configuração junto com os tempos, para comparar execuções ao longo do tempo.
+
+
+def make_synthetic_project(directory, num_tracks, clips_per_track, clip_seconds, bpm=120, seed=0):
+    # N trilhas x M clips em sequência no arranjo; cada trilha também tem o primeiro clip na sessão
+    rng = np.random.default_rng(seed); frames = int(clip_seconds * SAMPLE_RATE)
+    t = np.arange(frames) / SAMPLE_RATE; tracks = []; arrangement = []
+    clip_beats = clip_seconds * bpm / 60.0
+    for track_index in range(num_tracks):
+        clips = []
+        for clip_index in range(clips_per_track):
+            tone = 0.3 * np.sin(2 * np.pi * rng.uniform(80, 1000) * t) + 0.05 * rng.standard_normal(frames)
+            path = os.path.join(directory, f"t{track_index}_c{clip_index}.wav")
+            write(path, SAMPLE_RATE, (tone * np.iinfo(np.int16).max).astype(np.int16))
+            clip = Clip(path); clips.append(clip)
+            arrangement.append({"clip": clip, "track_index": track_index, "start_beat": clip_index * clip_beats})
+        tracks.append({"name": f"Trilha {track_index + 1}", "volume": 0.8, "is_muted": False, "is_soloed": False, "clips": clips[:1], "effects": []})
+    project_path = os.path.join(directory, "benchmark.dawpe")
+    write_project(project_path, bpm, tracks, arrangement)
+    return project_path
+
+
+def measure(function, repeat):
+    # Melhor tempo de `repeat` execuções sem tracemalloc + pico de memória alocada numa execução extra
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter(); result = function(); times.append(time.perf_counter() - start)
+    tracemalloc.start(); function(); peak_bytes = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    return result, {"seconds": min(times), "mean_seconds": sum(times) / len(times), "peak_memory_mb": peak_bytes / 2 ** 20}
+
+
+def bench_clip_load(project_path):
+    # Abrir o projeto (só cabeçalhos) + decodificar todo o PCM para o cache float
+    def run():
+        clip_store.invalidate(); project_data = read_project(project_path)
+        for item in project_data["arrangement"]: item["clip"].get_trimmed_float()
+        return project_data
+    return run
+
+
+def bench_full_mix(project_path):
+    project_data = read_project(project_path); output_path = os.path.join(os.path.dirname(project_path), "full_mix.wav")
+    return lambda: render_project(project_data, output_path)
+
+
+def bench_session_blocks(project_path, seconds):
+    # Mesma sequência do callback da sessão: fatia do clip por trilha, mixer vetorizado e medidores
+    project_data = read_project(project_path); num_tracks = len(project_data["tracks"])
+    streams = [(index, track["clips"][0].get_trimmed_float()) for index, track in enumerate(project_data["tracks"]) if track["clips"]]
+    def run():
+        mixer = MixerState(num_tracks); meters = MeterBank(num_tracks); mixer.prepare_playback()
+        tracks = np.zeros((num_tracks, BLOCK_SIZE, CHANNELS), dtype=np.float32); out = np.zeros((BLOCK_SIZE, CHANNELS), dtype=np.float32)
+        block_times = []
+        for position in range(0, int(seconds * SAMPLE_RATE), BLOCK_SIZE):
+            start = time.perf_counter(); tracks.fill(0)
+            for track_index, data in streams:
+                chunk = data[position:position + BLOCK_SIZE]; tracks[track_index, :len(chunk)] = fit_channels(chunk, CHANNELS)
+            mixer.mix(tracks, out, meters); block_times.append(time.perf_counter() - start)
+        return np.array(block_times)
+    return run
+
+
+def bench_arrangement_blocks(project_path):
+    # Callback do arranjo bloco a bloco (o que o stream de saída chama em tempo real)
+    project_data = read_project(project_path)
+    def run():
+        mixer = MixerState(len(project_data["tracks"])); mixer.prepare_playback()
+        engine = ArrangementEngine(project_data["arrangement"], mixer, project_data["bpm"], meters=MeterBank(mixer.num_tracks))
+        out = np.zeros((BLOCK_SIZE, CHANNELS), dtype=np.float32); block_times = []
+        while not engine.finished:
+            start = time.perf_counter(); engine.callback(out, BLOCK_SIZE, None, None); block_times.append(time.perf_counter() - start)
+        return np.array(block_times)
+    return run
+
+
+def bench_waveform(project_path, width=1200, height=96):
+    clip = read_project(project_path)["arrangement"][0]["clip"]
+    _, data = clip_store.get_raw(clip.audio_file_path)
+    return lambda: render_waveform_image(compute_peaks(data), 0.0, 1.0, width, height)
+
+
+def bench_delay(project_path):
+    data = fit_channels(read_project(project_path)["arrangement"][0]["clip"].get_trimmed_float(), CHANNELS)
+    def run():
+        delay = Delay()
+        for position in range(0, len(data), BLOCK_SIZE): delay.process(data[position:position + BLOCK_SIZE])
+    return run
+
+
+def bench_save_load(project_path, directory):
+    project_data = read_project(project_path); copy_path = os.path.join(directory, "benchmark_copy.dawpe")
+    def run():
+        write_project(copy_path, project_data["bpm"], project_data["tracks"], project_data["arrangement"])
+        return read_project(copy_path)
+    return run
+
+
+def block_stats(block_times):
+    budget = BLOCK_SIZE / SAMPLE_RATE
+    return {"blocks": len(block_times), "mean_block_ms": float(block_times.mean() * 1000), "max_block_ms": float(block_times.max() * 1000),
+            "p99_block_ms": float(np.percentile(block_times, 99) * 1000), "dsp_load_percent": float(block_times.mean() / budget * 100)}
+
+
+def run_benchmarks(num_tracks, clips_per_track, clip_seconds, repeat, directory):
+    project_path = make_synthetic_project(directory, num_tracks, clips_per_track, clip_seconds)
+    audio_seconds = clips_per_track * clip_seconds; total_clips = num_tracks * clips_per_track
+    total_bytes = total_clips * int(clip_seconds * SAMPLE_RATE) * 2
+    results = {}
+    _, results["clip_load"] = measure(bench_clip_load(project_path), repeat)
+    results["clip_load"]["throughput_mb_s"] = total_bytes / 2 ** 20 / results["clip_load"]["seconds"]
+    _, results["full_mix"] = measure(bench_full_mix(project_path), repeat)
+    results["full_mix"]["realtime_factor"] = audio_seconds / results["full_mix"]["seconds"]
+    block_times, results["session_blocks"] = measure(bench_session_blocks(project_path, clip_seconds), repeat)
+    results["session_blocks"].update(block_stats(block_times)); results["session_blocks"]["realtime_factor"] = clip_seconds / results["session_blocks"]["seconds"]
+    block_times, results["arrangement_blocks"] = measure(bench_arrangement_blocks(project_path), repeat)
+    results["arrangement_blocks"].update(block_stats(block_times)); results["arrangement_blocks"]["realtime_factor"] = len(block_times) * BLOCK_SIZE / SAMPLE_RATE / results["arrangement_blocks"]["seconds"]
+    _, results["waveform"] = measure(bench_waveform(project_path), repeat)
+    results["waveform"]["audio_seconds_per_second"] = clip_seconds / results["waveform"]["seconds"]
+    _, results["delay"] = measure(bench_delay(project_path), repeat)
+    results["delay"]["realtime_factor"] = clip_seconds / results["delay"]["seconds"]
+    _, results["save_load"] = measure(bench_save_load(project_path, directory), repeat)
+    results["save_load"]["clips_per_second"] = total_clips * 2 / results["save_load"]["seconds"]  # sessão + arranjo
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede os caminhos quentes do motor de áudio com um projeto sintético.")
+    parser.add_argument("-t", "--tracks", type=int, default=8, help="número de trilhas")
+    parser.add_argument("-c", "--clips", type=int, default=4, help="clips por trilha no arranjo")
+    parser.add_argument("--clip-seconds", type=float, default=10.0, help="duração de cada clip")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="repetições de cada medida (vale a melhor)")
+    parser.add_argument("-o", "--output", help="arquivo JSON de saída (padrão: benchmark_<data>.json)")
+    parser.add_argument("--keep", action="store_true", help="mantém a pasta com o projeto sintético")
+    args = parser.parse_args(argv)
+    directory = tempfile.mkdtemp(prefix="daw_benchmark_")
+    try: results = run_benchmarks(args.tracks, args.clips, args.clip_seconds, max(1, args.repeat), directory)
+    finally:
+        if args.keep: print(f"Projeto sintético mantido em {directory}")
+        else: shutil.rmtree(directory, ignore_errors=True)
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": {"tracks": args.tracks, "clips_per_track": args.clips, "clip_seconds": args.clip_seconds, "repeat": args.repeat,
+              "sample_rate": SAMPLE_RATE, "channels": CHANNELS, "block_size": BLOCK_SIZE},
+              "platform": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(), "cpus": os.cpu_count()}, "results": results}
+    output_path = args.output or f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_path, "w") as f: json.dump(report, f, indent=2)
+    for name, values in results.items():
+        extra = ", ".join(f"{k}={v:.2f}" for k, v in values.items() if k not in ("seconds", "mean_seconds", "peak_memory_mb"))
+        print(f"{name:20s} {values['seconds'] * 1000:9.1f} ms  pico {values['peak_memory_mb']:7.1f} MB  {extra}")
+    print(f"Resultados salvos em {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from core import Clip, SAMPLE_RATE, CHANNELS
+from engine import ArrangementEngine, BLOCK_SIZE
+from mixer import MixerState
+from dsp import EffectChain, LookaheadLimiter
+from project import read_project, track_gains
+from importer import import_audio
+
+# --- BOUNCE DE PROJETOS SEM INTERFACE ---
+# Uso: python bounce.py projeto.dawpe [-o saida.wav]
+#      python bounce.py pasta_de_projetos/ [-o pasta_de_saida/] [-j 8]
+
+
+def _render_track(args):
+    # Roda em outro processo: renderiza a trilha bloco a bloco num arquivo float32 bruto (memória constante)
+    items, gain, effects, bpm, total_samples, track_path = args
+    arrangement = [{"clip": Clip.from_dict(item["clip"]), "track_index": 0, "start_beat": item["start_beat"]} for item in items]
+    mixer = MixerState(1); mixer.set_volume(0, gain); mixer.inserts[0] = EffectChain.from_list(effects); mixer.prepare_playback()
+    engine = ArrangementEngine(arrangement, mixer, bpm); block = np.zeros((BLOCK_SIZE, CHANNELS), dtype=np.float32)
+    with open(track_path, "wb") as f:
+        for t0 in range(0, total_samples, BLOCK_SIZE):
+            out = block[:min(BLOCK_SIZE, total_samples - t0)]; out.fill(0)
+            f.write(engine.render(out, t0).tobytes())
+    return track_path
+
+
+def _write_mix(track_paths, total_samples, output_path):
+    # Soma as trilhas, passa pelo limitador do master e grava o WAV, um bloco por vez; devolve as amostras gravadas.
+    # `total_samples` (end_sample do motor) já inclui a cauda do limitador, então o atraso só sai do começo
+    limiter = LookaheadLimiter(); skip = limiter.latency_samples(); written = 0
+    mix = np.zeros((BLOCK_SIZE, CHANNELS), dtype=np.float32); files = [open(path, "rb") for path in track_paths]
+    try:
+        with wave.open(output_path, "wb") as wav_file:
+            wav_file.setnchannels(CHANNELS); wav_file.setsampwidth(2); wav_file.setframerate(SAMPLE_RATE)
+            for t0 in range(0, total_samples, BLOCK_SIZE):
+                block = mix[:min(BLOCK_SIZE, total_samples - t0)]; block.fill(0)
+                for f in files:
+                    chunk = np.fromfile(f, dtype=np.float32, count=block.size).reshape(-1, CHANNELS)
+                    block[:len(chunk)] += chunk
+                limited = limiter.process(block)
+                if skip: dropped = min(skip, len(limited)); limited = limited[dropped:]; skip -= dropped
+                wav_file.writeframesraw((np.clip(limited, -1.0, 1.0) * np.iinfo(np.int16).max).astype("<i2").tobytes()); written += len(limited)
+    finally:
+        for f in files: f.close()
+    return written
+
+
+def render_project(project_data, output_path, executor=None):
+    # Devolve quantas amostras foram gravadas em `output_path`; nada do mix fica inteiro na memória
+    bpm = project_data["bpm"]; gains = track_gains(project_data["tracks"])
+    for item in project_data["arrangement"]:
+        # Clips em outra taxa/canais/formato tocam pela versão convertida (em cache) no formato do projeto
+        clip = item["clip"]
+        if os.path.exists(clip.audio_file_path):
+            converted_path = import_audio(clip.audio_file_path)
+            if converted_path != clip.audio_file_path: clip.set_audio_file(converted_path)
+    # Trilhas silenciadas (mute/solo) não entram nem no cálculo da duração
+    audible = [item for item in project_data["arrangement"] if item["track_index"] < len(gains) and gains[item["track_index"]] != 0]
+    mixer = MixerState(len(gains))
+    for index, track in enumerate(project_data["tracks"]): mixer.inserts[index] = EffectChain.from_list(track["effects"])
+    total_samples = ArrangementEngine(audible, mixer, bpm).end_sample
+    with tempfile.TemporaryDirectory(prefix="daw_bounce_") as directory:
+        jobs = []
+        for track_index, gain in enumerate(gains):
+            items = [{"clip": item["clip"].to_dict(), "start_beat": item["start_beat"]} for item in project_data["arrangement"] if item["track_index"] == track_index]
+            if items and gain != 0: jobs.append((items, gain, project_data["tracks"][track_index]["effects"], bpm, total_samples, os.path.join(directory, f"trilha_{track_index}.f32")))
+        track_paths = list(executor.map(_render_track, jobs) if executor else map(_render_track, jobs))
+        # O mesmo limitador do master ao vivo, em blocos: o volume não depende do maior transiente do projeto
+        return _write_mix(track_paths, total_samples, output_path)
+
+
+def bounce_file(project_path, output_path, executor=None):
+    start = time.perf_counter()
+    total_samples = render_project(read_project(project_path), output_path, executor)
+    render_time = time.perf_counter() - start
+    audio_seconds = total_samples / SAMPLE_RATE
+    realtime_factor = audio_seconds / render_time if render_time > 0 else float("inf")
+    print(f"{os.path.basename(project_path)} -> {output_path}: {audio_seconds:.1f}s de áudio em {render_time:.2f}s ({realtime_factor:.1f}x tempo real)")
+    return render_time, realtime_factor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Renderiza projetos .dawpe para WAV sem abrir a interface.")
+    parser.add_argument("input", help="arquivo .dawpe ou pasta com vários projetos")
+    parser.add_argument("-o", "--output", help="arquivo WAV de saída (ou pasta, no modo em lote)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="processos para renderizar as trilhas em paralelo")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.input):
+        projects = sorted(glob.glob(os.path.join(args.input, "*.dawpe")))
+        output_dir = args.output or args.input
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = [os.path.join(output_dir, os.path.splitext(os.path.basename(p))[0] + ".wav") for p in projects]
+    else:
+        projects = [args.input]
+        outputs = [args.output or os.path.splitext(args.input)[0] + ".wav"]
+    if not projects: print(f"Nenhum projeto .dawpe encontrado em '{args.input}'."); return 1
+
+    total_start = time.perf_counter(); failures = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        for project_path, output_path in zip(projects, outputs):
+            try: bounce_file(project_path, output_path, executor)
+            except Exception as e: print(f"Erro ao renderizar '{project_path}': {e}"); failures += 1
+    if len(projects) > 1: print(f"{len(projects) - failures}/{len(projects)} projetos renderizados em {time.perf_counter() - total_start:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from lazy import lazy_import
+
+wavfile = lazy_import("scipy.io.wavfile")
+
+# Orçamento padrão para os buffers float32 decodificados (os memmaps não contam, ficam no cache do SO)
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("DAW_CLIP_CACHE_MB", "512"))
+# Arquivos mapeados abertos ao mesmo tempo: cada memmap segura um handle e, no Windows, impede sobrescrever ou apagar o arquivo
+DEFAULT_MAX_MAPPED_FILES = int(os.environ.get("DAW_CLIP_MAX_MAPS", "64"))
+
+
+def pcm_to_float32(data):
+    # Converte PCM inteiro para float32 na faixa [-1, 1], mantendo a escala que o resto do app usa
+    if data.dtype == np.float32: return data
+    if np.issubdtype(data.dtype, np.floating): return data.astype(np.float32)
+    if data.dtype == np.uint8: return (data.astype(np.float32) - 128.0) / 128.0
+    return data.astype(np.float32) / np.iinfo(data.dtype).max
+
+
+class ClipDataStore:
+    def __init__(self, memory_budget_bytes=DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024, max_mapped_files=DEFAULT_MAX_MAPPED_FILES):
+        self.memory_budget_bytes = memory_budget_bytes; self.max_mapped_files = max_mapped_files
+        self._entries = OrderedDict()  # caminho -> {"mtime", "samplerate", "raw"} (ordem = LRU)
+        self._float_cache = OrderedDict()  # caminho -> (mtime, array float32) (ordem = LRU); sobrevive ao mapa ser fechado
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def set_memory_budget(self, memory_budget_bytes):
+        with self._lock:
+            self.memory_budget_bytes = memory_budget_bytes
+            self._evict()
+
+    def _mtime(self, path):
+        try: return os.stat(path).st_mtime_ns
+        except OSError: return None
+
+    def _entry(self, path):
+        # Chamar sempre com o lock; reabre o arquivo se ele mudou no disco
+        path = os.path.abspath(path)
+        mtime = self._mtime(path)
+        if mtime is None:
+            self._drop(path)
+            return path, None
+        entry = self._entries.get(path)
+        if entry is None or entry["mtime"] != mtime:
+            self._drop_stale(path, mtime)
+            try: samplerate, raw = wavfile.read(path, mmap=True)
+            except ValueError: samplerate, raw = wavfile.read(path)  # formatos que não permitem mmap (ex.: 24 bits)
+            entry = {"mtime": mtime, "samplerate": samplerate, "raw": raw}
+            self._entries[path] = entry
+            # O mapa sai da lista; o SO solta o arquivo quando quem ainda tem fatias dele (um motor tocando) as largar
+            while len(self._entries) > self.max_mapped_files: self._entries.popitem(last=False)
+        else: self._entries.move_to_end(path)
+        return path, entry
+
+    def _drop(self, path):
+        self._entries.pop(path, None)
+        cached = self._float_cache.pop(path, None)
+        if cached is not None: self._cached_bytes -= cached[1].nbytes
+
+    def _drop_stale(self, path, mtime):
+        # Só o que não corresponde mais ao arquivo no disco; um mapa fechado pelo limite não leva o PCM decodificado junto
+        entry = self._entries.get(path)
+        if entry is not None and entry["mtime"] != mtime: del self._entries[path]
+        cached = self._float_cache.get(path)
+        if cached is not None and cached[0] != mtime: del self._float_cache[path]; self._cached_bytes -= cached[1].nbytes
+
+    def _evict(self):
+        while self._float_cache and self._cached_bytes > self.memory_budget_bytes:
+            _, (_, cached) = self._float_cache.popitem(last=False)
+            self._cached_bytes -= cached.nbytes
+
+    def get_raw(self, path):
+        # Retorna (samplerate, dados PCM originais mapeados em memória) ou (0, None) se não existir
+        with self._lock:
+            _, entry = self._entry(path)
+            if entry is None: return 0, None
+            return entry["samplerate"], entry["raw"]
+
+    def get_float(self, path):
+        # Retorna o áudio inteiro em float32 (somente leitura), decodificando só na primeira vez
+        with self._lock:
+            # Com o PCM já decodificado nem é preciso abrir o mapa: basta o arquivo não ter mudado
+            key = os.path.abspath(path); cached = self._float_cache.get(key)
+            if cached is not None and cached[0] == self._mtime(key):
+                self._float_cache.move_to_end(key)
+                return cached[1]
+            key, entry = self._entry(path)
+            if entry is None: return np.array([], dtype=np.float32)
+            raw = entry["raw"]
+        data = pcm_to_float32(np.asarray(raw))
+        if data is raw or np.shares_memory(data, raw): data = np.array(data, dtype=np.float32)
+        data.flags.writeable = False
+        with self._lock:
+            cached = self._float_cache.get(key)
+            if cached is not None and cached[0] == entry["mtime"]: return cached[1]
+            if self._mtime(key) == entry["mtime"] and data.nbytes <= self.memory_budget_bytes:
+                self._drop_stale(key, entry["mtime"])
+                self._float_cache[key] = (entry["mtime"], data); self._cached_bytes += data.nbytes
+                self._evict()
+        return data
+
+    def invalidate(self, path=None):
+        # Sem caminho (projeto fechado): solta todos os mapas e buffers
+        with self._lock:
+            if path is None:
+                self._entries.clear(); self._float_cache.clear(); self._cached_bytes = 0
+            else: self._drop(os.path.abspath(path))
+
+    def mapped_files(self):
+        with self._lock: return len(self._entries)
+
+    def cached_bytes(self):
+        with self._lock: return self._cached_bytes
+
+
+# Instância única compartilhada pelo processo inteiro
+clip_store = ClipDataStore()
@@ -1,8 +1,10 @@
 import customtkinter as ctk
-import random
-from PIL import Image, ImageTk
+import tkinter as tk
 import os
 
+from waveform_cache import waveform_bitmaps
+from meters import PEAK, HOLD, amplitude_to_meter, amplitude_to_db_text
+
 # --- NOSSA PALETA DE CORES "MANGUEBEAT" ---
 COR_FUNDO = "#242424"
 COR_PAINEL = "#3B3B3B"
@@ -17,17 +19,21 @@ NORMAL_BG_COLORS = ["#2E4053", "#512E53", "#2E5345", "#532E2E"]
 SELECTED_BG_COLOR = "#F1C40F"
 MUTE_ON_COLOR = "#3498DB"
 SOLO_ON_COLOR = "#F39C12"
+ROW_HEIGHT = 160  # linha da sessão (controles + forma de onda)
+STRIP_WIDTH = 120  # canal do mixer
 
 class WaveformCanvas(ctk.CTkCanvas):
     def __init__(self, master, track_frame):
         super().__init__(master, bg="#343638", highlightthickness=0)
         self.track_frame = track_frame; self.image = None; self.photo_image = None; self.start_handle_pos = 0; self.end_handle_pos = 0; self.image_id, self.start_handle_id, self.end_handle_id, self.dark_overlay_start_id, self.dark_overlay_end_id = None, None, None, None, None; self._drag_data = {"x": 0, "y": 0, "item_tag": None}; self.tag_bind("handle", "<ButtonPress-1>", self.on_press_handle); self.tag_bind("handle", "<B1-Motion>", self.on_drag_handle); self.tag_bind("handle", "<Enter>", lambda e: self.config(cursor="sb_h_double_arrow")); self.tag_bind("handle", "<Leave>", lambda e: self.config(cursor=""))
-    def display_waveform(self, image_path):
+    def display_waveform(self, clip):
         try:
             width, height = self.winfo_width(), self.winfo_height()
-            if width <= 1 or height <= 1: self.after(50, lambda: self.display_waveform(image_path)); return
+            if width <= 1 or height <= 1: self.after(50, lambda: self.track_frame.get_active_clip() is clip and self.display_waveform(clip)); return
+            photo_image = waveform_bitmaps.get(clip.audio_file_path, 0.0, 1.0, width, height)
+            if photo_image is None: return
             self.delete("all")
-            self.image = Image.open(image_path).resize((width, height), Image.Resampling.LANCZOS); self.photo_image = ImageTk.PhotoImage(self.image); self.image_id = self.create_image(0, 0, image=self.photo_image, anchor="nw")
+            self.photo_image = photo_image; self.image_id = self.create_image(0, 0, image=self.photo_image, anchor="nw")
             self.dark_overlay_start_id = self.create_rectangle(0,0,0,0, fill="#000000", stipple="gray50", outline="")
             self.dark_overlay_end_id = self.create_rectangle(0,0,0,0, fill="#000000", stipple="gray50", outline="")
             self.start_handle_id = self.create_line(0,0,0,0, fill=SELECTED_BG_COLOR, width=3, tags=("handle", "start_handle"))
@@ -49,23 +55,20 @@ class WaveformCanvas(ctk.CTkCanvas):
         if canvas_width > 0: start_ratio = self.start_handle_pos / canvas_width; end_ratio = self.end_handle_pos / canvas_width; self.track_frame.set_trim_points(start_ratio, end_ratio)
 
 class TrackFrame(ctk.CTkFrame):
-    def __init__(self, master, track_name, app_instance, track_index):
-        super().__init__(master, height=100, border_width=2, border_color=COR_FUNDO, corner_radius=8)
-        self.track_name = track_name; self.app = app_instance; self.track_index = track_index
-        self.normal_bg_color = random.choice(NORMAL_BG_COLORS); self.configure(fg_color=self.normal_bg_color)
+    # Linha da sessão reaproveitável: mostra a trilha recebida em `bind_track` e troca de trilha na rolagem
+    def __init__(self, master, app_instance):
+        super().__init__(master, height=ROW_HEIGHT, border_width=2, border_color=COR_FUNDO, corner_radius=8)
+        self.app = app_instance; self.track = None; self._shown_clip = None
+        self.grid_propagate(False)  # altura fixa: a lista virtual posiciona as linhas por índice
         self.grid_columnconfigure(0, weight=1); self.grid_columnconfigure(1, weight=5)
         
         controls_frame = ctk.CTkFrame(self, fg_color="transparent"); controls_frame.grid(row=0, column=0, rowspan=2, padx=10, pady=10, sticky="nsew")
-        self.name_label = ctk.CTkLabel(controls_frame, text=self.track_name, font=("Arial", 12)); self.name_label.pack(anchor="w", pady=(0, 5))
+        self.name_label = ctk.CTkLabel(controls_frame, text="", font=("Arial", 12)); self.name_label.pack(anchor="w", pady=(0, 5))
         self.copy_to_arr_button = ctk.CTkButton(controls_frame, text="-> Arranjo", width=100, command=self.copy_clip_to_arrangement, corner_radius=6, fg_color=COR_DESTAQUE, hover_color=COR_DESTAQUE_HOVER); self.copy_to_arr_button.pack(anchor="w", pady=5)
-        
-        # Variáveis de estado que serão controladas pelo Mixer
-        self.is_muted = ctk.BooleanVar(value=False)
-        self.is_soloed = ctk.BooleanVar(value=False)
-        self.volume = ctk.DoubleVar(value=0.8)
+        self.effects_button = ctk.CTkButton(controls_frame, text="FX", width=100, command=lambda: self.track and self.app.open_effects_window(self.track), corner_radius=6, fg_color=COR_PAINEL, hover_color="#4A4A4A"); self.effects_button.pack(anchor="w")
+        self.freeze_button = ctk.CTkButton(controls_frame, text="FREEZE", width=100, command=lambda: self.track and self.app.toggle_freeze(self.track), corner_radius=6, fg_color=COR_PAINEL, hover_color="#4A4A4A"); self.freeze_button.pack(anchor="w", pady=5)
         
         self.clips_area_canvas = WaveformCanvas(self, self); self.clips_area_canvas.grid(row=0, column=1, rowspan=2, padx=10, pady=10, sticky="nsew")
-        self.clips = []
         
         self.bind("<Button-1>", self.select_track)
         for widget in self.winfo_children():
@@ -73,56 +76,182 @@ class TrackFrame(ctk.CTkFrame):
             if hasattr(widget, 'winfo_children'):
                 for child in widget.winfo_children(): child.bind("<Button-1>", self.select_track)
 
-    def add_clip(self, clip):
-        self.clips = [clip]
-        if os.path.exists(clip.waveform_image_path): self.display_waveform(clip.waveform_image_path)
-    def get_active_clip(self): return self.clips[0] if self.clips else None
+    def bind_track(self, track):
+        if track is self.track: return
+        if self.track is not None: self.track.unwatch(self.on_track_changed)
+        self.track = track; self._shown_clip = None
+        if track is None: return
+        track.watch(self.on_track_changed)
+        self.name_label.configure(text=track.track_name); self.configure(fg_color=track.color or NORMAL_BG_COLORS[0])
+        self.on_track_changed(track)
+    def on_track_changed(self, track):
+        self.update_freeze_button(); self.update_selection()
+        clip = track.get_active_clip()
+        if clip is self._shown_clip: return
+        self._shown_clip = clip
+        if clip and os.path.exists(clip.audio_file_path): self.display_waveform(clip)
+        else: self.clips_area_canvas.delete("all")
+    def get_active_clip(self): return self.track.get_active_clip() if self.track else None
     def set_trim_points(self, start_ratio, end_ratio):
-        clip = self.get_active_clip()
-        if clip: clip.trim_start_ratio = start_ratio; clip.trim_end_ratio = end_ratio
+        if self.track and self.track.set_trim_points(start_ratio, end_ratio): self.app.arrangement_data.invalidate()
     def copy_clip_to_arrangement(self):
         clip = self.get_active_clip()
-        if clip: self.app.add_clip_to_arrangement(clip, self.track_index)
+        if clip: self.app.add_clip_to_arrangement(clip, self.track.track_index)
+    def update_freeze_button(self):
+        # Congelada: os efeitos já estão na render, então a cadeia fica travada até descongelar
+        if self.track.freezing: self.freeze_button.configure(text="Congelando...", fg_color=COR_PAINEL, state="disabled"); return
+        frozen = self.track.is_frozen
+        self.freeze_button.configure(text="FROZEN" if frozen else "FREEZE", fg_color=COR_SECUNDARIA if frozen else COR_PAINEL, state="normal")
+        self.effects_button.configure(state="disabled" if frozen else "normal")
+    def update_selection(self):
+        self.configure(border_color=SELECTED_BG_COLOR if self.track is not None and self.track is self.app.active_track else COR_FUNDO)
     def select_track(self, event=None):
-        if event and event.widget in (self.copy_to_arr_button,): return "break"
-        self.app.set_active_track(self)
-    def set_selected_appearance(self): self.configure(border_color=SELECTED_BG_COLOR)
-    def set_normal_appearance(self): self.configure(border_color=COR_FUNDO)
-    def display_waveform(self, image_path): self.clips_area_canvas.display_waveform(image_path)
+        if event and event.widget in (self.copy_to_arr_button, self.effects_button, self.freeze_button): return "break"
+        if self.track: self.app.set_active_track(self.track)
+    def display_waveform(self, clip): self.clips_area_canvas.display_waveform(clip)
+
+class EffectChainWindow(ctk.CTkToplevel):
+    # Lista os inserts da trilha com um slider por parâmetro; mudanças valem no próximo bloco de áudio
+    def __init__(self, master, track):
+        super().__init__(master)
+        self.track = track; self.title(f"Efeitos - {track.track_name}"); self.geometry("420x480")
+        self.body = ctk.CTkScrollableFrame(self, fg_color=COR_FUNDO); self.body.pack(fill="both", expand=True, padx=10, pady=10)
+        self.refresh()
+    def refresh(self):
+        for widget in self.body.winfo_children(): widget.destroy()
+        if not self.track.effect_chain.processors: ctk.CTkLabel(self.body, text="(Nenhum efeito nesta trilha)").pack(pady=10)
+        for processor in self.track.effect_chain.processors: self._add_processor_panel(processor)
+    def _add_processor_panel(self, processor):
+        panel = ctk.CTkFrame(self.body, fg_color=COR_PAINEL, corner_radius=8); panel.pack(fill="x", pady=5)
+        header = ctk.CTkFrame(panel, fg_color="transparent"); header.pack(fill="x", padx=8, pady=(6, 2))
+        ctk.CTkLabel(header, text=processor.label, font=("Arial", 12, "bold")).pack(side="left")
+        ctk.CTkButton(header, text="Remover", width=70, fg_color="#555555", hover_color="#666666", command=lambda: self._remove(processor)).pack(side="right")
+        bypass_var = ctk.BooleanVar(value=not processor.bypass)
+        ctk.CTkSwitch(header, text="Ligado", variable=bypass_var, progress_color=COR_DESTAQUE, command=lambda: setattr(processor, "bypass", not bypass_var.get())).pack(side="right", padx=5)
+        for name, (label, minimum, maximum, _) in processor.PARAMS.items():
+            row = ctk.CTkFrame(panel, fg_color="transparent"); row.pack(fill="x", padx=8, pady=2)
+            ctk.CTkLabel(row, text=label, width=110, anchor="w", font=("Arial", 10)).pack(side="left")
+            value_label = ctk.CTkLabel(row, text=f"{processor.params[name]:.2f}", width=45, font=("Arial", 10)); value_label.pack(side="right")
+            def on_change(value, name=name, value_label=value_label): processor.set_param(name, value); value_label.configure(text=f"{value:.2f}")
+            slider = ctk.CTkSlider(row, from_=minimum, to=maximum, command=on_change, button_color=COR_DESTAQUE, button_hover_color=COR_DESTAQUE_HOVER); slider.set(processor.params[name]); slider.pack(side="left", fill="x", expand=True, padx=5)
+    def _remove(self, processor): self.track.effect_chain.remove(processor); self.refresh()
+
+class MeterWidget(ctk.CTkFrame):
+    # Barra de nível (pico com balística) + valor do peak-hold em dB; só repinta o que mudou
+    def __init__(self, master):
+        super().__init__(master, fg_color="transparent")
+        self.bar = ctk.CTkProgressBar(self, orientation="vertical", progress_color="#4CAF50", fg_color="#1F1F1F", width=10); self.bar.pack(fill="y", expand=True); self.bar.set(0)
+        self.hold_label = ctk.CTkLabel(self, text="-inf", font=("Arial", 8), text_color=COR_TEXTO, width=30, height=12); self.hold_label.pack(pady=(2, 0))
+        self._shown_level = 0.0; self._shown_hold = "-inf"
+    def set_level(self, level):
+        level = round(level, 3)
+        if level != self._shown_level: self._shown_level = level; self.bar.set(level)
+    def set_values(self, values):
+        self.set_level(amplitude_to_meter(values[PEAK]))
+        hold_text = amplitude_to_db_text(values[HOLD])
+        if hold_text != self._shown_hold:
+            self._shown_hold = hold_text; self.hold_label.configure(text=hold_text, text_color="#E74C3C" if values[HOLD] >= 1.0 else COR_TEXTO)
+
+class MasterStrip(ctk.CTkFrame):
+    def __init__(self, master):
+        super().__init__(master, fg_color=COR_PAINEL, border_color="#2B2B2B", border_width=1, width=70, corner_radius=8)
+        self.pack_propagate(False)
+        ctk.CTkLabel(self, text="Master", font=("Arial", 10), text_color=COR_TEXTO).pack(pady=5)
+        self.vu_meter = MeterWidget(self); self.vu_meter.pack(fill="y", expand=True, pady=(5, 10))
+    def set_meter_values(self, values): self.vu_meter.set_values(values)
 
 class MixerChannelStrip(ctk.CTkFrame):
-    def __init__(self, master, track, app_instance):
-        super().__init__(master, fg_color=COR_PAINEL, border_color="#2B2B2B", border_width=1, width=120, corner_radius=8)
-        self.track = track; self.app = app_instance
-        self.pack_propagate(False); self.grid_columnconfigure(0, weight=1); self.grid_columnconfigure(1, minsize=20)
-        self.name_label = ctk.CTkLabel(self, text=self.track.track_name, font=("Arial", 10), text_color=COR_TEXTO); self.name_label.grid(row=0, column=0, columnspan=3, pady=5, padx=5, sticky="ew")
+    # Canal reaproveitável: como as linhas da sessão, mostra a trilha recebida em `bind_track`
+    def __init__(self, master, app_instance):
+        super().__init__(master, fg_color=COR_PAINEL, border_color="#2B2B2B", border_width=1, width=STRIP_WIDTH, corner_radius=8)
+        self.track = None; self.app = app_instance
+        self.pack_propagate(False); self.grid_propagate(False); self.grid_columnconfigure(0, weight=1); self.grid_columnconfigure(1, minsize=20)
+        self.name_label = ctk.CTkLabel(self, text="", font=("Arial", 10), text_color=COR_TEXTO); self.name_label.grid(row=0, column=0, columnspan=3, pady=5, padx=5, sticky="ew")
         mute_solo_frame = ctk.CTkFrame(self, fg_color="transparent"); mute_solo_frame.grid(row=1, column=0, columnspan=3, pady=2, padx=5, sticky="ew")
         self.mute_button = ctk.CTkButton(mute_solo_frame, text="M", width=35, command=self.toggle_mute, corner_radius=6); self.mute_button.pack(side="left", expand=True, padx=(0,2))
         self.solo_button = ctk.CTkButton(mute_solo_frame, text="S", width=35, command=self.toggle_solo, corner_radius=6); self.solo_button.pack(side="right", expand=True, padx=(2,0))
         fader_frame = ctk.CTkFrame(self, fg_color="transparent"); fader_frame.grid(row=2, column=0, columnspan=3, pady=(5, 10), padx=5, sticky="ns")
         fader_frame.grid_rowconfigure(0, weight=1); fader_frame.grid_columnconfigure(0, weight=1); fader_frame.grid_columnconfigure(1, weight=0)
-        self.volume_slider = ctk.CTkSlider(fader_frame, from_=1.0, to=0.0, variable=self.track.volume, number_of_steps=100, orientation="vertical", button_color=COR_DESTAQUE, progress_color="#555555", button_hover_color=COR_DESTAQUE_HOVER); self.volume_slider.grid(row=0, column=0, sticky="ns", padx=(15, 5))
+        self.volume_slider = ctk.CTkSlider(fader_frame, from_=1.0, to=0.0, command=self.set_volume, number_of_steps=100, orientation="vertical", button_color=COR_DESTAQUE, progress_color="#555555", button_hover_color=COR_DESTAQUE_HOVER); self.volume_slider.grid(row=0, column=0, sticky="ns", padx=(15, 5))
         db_markers_frame = ctk.CTkFrame(fader_frame, fg_color="transparent"); db_markers_frame.grid(row=0, column=1, sticky="ns")
         for db_level in [ "+6", "0", "-6", "-12", "-24", "-48"]: ctk.CTkLabel(db_markers_frame, text=db_level, font=("Arial", 8), text_color=COR_TEXTO).pack(expand=True, anchor="w")
-        self.vu_meter = ctk.CTkProgressBar(self, orientation="vertical", progress_color="#4CAF50", fg_color="#1F1F1F"); self.vu_meter.grid(row=2, column=0, columnspan=3, pady=(5,10), padx=(65,0), sticky="ns"); self.vu_meter.set(0)
-        self.track.is_muted.trace_add("write", self.update_button_colors)
-        self.track.is_soloed.trace_add("write", self.update_button_colors)
-        self.update_button_colors()
-    def set_meter_level(self, level): self.vu_meter.set(level)
-    def toggle_mute(self): self.track.is_muted.set(not self.track.is_muted.get())
-    def toggle_solo(self): self.app.toggle_solo_for_track(self.track.track_index)
-    def update_button_colors(self, *args):
-        mute_color = MUTE_ON_COLOR if self.track.is_muted.get() else ctk.ThemeManager.theme["CTkButton"]["fg_color"]
-        solo_color = SOLO_ON_COLOR if self.track.is_soloed.get() else ctk.ThemeManager.theme["CTkButton"]["fg_color"]
+        self.vu_meter = MeterWidget(self); self.vu_meter.grid(row=2, column=0, columnspan=3, pady=(5,10), padx=(65,0), sticky="ns")
+    def bind_track(self, track):
+        if track is self.track: return
+        if self.track is not None: self.track.unwatch(self.on_track_changed)
+        self.track = track
+        if track is None: return
+        track.watch(self.on_track_changed); self.name_label.configure(text=track.track_name); self.on_track_changed(track)
+    def on_track_changed(self, track): self.volume_slider.set(track.volume); self.update_button_colors()
+    def set_volume(self, value):
+        if self.track: self.track.set_volume(value)
+    def set_meter_level(self, level): self.vu_meter.set_level(level)
+    def set_meter_values(self, values): self.vu_meter.set_values(values)
+    def toggle_mute(self):
+        if self.track: self.track.set_muted(not self.track.is_muted)
+    def toggle_solo(self):
+        if self.track: self.app.toggle_solo_for_track(self.track.track_index)
+    def update_button_colors(self):
+        mute_color = MUTE_ON_COLOR if self.track.is_muted else ctk.ThemeManager.theme["CTkButton"]["fg_color"]
+        solo_color = SOLO_ON_COLOR if self.track.is_soloed else ctk.ThemeManager.theme["CTkButton"]["fg_color"]
         self.mute_button.configure(fg_color=mute_color); self.solo_button.configure(fg_color=solo_color)
 
-class MixerFrame(ctk.CTkScrollableFrame):
+class VirtualList(ctk.CTkFrame):
+    # Lista virtual das trilhas do app: só existem widgets para o que cabe na área visível (+2),
+    # e cada um é reaproveitado (`bind_track`) quando a rolagem traz outra trilha para o lugar dele.
+    # Quem cria a lista diz o tamanho de cada item no eixo da rolagem, como criar um widget
+    # (`create_item(viewport, app)`) e como posicioná-lo (`place_item(widget, posição)`).
+
+    def __init__(self, master, app_instance, create_item, place_item, item_size, orientation="vertical", label_text="", **kwargs):
+        super().__init__(master, **kwargs)
+        self.app = app_instance; self.widgets = []; self.visible = {}; self.scroll_offset = 0
+        self.create_item = create_item; self.place_item = place_item; self.item_size = item_size; self.orientation = orientation
+        if label_text: ctk.CTkLabel(self, text=label_text, font=("Arial", 12)).pack(side="top", fill="x", pady=(5, 0))
+        self.scrollbar = ctk.CTkScrollbar(self, orientation=self.orientation, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right" if self.orientation == "vertical" else "bottom", fill="y" if self.orientation == "vertical" else "x", padx=2, pady=2)
+        self.viewport = ctk.CTkFrame(self, fg_color="transparent")
+        self.viewport.bind("<Configure>", lambda event: self.refresh())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"): self.bind_all(sequence, self._on_mousewheel, add="+")
+
+    def pack_viewport(self): self.viewport.pack(side="left", fill="both", expand=True, padx=5, pady=5)  # depois dos widgets fixos da subclasse
+    def _viewport_size(self): return self.viewport.winfo_height() if self.orientation == "vertical" else self.viewport.winfo_width()
+
+    def refresh(self):
+        # Recalcula o que está visível; widgets fora da janela soltam a trilha e somem
+        tracks = self.app.tracks; size = max(1, self._viewport_size()); total = len(tracks) * self.item_size
+        self.scroll_offset = max(0, min(self.scroll_offset, total - size))
+        capacity = size // self.item_size + 2
+        while len(self.widgets) < capacity: self.widgets.append(self.create_item(self.viewport, self.app))
+        first = int(self.scroll_offset // self.item_size); visible = {}
+        for index in range(first, min(len(tracks), first + capacity)):
+            widget = self.widgets[index % capacity]; widget.bind_track(tracks[index]); visible[index] = widget
+            self.place_item(widget, index * self.item_size - self.scroll_offset)
+        shown = set(map(id, visible.values()))
+        for widget in self.widgets:
+            if id(widget) not in shown: widget.bind_track(None); widget.place_forget()
+        self.visible = visible
+        self.scrollbar.set(*((self.scroll_offset / total, (self.scroll_offset + size) / total) if total > size else (0.0, 1.0)))
+
+    def scroll_to(self, offset): self.scroll_offset = int(offset); self.refresh()
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto": self.scroll_to(float(args[1]) * len(self.app.tracks) * self.item_size)
+        elif args[0] == "scroll": self.scroll_to(self.scroll_offset + int(args[1]) * (self.item_size if args[2] == "units" else self._viewport_size()))
+    def _on_mousewheel(self, event):
+        try: widget = self.winfo_containing(event.x_root, event.y_root)
+        except (KeyError, tk.TclError): return
+        if widget is None or not str(widget).startswith(str(self.viewport)): return
+        direction = -1 if event.num == 4 or getattr(event, "delta", 0) > 0 else 1
+        self.scroll_to(self.scroll_offset + direction * self.item_size // 2)
+
+class MixerFrame(VirtualList):
     def __init__(self, master, app_instance):
-        super().__init__(master, label_text="Mixer", orientation="horizontal", corner_radius=8, fg_color=COR_FUNDO)
-        self.app = app_instance; self.channel_strips = {}
-    def add_channel_strip(self, track):
-        strip = MixerChannelStrip(self, track, self.app); strip.pack(side="left", padx=(0, 2), pady=5, fill="y", expand=True)
-        self.channel_strips[track.track_index] = strip
+        # Largura fixa no construtor do canal (o CTk não aceita no place)
+        super().__init__(master, app_instance, MixerChannelStrip, lambda widget, position: widget.place(x=position, y=0, relheight=1.0), STRIP_WIDTH + 2, "horizontal",
+                         label_text="Mixer", corner_radius=8, fg_color=COR_FUNDO)
+        self.master_strip = MasterStrip(self); self.master_strip.pack(side="right", padx=(2, 0), pady=5, fill="y")
+        self.pack_viewport()
+    @property
+    def channel_strips(self): return self.visible  # só os canais que existem agora, por índice da trilha
 
 class TransportFrame(ctk.CTkFrame):
     def __init__(self, master, app_instance):
@@ -134,6 +263,41 @@ class TransportFrame(ctk.CTkFrame):
         ctk.CTkLabel(bpm_frame, text="BPM:").pack(side="left"); ctk.CTkEntry(bpm_frame, width=50, textvariable=app_instance.bpm, corner_radius=8).pack(side="left", padx=5)
         metronome_frame = ctk.CTkFrame(self, fg_color="transparent"); metronome_frame.pack(side="left", padx=10)
         ctk.CTkLabel(metronome_frame, text="Metrônomo:").pack(side="left"); ctk.CTkSwitch(metronome_frame, text="", variable=app_instance.is_metronome_on, onvalue=True, offvalue=False, progress_color=COR_DESTAQUE).pack(side="left", padx=5)
+        monitor_frame = ctk.CTkFrame(self, fg_color="transparent"); monitor_frame.pack(side="left", padx=10)
+        ctk.CTkLabel(monitor_frame, text="Monitorar entrada:").pack(side="left"); ctk.CTkSwitch(monitor_frame, text="", variable=app_instance.monitor_input, onvalue=True, offvalue=False, progress_color=COR_DESTAQUE).pack(side="left", padx=5)
+        self.time_label = ctk.CTkLabel(self, text="00:00.000", width=80, font=("Consolas", 14), text_color=COR_TEXTO); self.time_label.pack(side="left", padx=10)
+        self._shown_time = "00:00.000"
+    def set_time(self, seconds):
+        # Chamado na taxa de quadros: só reconfigura o label quando o texto muda
+        minutes, seconds = divmod(max(0.0, seconds), 60); text = f"{int(minutes):02d}:{seconds:06.3f}"
+        if text != self._shown_time: self._shown_time = text; self.time_label.configure(text=text)
+
+class LoadProgressFrame(ctk.CTkFrame):
+    # Progresso do carregamento de projeto em segundo plano; fica escondido fora disso
+    def __init__(self, master):
+        super().__init__(master, fg_color="transparent")
+        self.label = ctk.CTkLabel(self, text="", font=("Arial", 10), text_color=COR_TEXTO); self.label.pack(side="left", padx=(0, 5))
+        self.bar = ctk.CTkProgressBar(self, width=140, progress_color=COR_DESTAQUE); self.bar.pack(side="left"); self.bar.set(0)
+    def set_progress(self, text, done, total):
+        self.label.configure(text=f"{text} {done}/{total}"); self.bar.set(done / total if total else 0)
+
+class PerformancePanel(ctk.CTkFrame):
+    # Carga de DSP, pior callback e xruns do stream atual, lidos do monitor na taxa de quadros
+    def __init__(self, master, app_instance):
+        super().__init__(master, fg_color="transparent")
+        self.load_label = ctk.CTkLabel(self, text="DSP 0%", width=70, font=("Arial", 10), text_color=COR_TEXTO); self.load_label.pack(side="left")
+        self.worst_label = ctk.CTkLabel(self, text="pior 0.0 ms", width=80, font=("Arial", 10), text_color=COR_TEXTO); self.worst_label.pack(side="left", padx=5)
+        self.xrun_label = ctk.CTkLabel(self, text="xruns 0", width=60, font=("Arial", 10), text_color=COR_TEXTO); self.xrun_label.pack(side="left")
+        ctk.CTkButton(self, text="Trace", width=50, height=24, command=app_instance.dump_callback_trace, corner_radius=6, fg_color=COR_PAINEL, hover_color="#4A4A4A").pack(side="left", padx=5)
+        self._shown = {}
+    def _set(self, label, text, color=COR_TEXTO):
+        if self._shown.get(label) != (text, color): self._shown[label] = (text, color); label.configure(text=text, text_color=color)
+    def update_stats(self, stats):
+        load = stats["dsp_load_percent"]
+        self._set(self.load_label, f"DSP {load:.0f}%", "#E74C3C" if load > 80 else COR_TEXTO)
+        self._set(self.worst_label, f"pior {stats['worst_callback_ms']:.1f} ms", "#E74C3C" if stats["worst_load_percent"] > 100 else COR_TEXTO)
+        xruns = stats["output_underflows"] + stats["input_overflows"]
+        self._set(self.xrun_label, f"xruns {xruns}", "#E74C3C" if xruns else COR_TEXTO)
 
 class AccordionCategory(ctk.CTkFrame):
     def __init__(self, master, title):
@@ -1,29 +1,48 @@
 import os
 import numpy as np
-from scipy.io.wavfile import read
+from cache import clip_store
+from media import media_index
+
+SAMPLE_RATE = 44100
+CHANNELS = int(os.environ.get("DAW_CHANNELS", "1"))  # 2 = motor em estéreo
 
 class Clip:
-    def __init__(self, audio_file_path):
-        self.audio_file_path = audio_file_path
-        self.waveform_image_path = audio_file_path.replace(".wav", ".png")
+    def __init__(self, audio_file_path, media=None):
         self.trim_start_ratio = 0.0
         self.trim_end_ratio = 1.0
-        
-        try:
-            samplerate, data = read(self.audio_file_path)
-            self.duration_samples = len(data)
-            self.duration_seconds = self.duration_samples / samplerate
-        except FileNotFoundError:
+        self.set_audio_file(audio_file_path, media)
+
+    def set_audio_file(self, audio_file_path, media=None):
+        # Troca o arquivo do clip (ex.: pela versão convertida no import); o trim em proporção continua valendo
+        self.audio_file_path = audio_file_path
+        self.waveform_image_path = audio_file_path.replace(".wav", ".png")
+
+        # Só o cabeçalho RIFF é lido (ou nem isso, se o índice de mídia do projeto já conhece o arquivo)
+        info = (media or media_index).info(self.audio_file_path)
+        if info is not None and info["samplerate"] > 0:
+            self.sample_rate = info["samplerate"]; self.channels = info["channels"]
+            self.duration_samples = info["frames"]
+            self.duration_seconds = self.duration_samples / info["samplerate"]
+        else:
+            self.sample_rate = 0; self.channels = 0
             self.duration_samples = 0
             self.duration_seconds = 0
-        
+
+    def _trim_bounds(self, length):
+        return int(length * self.trim_start_ratio), int(length * self.trim_end_ratio)
+
     def get_trimmed_data(self):
-        if not os.path.exists(self.audio_file_path): return np.array([], dtype=np.int16)
-        samplerate, data = read(self.audio_file_path)
-        start_sample = int(len(data) * self.trim_start_ratio)
-        end_sample = int(len(data) * self.trim_end_ratio)
+        samplerate, data = clip_store.get_raw(self.audio_file_path)
+        if data is None: return np.array([], dtype=np.int16)
+        start_sample, end_sample = self._trim_bounds(len(data))
         return data[start_sample:end_sample]
-        
+
+    def get_trimmed_float(self):
+        # Fatia sem cópia do cache float32 compartilhado (somente leitura)
+        data = clip_store.get_float(self.audio_file_path)
+        start_sample, end_sample = self._trim_bounds(len(data))
+        return data[start_sample:end_sample]
+
     def to_dict(self):
         return {
             "audio_file_path": self.audio_file_path,
@@ -33,9 +52,9 @@ class Clip:
         }
 
     @classmethod
-    def from_dict(cls, data):
-        clip = cls(data["audio_file_path"])
+    def from_dict(cls, data, media=None):
+        clip = cls(data["audio_file_path"], media)
         clip.waveform_image_path = data["waveform_image_path"]
         clip.trim_start_ratio = data["trim_start_ratio"]
         clip.trim_end_ratio = data["trim_end_ratio"]
-        return clip
\ No newline at end of file
+        return clip
@@ -0,0 +1,315 @@
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from core import SAMPLE_RATE, CHANNELS
+from lazy import lazy_import
+
+signal = lazy_import("scipy.signal")
+
+# --- EFEITOS EM BLOCOS (INSERTS DAS TRILHAS) ---
+# Cada processador recebe um bloco (frames, canais), guarda o próprio estado entre blocos e
+# devolve o bloco processado. Parâmetros mudados pela interface são aplicados no bloco seguinte.
+
+
+class BlockProcessor:
+    name = ""
+    label = ""
+    PARAMS = {}  # nome -> (rótulo, mínimo, máximo, padrão)
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, **params):
+        self.sample_rate = sample_rate; self.channels = channels; self.bypass = False
+        self.params = {name: spec[3] for name, spec in self.PARAMS.items()}
+        self.params.update({name: float(value) for name, value in params.items() if name in self.PARAMS})
+        self._dirty = True
+
+    def set_param(self, name, value):
+        self.params[name] = float(value); self._dirty = True
+
+    def process(self, block):
+        if self._dirty: self._dirty = False; self._update()
+        return self._process(block)
+
+    def _update(self): pass  # recalcula coeficientes a partir de self.params
+    def _process(self, block): return block
+    def reset(self): pass  # zera o estado interno (início do transporte)
+    def tail_samples(self): return 0  # quanto o efeito continua soando depois que a entrada para
+
+    def to_dict(self): return {"type": self.name, "params": dict(self.params), "bypass": self.bypass}
+
+
+class Delay(BlockProcessor):
+    name = "delay"; label = "Delay"
+    PARAMS = {"time": ("Tempo (s)", 0.01, 2.0, 0.5), "feedback": ("Realimentação", 0.0, 0.95, 0.4), "wet": ("Nível do eco", 0.0, 1.0, 0.6)}
+    MAX_SECONDS = 2.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._line = np.zeros((int(self.MAX_SECONDS * self.sample_rate) + 1, self.channels), dtype=np.float32); self._pos = 0
+
+    def _update(self): self._delay = max(1, min(len(self._line) - 1, int(self.params["time"] * self.sample_rate)))
+    def reset(self): self._line.fill(0); self._pos = 0
+
+    def _process(self, block):
+        out = np.empty_like(block); frames = len(block); done = 0; size = len(self._line)
+        feedback, wet = self.params["feedback"], self.params["wet"]
+        while done < frames:
+            # Em passos de no máximo `delay` amostras nada do que é lido foi escrito no mesmo passo
+            step = min(frames - done, self._delay)
+            read_idx = (self._pos - self._delay + np.arange(step)) % size
+            delayed = self._line[read_idx]; dry = block[done:done + step]
+            out[done:done + step] = dry + delayed * wet
+            self._line[(self._pos + np.arange(step)) % size] = dry + delayed * feedback
+            self._pos = (self._pos + step) % size; done += step
+        return out
+
+    def tail_samples(self):
+        feedback = self.params["feedback"]; delay = int(self.params["time"] * self.sample_rate)
+        repeats = math.log(1e-3) / math.log(feedback) if 0 < feedback < 1 else 1  # até cair 60 dB
+        return int(delay * (1 + min(repeats, 50)))
+
+
+def _biquad(kind, freq, gain_db, q, sample_rate):
+    # Coeficientes do "Audio EQ Cookbook" (RBJ), normalizados por a0, no formato sos do scipy
+    a = 10 ** (gain_db / 40.0); w0 = 2 * math.pi * min(freq, sample_rate * 0.49) / sample_rate
+    cos_w0, sin_w0 = math.cos(w0), math.sin(w0)
+    if kind == "peaking":
+        alpha = sin_w0 / (2 * q)
+        b = [1 + alpha * a, -2 * cos_w0, 1 - alpha * a]; den = [1 + alpha / a, -2 * cos_w0, 1 - alpha / a]
+    else:
+        alpha = sin_w0 / 2 * math.sqrt(2); sqrt_a = math.sqrt(a)
+        if kind == "lowshelf":
+            b = [a * ((a + 1) - (a - 1) * cos_w0 + 2 * sqrt_a * alpha), 2 * a * ((a - 1) - (a + 1) * cos_w0), a * ((a + 1) - (a - 1) * cos_w0 - 2 * sqrt_a * alpha)]
+            den = [(a + 1) + (a - 1) * cos_w0 + 2 * sqrt_a * alpha, -2 * ((a - 1) + (a + 1) * cos_w0), (a + 1) + (a - 1) * cos_w0 - 2 * sqrt_a * alpha]
+        else:
+            b = [a * ((a + 1) + (a - 1) * cos_w0 + 2 * sqrt_a * alpha), -2 * a * ((a - 1) + (a + 1) * cos_w0), a * ((a + 1) + (a - 1) * cos_w0 - 2 * sqrt_a * alpha)]
+            den = [(a + 1) - (a - 1) * cos_w0 + 2 * sqrt_a * alpha, 2 * ((a - 1) - (a + 1) * cos_w0), (a + 1) - (a - 1) * cos_w0 - 2 * sqrt_a * alpha]
+    return [b[0] / den[0], b[1] / den[0], b[2] / den[0], 1.0, den[1] / den[0], den[2] / den[0]]
+
+
+class Equalizer(BlockProcessor):
+    name = "eq"; label = "EQ (3 bandas)"
+    PARAMS = {"low_gain": ("Graves (dB)", -15.0, 15.0, 0.0), "mid_freq": ("Médios (Hz)", 200.0, 5000.0, 1000.0),
+              "mid_gain": ("Médios (dB)", -15.0, 15.0, 0.0), "high_gain": ("Agudos (dB)", -15.0, 15.0, 0.0)}
+    LOW_FREQ, HIGH_FREQ, MID_Q = 120.0, 8000.0, 0.9
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs); self._zi = np.zeros((3, 2, self.channels))
+
+    def _update(self):
+        p = self.params
+        self._sos = np.array([_biquad("lowshelf", self.LOW_FREQ, p["low_gain"], 0.707, self.sample_rate),
+                              _biquad("peaking", p["mid_freq"], p["mid_gain"], self.MID_Q, self.sample_rate),
+                              _biquad("highshelf", self.HIGH_FREQ, p["high_gain"], 0.707, self.sample_rate)])
+
+    def reset(self): self._zi = np.zeros((3, 2, self.channels))
+
+    def _process(self, block):
+        # O estado `zi` de cada seção passa de um bloco para o outro
+        out, self._zi = signal.sosfilt(self._sos, block, axis=0, zi=self._zi)
+        return out.astype(np.float32, copy=False)
+
+    def tail_samples(self): return int(0.05 * self.sample_rate)
+
+
+class Compressor(BlockProcessor):
+    name = "compressor"; label = "Compressor"
+    PARAMS = {"threshold_db": ("Limiar (dB)", -60.0, 0.0, -18.0), "ratio": ("Razão", 1.0, 20.0, 4.0), "attack": ("Ataque (s)", 0.001, 0.1, 0.01),
+              "release": ("Relaxamento (s)", 0.01, 1.0, 0.15), "makeup_db": ("Ganho (dB)", 0.0, 24.0, 0.0)}
+    SUB_BLOCK = 32  # o envelope anda em passos de 32 amostras; o ganho é interpolado amostra a amostra
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs); self._envelope_db = -120.0; self._last_gain = 1.0
+
+    def _update(self):
+        step = self.SUB_BLOCK / self.sample_rate
+        self._attack_coef = math.exp(-step / self.params["attack"]); self._release_coef = math.exp(-step / self.params["release"])
+
+    def reset(self): self._envelope_db = -120.0; self._last_gain = 1.0
+
+    def _process(self, block):
+        frames = len(block); count = -(-frames // self.SUB_BLOCK)
+        padded = np.zeros((count * self.SUB_BLOCK,), dtype=np.float32); padded[:frames] = np.max(np.abs(block), axis=1)
+        levels_db = 20.0 * np.log10(np.maximum(padded.reshape(count, self.SUB_BLOCK).max(axis=1), 1e-6))
+        envelope = np.empty(count); env = self._envelope_db
+        for i, level in enumerate(levels_db):
+            coef = self._attack_coef if level > env else self._release_coef
+            env = level + coef * (env - level); envelope[i] = env
+        self._envelope_db = env
+        p = self.params
+        reduction_db = np.maximum(envelope - p["threshold_db"], 0.0) * (1.0 - 1.0 / p["ratio"])
+        gains = 10 ** ((p["makeup_db"] - reduction_db) / 20.0)
+        # Interpola do ganho do bloco anterior até o de cada sub-bloco, sem degraus
+        anchors = np.concatenate(([self._last_gain], gains)); self._last_gain = float(gains[-1])
+        per_sample = np.interp(np.arange(1, frames + 1) / self.SUB_BLOCK, np.arange(count + 1), anchors)
+        return (block * per_sample[:, None]).astype(np.float32, copy=False)
+
+
+class ConvolutionReverb(BlockProcessor):
+    name = "reverb"; label = "Reverb (convolução)"
+    PARAMS = {"decay": ("Decaimento (s)", 0.2, 5.0, 1.5), "wet": ("Mix", 0.0, 1.0, 0.25)}
+    PARTITION = 1024
+
+    def __init__(self, *args, impulse_response=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._custom_ir = impulse_response; self._state = self._build_state(); self._dirty = False
+
+    def set_param(self, name, value):
+        # Roda na thread da interface: o mix é só um escalar; o decaimento recalcula as FFTs da IR aqui,
+        # fora do callback, e o estado novo entra com uma única troca de referência
+        self.params[name] = float(value)
+        if name == "decay" and self._custom_ir is None: self._swap_spectra(self._make_spectra())
+
+    def _make_ir(self):
+        if self._custom_ir is not None: return np.asarray(self._custom_ir, dtype=np.float32)
+        # Ruído com decaimento exponencial (-60 dB em `decay` segundos); semente fixa para ser determinístico
+        length = int(self.params["decay"] * self.sample_rate)
+        t = np.arange(length) / self.sample_rate
+        ir = np.random.default_rng(7).standard_normal(length) * np.exp(-6.91 * t / self.params["decay"])
+        return (ir / np.sqrt(np.sum(ir ** 2))).astype(np.float32)
+
+    def _make_spectra(self):
+        # Convolução particionada uniforme: IR em partições de B amostras, FFT de 2B
+        ir = self._make_ir(); b = self.PARTITION; parts = max(1, -(-len(ir) // b))
+        padded = np.zeros((parts, 2 * b), dtype=np.float32); padded[:, :b] = np.pad(ir, (0, parts * b - len(ir))).reshape(parts, b)
+        return np.fft.rfft(padded, axis=1)
+
+    def _build_state(self, spectra=None):
+        spectra = self._make_spectra() if spectra is None else spectra; b = self.PARTITION
+        return {"spectra": spectra, "fdl": np.zeros((len(spectra), self.channels, b + 1), dtype=np.complex128), "current": np.zeros((self.channels, 2 * b)),
+                "pos": 0, "base": np.zeros((self.channels, b)), "pending": np.zeros((self.channels, b + 1), dtype=np.complex128)}
+
+    def _swap_spectra(self, spectra):
+        # Mesmo número de partições: só troca as FFTs e a cauda continua; senão entra um estado novo (a cauda antiga é cortada)
+        if self._state["spectra"].shape == spectra.shape: self._state["spectra"] = spectra
+        else: self._state = self._build_state(spectra)
+
+    def reset(self):
+        for key in ("fdl", "current", "base", "pending"): self._state[key].fill(0)
+        self._state["pos"] = 0
+
+    def _complete_partition(self, s):
+        # A partição atual fechou: entra na linha de atraso e já calcula a parte do próximo período
+        # que depende só de partições passadas (`base`), deixando só H0 para o caminho direto
+        b = self.PARTITION; spectra = s["spectra"]
+        x = np.fft.rfft(s["current"], axis=1)
+        s["fdl"] = np.roll(s["fdl"], 1, axis=0); s["fdl"][0] = x
+        tail = np.fft.irfft(s["pending"] + x * spectra[0], n=2 * b, axis=1)[:, b:]
+        if len(spectra) > 1: s["pending"] = np.einsum("kcb,kb->cb", s["fdl"][:-1], spectra[1:])
+        else: s["pending"] = np.zeros_like(s["pending"])
+        s["base"] = np.fft.irfft(s["pending"], n=2 * b, axis=1)[:, :b] + tail
+        s["current"].fill(0); s["pos"] = 0
+
+    def _process(self, block):
+        s = self._state; b = self.PARTITION; frames = len(block)
+        wet = np.empty((frames, self.channels)); done = 0
+        while done < frames:
+            step = min(frames - done, b - s["pos"]); pos = s["pos"]
+            s["current"][:, pos:pos + step] = block[done:done + step].T
+            direct = np.fft.irfft(np.fft.rfft(s["current"], axis=1) * s["spectra"][0], n=2 * b, axis=1)[:, pos:pos + step]
+            wet[done:done + step] = (s["base"][:, pos:pos + step] + direct).T
+            s["pos"] += step; done += step
+            if s["pos"] == b: self._complete_partition(s)
+        mix = self.params["wet"]
+        return (block * (1.0 - mix) + wet * mix).astype(np.float32)
+
+    def tail_samples(self): return int(self.params["decay"] * self.sample_rate) + self.PARTITION
+
+
+
+def _true_peak_taps(oversample, taps):
+    # Sinc janelado (Hann) para os pontos fracionários k/oversample entre as duas amostras centrais da janela
+    half = taps // 2; columns = []
+    for k in range(1, oversample):
+        t = half - 1 + k / oversample - np.arange(taps)
+        h = np.sinc(t) * (0.5 + 0.5 * np.cos(np.pi * t / (half + 1))); columns.append(h / h.sum())
+    return np.array(columns, dtype=np.float32).T  # (taps, oversample - 1)
+
+
+class LookaheadLimiter(BlockProcessor):
+    # Limitador do master: o áudio sai atrasado por um tempo fixo curto e o ganho começa a cair antes
+    # de cada pico (verdadeiro, estimado com 4x de sobreamostragem), então nada passa do teto e não é
+    # preciso ter o mix inteiro para normalizar. Não entra nos inserts: o atraso desalinharia as trilhas.
+    name = "limiter"; label = "Limitador"
+    PARAMS = {"ceiling_db": ("Teto (dB)", -12.0, 0.0, -1.0), "release": ("Relaxamento (s)", 0.005, 1.0, 0.05)}
+    LOOKAHEAD_MS = 1.5
+    OVERSAMPLE = 4; TAPS = 32
+    TRUE_PEAK_MARGIN_DB = 0.5  # a modulação do ganho espalha energia perto de Nyquist que o filtro curto não enxerga
+    SUB_BLOCK = 16  # o relaxamento anda em passos de 16 amostras; a média móvel suaviza os degraus
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookahead = max(1, int(round(self.LOOKAHEAD_MS * self.sample_rate / 1000.0)))
+        self._taps = _true_peak_taps(self.OVERSAMPLE, self.TAPS)
+        self.reset()
+
+    def latency_samples(self): return self.lookahead + self.TAPS // 2  # atraso fixo entre entrada e saída
+    def tail_samples(self): return self.latency_samples()
+
+    def reset(self):
+        self._history = np.zeros((self.TAPS - 1, self.channels), dtype=np.float32)
+        self._delay_line = np.zeros((self.latency_samples(), self.channels), dtype=np.float32)
+        self._required = np.ones(self.lookahead, dtype=np.float32); self._smoothing = np.ones(self.lookahead, dtype=np.float64)
+        self._envelope = 1.0
+
+    def _update(self):
+        self._ceiling = 10 ** ((self.params["ceiling_db"] - self.TRUE_PEAK_MARGIN_DB) / 20.0)
+        self._release_coef = math.exp(-self.SUB_BLOCK / (self.params["release"] * self.sample_rate))
+
+    def _process(self, block):
+        frames = len(block); lookahead = self.lookahead
+        if frames == 0: return block
+        # Pico verdadeiro por amostra: a amostra central da janela e os pontos interpolados logo depois dela
+        extended = np.concatenate((self._history, block)); self._history = extended[-(self.TAPS - 1):].copy()
+        windows = sliding_window_view(extended, self.TAPS, axis=0)  # (frames, canais, taps)
+        peaks = np.maximum(np.abs(windows @ self._taps).max(axis=(1, 2)), np.abs(extended[self.TAPS // 2 - 1:self.TAPS // 2 - 1 + frames]).max(axis=1))
+        required = np.minimum(1.0, self._ceiling / np.maximum(peaks, 1e-9)).astype(np.float32)
+        # Mínimo nas últimas lookahead+1 amostras: cada pico segura o ganho até sair da janela
+        required = np.concatenate((self._required, required)); self._required = required[-lookahead:].copy()
+        held = sliding_window_view(required, lookahead + 1).min(axis=1)
+        # Relaxamento exponencial por sub-bloco; o ataque é imediato (o atraso já dá o tempo de descer)
+        starts = np.arange(0, frames, self.SUB_BLOCK); targets = np.minimum.reduceat(held, starts)
+        envelope = np.empty(len(targets), dtype=np.float32); env = self._envelope; coef = self._release_coef
+        for i, target in enumerate(targets):
+            env = target if target < env else target + coef * (env - target); envelope[i] = env
+        self._envelope = env
+        gains = np.minimum(held, np.repeat(envelope, self.SUB_BLOCK)[:frames])
+        # Média móvel do mesmo tamanho da janela: rampa suave que chega ao ganho pedido exatamente no pico
+        gains = np.concatenate((self._smoothing, gains)); self._smoothing = gains[-lookahead:].copy()
+        sums = np.concatenate(([0.0], np.cumsum(gains))); smoothed = (sums[lookahead + 1:] - sums[:-(lookahead + 1)]) / (lookahead + 1)
+        delayed = np.concatenate((self._delay_line, block)); self._delay_line = delayed[-len(self._delay_line):].copy()
+        return (delayed[:frames] * smoothed[:, None]).astype(np.float32)
+
+
+PROCESSORS = {cls.name: cls for cls in (Delay, Equalizer, Compressor, ConvolutionReverb)}
+
+
+def processor_from_dict(data, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    processor = PROCESSORS[data["type"]](sample_rate, channels, **data.get("params", {}))
+    processor.bypass = data.get("bypass", False)
+    return processor
+
+
+class EffectChain:
+    def __init__(self, processors=None):
+        self.processors = list(processors or [])
+
+    # A lista é trocada inteira (cópia na escrita) para o callback nunca ver uma lista pela metade
+    def add(self, processor): self.processors = self.processors + [processor]
+    def remove(self, processor): self.processors = [p for p in self.processors if p is not processor]
+
+    def process(self, block):
+        for processor in self.processors:
+            if not processor.bypass: block = processor.process(block)
+        return block
+
+    def reset(self):
+        for processor in self.processors: processor.reset()
+
+    def tail_samples(self): return sum(p.tail_samples() for p in self.processors if not p.bypass)
+
+    def to_list(self): return [p.to_dict() for p in self.processors]
+
+    @classmethod
+    def from_list(cls, data, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        return cls([processor_from_dict(d, sample_rate, channels) for d in data])
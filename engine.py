@@ -0,0 +1,112 @@
+import numpy as np
+from cache import pcm_to_float32
+from core import SAMPLE_RATE, CHANNELS
+from dsp import LookaheadLimiter
+from arrangement import TrackIndex
+
+BLOCK_SIZE = 1024
+
+
+def fit_channels(block, channels):
+    # Adapta um bloco (n,) ou (n, c) ao número de canais de saída
+    if block.ndim == 1: return block[:, None]
+    if block.shape[1] == channels: return block
+    if channels == 1: return block.mean(axis=1, keepdims=True)
+    return np.repeat(block[:, :1], channels, axis=1)
+
+
+class ArrangementEngine:
+    def __init__(self, arrangement_data, mixer, bpm, sample_rate=SAMPLE_RATE, channels=CHANNELS, metronome=None, meters=None, frozen_source=None):
+        # `frozen_source(clip, trilha)` devolve a render congelada do clip (ou None) para trilhas em freeze
+        self.sample_rate = sample_rate; self.channels = channels; self.mixer = mixer; self.metronome = metronome; self.meters = meters
+        self.position = 0; self.finished = False; self._stop_requested = False
+        # Overdub (stream duplex): `input_sink(indata, frames, time, status)` recebe a captura e, com `monitor_track`,
+        # a entrada entra no mix pela linha dessa trilha (volume, mute, solo e efeitos valem para o retorno)
+        self.input_sink = None; self.monitor_track = None; self.stop_at_end = True
+        self.prerender = None  # PrerenderScheduler: as linhas das trilhas chegam prontas (com inserts) das threads de trabalho
+        self.transport = None  # TransportClock que recebe a posição de cada bloco com o horário do dispositivo
+        # Sem arredondar: o metrônomo usa o mesmo passo fracionário, então clips e cliques ficam na mesma grade
+        samples_per_beat = sample_rate * 60.0 / bpm if bpm > 0 else 0
+        # Só lê metadados aqui: as amostras são lidas do memmap bloco a bloco, dentro do callback.
+        # Trilhas mudas entram também, para que desmutar durante a reprodução funcione.
+        regions = []
+        for item in arrangement_data:
+            clip, track_index = item["clip"], item["track_index"]
+            if track_index >= mixer.num_tracks: continue
+            data = frozen_source(clip, track_index) if frozen_source else None
+            if data is None: data = clip.get_trimmed_data()
+            if data.size == 0: continue
+            start_sample = int(round(item["start_beat"] * samples_per_beat))
+            regions.append({"data": data, "start": start_sample, "end": start_sample + len(data), "track_index": track_index})
+        regions.sort(key=lambda r: r["start"])
+        self.regions = regions
+        # Mesmo índice por trilha do arranjo: cada bloco só visita as regiões que se sobrepõem a ele
+        per_track = {}
+        for region in regions: per_track.setdefault(region["track_index"], []).append((region["start"], region["end"], region))
+        self._index = {track_index: TrackIndex(spans) for track_index, spans in per_track.items()}
+        self.total_samples = max(region["end"] for region in regions) if regions else 0
+        self.limiter = LookaheadLimiter(sample_rate, channels)  # master: o mix nunca passa do teto, bloco a bloco
+        self.end_sample = self.total_samples + mixer.tail_samples() + self.limiter.tail_samples() if regions else 0  # deixa as caudas dos efeitos soarem
+        self._tracks_buffer = np.zeros((mixer.num_tracks, BLOCK_SIZE, channels), dtype=np.float32)
+
+    def regions_in_range(self, t0, t1, tracks=None):
+        # Regiões que se sobrepõem a [t0, t1) nas trilhas pedidas (todas se None)
+        index = self._index; result = []
+        for track_index in (index if tracks is None else tracks):
+            track = index.get(track_index)
+            if track: result.extend(track.overlapping(t0, t1))
+        return result
+
+    def render_tracks(self, t0, frames):
+        # Preenche uma linha pré-fader por trilha com o trecho [t0, t0 + frames)
+        if self._tracks_buffer.shape[1] < frames: self._tracks_buffer = np.zeros((self.mixer.num_tracks, frames, self.channels), dtype=np.float32)
+        tracks = self._tracks_buffer[:, :frames]; tracks.fill(0); t1 = t0 + frames
+        for region in self.regions_in_range(t0, t1):
+            src0 = max(t0, region["start"]); src1 = min(t1, region["end"])
+            block = pcm_to_float32(np.asarray(region["data"][src0 - region["start"]:src1 - region["start"]]))
+            tracks[region["track_index"], src0 - t0:src1 - t0] += fit_channels(block, self.channels)
+        return tracks
+
+    def track_source(self, track_index):
+        # Fonte de uma trilha só para a pré-renderização: soma em `out` as regiões dela em [t0, t0 + len(out))
+        index = self._index.get(track_index)
+        def source(out, t0):
+            if index is None: return
+            t1 = t0 + len(out)
+            for region in index.overlapping(t0, t1):
+                src0 = max(t0, region["start"]); src1 = min(t1, region["end"])
+                out[src0 - t0:src1 - t0] += fit_channels(pcm_to_float32(np.asarray(region["data"][src0 - region["start"]:src1 - region["start"]])), self.channels)
+        return source
+
+    def track_indices(self): return sorted(self._index)
+
+    def render(self, out, t0, live_input=None):
+        # Mix pós-fader do trecho [t0, t0 + len(out)) em `out` (frames, canais)
+        if self.prerender is not None and live_input is None: return self.mixer.mix(self.prerender.read(t0, len(out)), out, self.meters, apply_inserts=False, position=t0)
+        tracks = self.render_tracks(t0, len(out)); monitor_track = self.monitor_track
+        if live_input is not None and monitor_track is not None and monitor_track < len(tracks): tracks[monitor_track] += fit_channels(live_input, self.channels)
+        return self.mixer.mix(tracks, out, self.meters, position=t0)
+
+    def output_latency_samples(self): return self.limiter.latency_samples()  # atraso fixo do look-ahead do master
+
+    def seek(self, sample): self.position = max(0, int(sample)); self.limiter.reset()
+    def stop(self): self._stop_requested = True
+
+    def callback(self, outdata, frames, time, status):
+        if self.transport: self.transport.publish(self.position, time, frames)
+        self._process(outdata, frames)
+
+    def duplex_callback(self, indata, outdata, frames, time, status):
+        # Reprodução e captura no mesmo stream: os dois lados andam com o mesmo relógio de amostras
+        if self.transport: self.transport.publish(self.position, time, frames)
+        if self.input_sink: self.input_sink(indata, frames, time, status)
+        self._process(outdata, frames, indata)
+
+    def _process(self, outdata, frames, live_input=None):
+        if self._stop_requested or (self.stop_at_end and self.position >= self.end_sample):
+            outdata.fill(0); self.finished = True
+            return
+        self.render(outdata, self.position, live_input)
+        if self.metronome: self.metronome.render(outdata, self.position)
+        outdata[:] = self.limiter.process(outdata)
+        self.position += frames
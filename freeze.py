@@ -0,0 +1,91 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+from core import SAMPLE_RATE, CHANNELS
+from dsp import EffectChain
+from engine import BLOCK_SIZE, fit_channels
+from media import content_digest
+
+# --- CONGELAMENTO DE TRILHAS (FREEZE) ---
+# A trilha é renderizada uma vez com os efeitos para um arquivo float32 no cache em disco.
+# A chave é o hash do conteúdo do áudio + trim + parâmetros dos efeitos, então a mesma render
+# é reaproveitada entre execuções e projetos; as renders mais antigas saem quando o cache passa do orçamento.
+
+DEFAULT_FREEZE_DIR = os.environ.get("DAW_FREEZE_DIR", "freeze_cache")
+DEFAULT_DISK_BUDGET_MB = int(os.environ.get("DAW_FREEZE_CACHE_MB", "2048"))
+
+
+class FreezeCache:
+    def __init__(self, directory=DEFAULT_FREEZE_DIR, disk_budget_bytes=DEFAULT_DISK_BUDGET_MB * 1024 * 1024, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        self.directory = directory; self.disk_budget_bytes = disk_budget_bytes
+        self.sample_rate = sample_rate; self.channels = channels
+
+    def key_for(self, clip, effects):
+        source = content_digest(clip.audio_file_path)
+        if source is None: return None
+        description = {"source": source, "trim": [clip.trim_start_ratio, clip.trim_end_ratio], "effects": effects, "sample_rate": self.sample_rate, "channels": self.channels}
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def path_for(self, key): return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        # Render já existente, mapeada em memória (float32, (frames, canais)), ou None
+        path = self.path_for(key)
+        try: data = np.load(path, mmap_mode="r")
+        except (OSError, ValueError): return None
+        try: os.utime(path)  # marca como usada recentemente para a remoção por idade
+        except OSError: pass
+        return data
+
+    def put(self, key, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key); temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f: np.save(f, np.ascontiguousarray(data, dtype=np.float32))
+        os.replace(temp_path, path)  # outra thread nunca vê um arquivo pela metade
+        self.evict(keep=path)
+        return np.load(path, mmap_mode="r")
+
+    def evict(self, keep=None):
+        # Apaga as renders menos usadas até o total caber no orçamento
+        try: names = [n for n in os.listdir(self.directory) if n.endswith(".npy")]
+        except OSError: return
+        entries = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try: stat = os.stat(path)
+            except OSError: continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(); total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.disk_budget_bytes: break
+            if path == keep: continue
+            try: os.remove(path); total -= size
+            except OSError as e: print(f"Aviso: não foi possível apagar a render congelada {path} ({e}); o cache pode passar do orçamento")
+
+    def render(self, clip, effects):
+        # Passa o clip pela cadeia em blocos, como no callback, e deixa a cauda dos efeitos soar até o fim
+        chain = EffectChain.from_list(effects, self.sample_rate, self.channels)
+        source = clip.get_trimmed_float()
+        total = len(source) + (chain.tail_samples() if len(source) else 0)
+        out = np.zeros((total, self.channels), dtype=np.float32); block = np.zeros((BLOCK_SIZE, self.channels), dtype=np.float32)
+        for t0 in range(0, total, BLOCK_SIZE):
+            frames = min(BLOCK_SIZE, total - t0); block.fill(0)
+            chunk = source[t0:t0 + frames]
+            if len(chunk): block[:len(chunk)] = fit_channels(chunk, self.channels)
+            out[t0:t0 + frames] = chain.process(block[:frames])
+        return out
+
+    def freeze(self, clip, effects):
+        # Render congelada do clip com os efeitos dados: do cache se existir, senão renderiza e guarda
+        key = self.key_for(clip, effects)
+        if key is None: return None
+        data = self.get(key)
+        if data is None: data = self.put(key, self.render(clip, effects))
+        return data
+
+
+# Instância única compartilhada pelo processo inteiro
+freeze_cache = FreezeCache()
@@ -0,0 +1,76 @@
+import os
+import math
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from core import SAMPLE_RATE, CHANNELS
+from cache import pcm_to_float32
+from media import media_index, content_digest
+from lazy import lazy_import
+
+wavfile = lazy_import("scipy.io.wavfile")
+signal = lazy_import("scipy.signal")
+
+# --- IMPORTAÇÃO PARA O FORMATO DO PROJETO ---
+# O motor só soma blocos na taxa e no número de canais do projeto. Arquivos em outra taxa,
+# com outro número de canais ou em 24 bits são convertidos uma vez (reamostragem polifásica)
+# para um WAV float32 no cache de importação, cuja chave é o hash do conteúdo de origem.
+
+DEFAULT_IMPORT_DIR = os.environ.get("DAW_IMPORT_DIR", "imported")
+NATIVE_DTYPES = ("int16", "float32")
+
+
+def needs_conversion(info, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    return info["samplerate"] != sample_rate or info["channels"] != channels or info["dtype"] not in NATIVE_DTYPES
+
+
+def convert_channels(data, channels):
+    # (frames, c) -> (frames, channels): mono é duplicado, o excedente é mixado (mono) ou descartado
+    if data.shape[1] == channels: return data
+    if channels == 1: return data.mean(axis=1, keepdims=True)
+    if data.shape[1] == 1: return np.repeat(data, channels, axis=1)
+    if data.shape[1] > channels: return data[:, :channels]
+    return np.concatenate([data, np.repeat(data[:, -1:], channels - data.shape[1], axis=1)], axis=1)
+
+
+def convert_audio(data, source_rate, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    data = pcm_to_float32(np.asarray(data))
+    if data.ndim == 1: data = data[:, None]
+    data = convert_channels(data, channels)
+    if source_rate != sample_rate:
+        g = math.gcd(int(source_rate), int(sample_rate))
+        data = signal.resample_poly(data, sample_rate // g, source_rate // g, axis=0)
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+
+def imported_path_for(digest, sample_rate=SAMPLE_RATE, channels=CHANNELS, directory=DEFAULT_IMPORT_DIR):
+    return os.path.join(directory, f"{digest}_{sample_rate}_{channels}ch.wav")
+
+
+def import_audio(path, sample_rate=SAMPLE_RATE, channels=CHANNELS, directory=DEFAULT_IMPORT_DIR):
+    # Caminho de um WAV no formato do projeto: o próprio arquivo se já estiver, senão a conversão em cache
+    info = media_index.info(path)
+    if info is None: raise ValueError(f"{path}: arquivo de áudio inválido")
+    if not needs_conversion(info, sample_rate, channels): return path
+    target = imported_path_for(content_digest(path), sample_rate, channels, directory)
+    if os.path.exists(target): return target
+    source_rate, data = wavfile.read(path)
+    converted = convert_audio(data, source_rate, sample_rate, channels)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f: wavfile.write(f, sample_rate, converted[:, 0] if channels == 1 else converted)
+    os.replace(temp_path, target)  # importações concorrentes do mesmo arquivo gravam o mesmo resultado
+    return target
+
+
+def _import_job(path):
+    try: return import_audio(path)
+    except Exception as e: print(f"Erro ao importar {path}: {e}"); return None
+
+
+def import_batch(paths, jobs=None):
+    # Converte vários arquivos em paralelo (um processo por núcleo); None no lugar dos que falharam
+    paths = list(paths)
+    if len(paths) <= 1: return [_import_job(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs) as executor: return list(executor.map(_import_job, paths))
@@ -0,0 +1,43 @@
+import importlib
+import threading
+import time
+
+# --- IMPORTAÇÃO PREGUIÇOSA E MEDIÇÃO DO TEMPO DE INICIALIZAÇÃO ---
+
+_startup_marks = []
+
+
+def mark_startup(label):
+    # Registra um ponto da inicialização; o --profile-startup imprime as diferenças entre eles
+    _startup_marks.append((label, time.perf_counter()))
+
+
+def startup_report():
+    lines = []
+    for (_, previous), (label, current) in zip(_startup_marks, _startup_marks[1:]):
+        lines.append(f"  {label:<40} {1000 * (current - previous):8.1f} ms")
+    total = 1000 * (_startup_marks[-1][1] - _startup_marks[0][1]) if len(_startup_marks) > 1 else 0.0
+    return lines, total
+
+
+class LazyModule:
+    # Só importa o módulo de verdade no primeiro acesso a um atributo
+    def __init__(self, name):
+        self._name = name; self._module = None; self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    _lazy_import_times[self._name] = time.perf_counter() - start
+        return self._module
+
+    def __getattr__(self, attr): return getattr(self._load(), attr)
+
+
+_lazy_import_times = {}
+
+
+def lazy_import(name): return LazyModule(name)
@@ -1,11 +1,38 @@
+import sys
+from lazy import mark_startup, startup_report, _lazy_import_times
+
+mark_startup("início")
 import customtkinter as ctk
+mark_startup("import customtkinter")
 from app import App # Importa nossa classe principal do arquivo app.py
+mark_startup("import app (core, views, componentes)")
+
+# Orçamento de inicialização: o --profile-startup falha (código 1) se a janela demorar mais que isso
+STARTUP_BUDGET_MS = 1500
+
+def _print_startup_profile(app):
+    mark_startup("primeira renderização da janela")
+    lines, total = startup_report()
+    print("--- Tempo de inicialização ---")
+    for line in lines: print(line)
+    for name, seconds in _lazy_import_times.items(): print(f"  (preguiçoso) import {name:<27} {1000 * seconds:8.1f} ms")
+    status = "OK" if total <= STARTUP_BUDGET_MS else "ACIMA DO ORÇAMENTO"
+    print(f"  {'total':<40} {total:8.1f} ms (orçamento {STARTUP_BUDGET_MS} ms: {status})")
+    app.startup_exit_code = 0 if total <= STARTUP_BUDGET_MS else 1
+    app.destroy()
 
 # --- PONTO DE ENTRADA DO PROGRAMA ---
 if __name__ == "__main__":
+    profile_startup = "--profile-startup" in sys.argv
+
     # Define o tema antes de criar a janela principal
     ctk.set_appearance_mode("dark")
     ctk.set_default_color_theme("blue")
-    
+
     app = App()
-    app.mainloop()
\ No newline at end of file
+    mark_startup("App.__init__")
+    if profile_startup:
+        app.startup_exit_code = 0
+        app.after_idle(lambda: app.after(0, _print_startup_profile, app))
+    app.mainloop()
+    if profile_startup: sys.exit(app.startup_exit_code)
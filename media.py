@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import struct
+import threading
+
+# --- METADADOS DE ÁUDIO SÓ PELO CABEÇALHO ---
+# Duração, taxa e formato de um WAV saem dos chunks "fmt " e "data" do RIFF, sem ler amostras.
+# O índice de mídia guarda esses metadados por arquivo (validados por mtime/tamanho) e é salvo
+# ao lado do .dawpe, então abrir um projeto não depende do tamanho total do áudio.
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+MEDIA_INDEX_VERSION = 1
+HASH_CHUNK_BYTES = 1 << 20
+
+_digests = {}; _digests_lock = threading.Lock()  # (caminho, mtime, tamanho) -> hash do conteúdo
+
+
+def _dtype_name(format_tag, bits):
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT: return {32: "float32", 64: "float64"}.get(bits)
+    if format_tag == WAVE_FORMAT_PCM: return {8: "uint8", 16: "int16", 24: "int24", 32: "int32"}.get(bits)
+    return None
+
+
+def probe_wav(path):
+    # Lê só os cabeçalhos dos chunks (pula os dados com seek); ValueError se não for um WAV suportado
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] not in (b"RIFF", b"RF64") or riff[8:12] != b"WAVE": raise ValueError(f"{path}: não é um arquivo WAV")
+        fmt = None; data_size = None
+        while fmt is None or data_size is None:
+            header = f.read(8)
+            if len(header) < 8: break
+            chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:])[0]
+            if chunk_id == b"fmt ":
+                body = f.read(chunk_size); fmt = struct.unpack("<HHIIHH", body[:16])
+                if fmt[0] == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26: fmt = (struct.unpack("<H", body[24:26])[0],) + fmt[1:]
+                if chunk_size % 2: f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                data_size = chunk_size
+                if data_size in (0, 0xFFFFFFFF): data_size = stat.st_size - f.tell()  # gravação interrompida antes do cabeçalho final
+            else: f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    if fmt is None or data_size is None: raise ValueError(f"{path}: WAV sem chunk fmt/data")
+    format_tag, channels, samplerate, _, block_align, bits = fmt
+    dtype = _dtype_name(format_tag, bits)
+    if dtype is None or channels == 0 or block_align == 0: raise ValueError(f"{path}: formato WAV não suportado ({format_tag}, {bits} bits)")
+    data_size = min(data_size, stat.st_size)
+    return {"samplerate": samplerate, "channels": channels, "frames": data_size // block_align, "dtype": dtype, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def content_digest(path):
+    # Hash do conteúdo do arquivo (chave dos caches de import e de freeze); só relê se mtime/tamanho mudaram
+    try: stat = os.stat(path)
+    except OSError: return None
+    signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _digests_lock: digest = _digests.get(signature)
+    if digest is None:
+        hasher = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""): hasher.update(chunk)
+        digest = hasher.hexdigest()
+        with _digests_lock: _digests[signature] = digest
+    return digest
+
+
+def media_index_path_for(project_path): return os.path.splitext(project_path)[0] + ".media.json"
+
+
+class MediaIndex:
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})  # caminho absoluto -> metadados de probe_wav
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def info(self, path):
+        # Metadados do arquivo, ou None se não existir/não for WAV; só relê o cabeçalho se mtime/tamanho mudaram
+        key = os.path.abspath(path)
+        try: stat = os.stat(key)
+        except OSError: return None
+        with self._lock: entry = self.entries.get(key)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size: return entry
+        try: entry = probe_wav(key)
+        except (OSError, ValueError, struct.error) as e: print(f"Erro ao ler o cabeçalho de {path}: {e}"); return None
+        with self._lock: self.entries[key] = entry; self.probes += 1
+        return entry
+
+    def subset(self, paths):
+        keys = {os.path.abspath(p) for p in paths}
+        with self._lock: return MediaIndex({k: v for k, v in self.entries.items() if k in keys})
+
+    def merge(self, other):
+        with self._lock: self.entries.update(other.entries)
+
+    def save(self, index_path):
+        with self._lock: payload = {"version": MEDIA_INDEX_VERSION, "files": dict(self.entries)}
+        try:
+            with open(index_path, "w") as f: json.dump(payload, f, indent=1)
+        except OSError as e: print(f"Não foi possível salvar o índice de mídia: {e}")
+
+    @classmethod
+    def load(cls, index_path):
+        # Índice ausente, corrompido ou de outra versão vira um índice vazio (tudo é relido do cabeçalho)
+        try:
+            with open(index_path, "r") as f: payload = json.load(f)
+        except (OSError, ValueError): return cls()
+        if not isinstance(payload, dict) or payload.get("version") != MEDIA_INDEX_VERSION: return cls()
+        return cls(payload.get("files", {}))
+
+
+# Índice do processo: reúne os metadados de todos os arquivos já vistos
+media_index = MediaIndex()
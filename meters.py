@@ -0,0 +1,87 @@
+import math
+import numpy as np
+
+from core import SAMPLE_RATE
+
+# --- MEDIDORES COMPARTILHADOS ENTRE O CALLBACK E A INTERFACE ---
+# O callback escreve direto num array pré-alocado (uma linha por trilha + a última para o master);
+# a interface só lê esse array na taxa de quadros. Sem fila e sem lock: no pior caso a tela mostra
+# um valor de um bloco atrás. Cada bloco também fica num histórico curto marcado com a amostra em que
+# começa, para a interface mostrar o nível do que está soando (posição do transporte) e não o do
+# bloco recém-calculado, que está adiantado pela latência de saída e pelo look-ahead do limitador.
+
+PEAK, RMS, HOLD = 0, 1, 2
+ATTACK_SECONDS = 0.005
+RELEASE_SECONDS = 0.3  # queda de ~20 dB em 1,5 s
+HOLD_SECONDS = 1.5
+METER_FLOOR_DB = -60.0
+HISTORY_BLOCKS = 32  # ~0,7 s em blocos de 1024: cobre a latência de saída de qualquer driver razoável
+
+
+def amplitude_to_meter(amplitude):
+    # Converte amplitude linear para a posição 0..1 da barra, em escala de dB
+    if amplitude <= 0: return 0.0
+    db = 20.0 * math.log10(amplitude)
+    return min(1.0, max(0.0, (db - METER_FLOOR_DB) / -METER_FLOOR_DB))
+
+
+def amplitude_to_db_text(amplitude):
+    if amplitude <= 10 ** (METER_FLOOR_DB / 20.0): return "-inf"
+    return f"{20.0 * math.log10(amplitude):.1f}"
+
+
+def block_levels(block):
+    # Pico e RMS de um bloco (frames,) ou (frames, canais)
+    if block.size == 0: return 0.0, 0.0
+    return float(np.max(np.abs(block))), float(np.sqrt(np.mean(np.square(block))))
+
+
+class MeterBank:
+    def __init__(self, num_tracks=0, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.resize(num_tracks)
+
+    def resize(self, num_tracks):
+        # Troca os arrays de uma vez; um callback em andamento termina com os antigos e é ignorado
+        values = np.zeros((num_tracks + 1, 3), dtype=np.float32); hold_age = np.zeros(num_tracks + 1, dtype=np.float32)
+        self._levels = (np.zeros(num_tracks + 1, dtype=np.float32), np.zeros(num_tracks + 1, dtype=np.float32))  # rascunho do callback
+        self._history = np.zeros((HISTORY_BLOCKS, num_tracks + 1, 3), dtype=np.float32); self._positions = np.full(HISTORY_BLOCKS, -1, dtype=np.int64); self._slot = 0
+        self._hold_age = hold_age; self.values = values
+
+    @property
+    def master_index(self): return len(self.values) - 1
+
+    def new_levels(self):
+        # Arrays (picos, rms) do tamanho certo para o callback preencher; os mesmos a cada bloco, só zerados
+        peaks, rms = self._levels; peaks.fill(0); rms.fill(0)
+        return peaks, rms
+
+    def update(self, peaks, rms, frames, position=None):
+        # Aplica a balística (ataque/relaxamento) e o peak-hold a todas as linhas de uma vez;
+        # `position` é a amostra do transporte onde o bloco começa
+        values, hold_age, history, positions = self.values, self._hold_age, self._history, self._positions
+        if len(peaks) != len(values) or history.shape[1] != len(values): return
+        dt = frames / self.sample_rate
+        attack = 1.0 - math.exp(-dt / ATTACK_SECONDS); release = math.exp(-dt / RELEASE_SECONDS)
+        for column, new in ((PEAK, peaks), (RMS, rms)):
+            current = values[:, column]
+            values[:, column] = np.where(new > current, current + (new - current) * attack, np.maximum(new, current * release))
+        hold = values[:, HOLD]
+        hit = peaks >= hold
+        hold[hit] = peaks[hit]; hold_age[hit] = 0.0; hold_age[~hit] += dt
+        expired = hold_age > HOLD_SECONDS
+        hold[expired] *= release
+        if position is not None:
+            slot = self._slot; history[slot] = values; positions[slot] = position; self._slot = (slot + 1) % len(positions)
+
+    def reset(self):
+        self.values[:] = 0.0; self._hold_age[:] = 0.0; self._positions[:] = -1
+
+    def snapshot(self, position=None):
+        # Com `position`, o último bloco que começou até essa amostra; sem histórico que a cubra, o mais recente
+        if position is not None:
+            positions = self._positions; history = self._history
+            candidates = np.where((positions >= 0) & (positions <= position), positions, -1)
+            slot = int(np.argmax(candidates))
+            if candidates[slot] >= 0 and history.shape[1] == len(self.values): return history[slot].copy()
+        return self.values.copy()
@@ -0,0 +1,52 @@
+import math
+import numpy as np
+
+from core import SAMPLE_RATE
+
+# --- METRÔNOMO MIXADO DENTRO DO CALLBACK DE ÁUDIO ---
+# As batidas são posições em amostras calculadas a partir do BPM, sem sleep e sem streams extras.
+
+CLICK_SECONDS = 0.05
+BEATS_PER_BAR = 4
+
+
+class Metronome:
+    def __init__(self, bpm=120, sample_rate=SAMPLE_RATE, beats_per_bar=BEATS_PER_BAR):
+        self.sample_rate = sample_rate; self.beats_per_bar = beats_per_bar
+        self.enabled = True; self.click_strong = self.click_weak = None
+        self._origin_sample = 0; self._origin_beat = 0; self._last_position = 0
+        self.samples_per_beat = sample_rate * 60.0 / bpm if bpm > 0 else 0.0
+
+    def prepare(self):
+        # Gera os cliques na thread da interface, antes de abrir o stream
+        if self.click_strong is None:
+            t = np.arange(int(self.sample_rate * CLICK_SECONDS)) / self.sample_rate
+            self.click_strong = (0.5 * np.sin(2. * np.pi * 1200 * t)).astype(np.float32)
+            self.click_weak = (0.5 * np.sin(2. * np.pi * 880 * t)).astype(np.float32)
+
+    def reset(self, position=0):
+        self._origin_sample = position; self._origin_beat = 0; self._last_position = position
+
+    def beat_position(self, beat): return self._origin_sample + int(round((beat - self._origin_beat) * self.samples_per_beat))
+
+    def set_bpm(self, bpm):
+        # Troca de andamento sem pular: a próxima batida ainda cai onde o andamento antigo mandava
+        if bpm <= 0: self.samples_per_beat = 0.0; return
+        if self.samples_per_beat > 0:
+            next_beat = self._origin_beat + math.ceil((self._last_position - self._origin_sample) / self.samples_per_beat)
+            self._origin_sample, self._origin_beat = self.beat_position(next_beat), next_beat
+        self.samples_per_beat = self.sample_rate * 60.0 / bpm
+
+    def render(self, out, start_sample):
+        # Soma em `out` (frames, canais) os cliques que tocam no trecho [start_sample, start_sample + frames)
+        frames = len(out); self._last_position = start_sample + frames
+        if not self.enabled or self.samples_per_beat <= 0 or self.click_strong is None: return out
+        click_len = len(self.click_strong)
+        first = self._origin_beat + math.ceil((start_sample - click_len + 1 - self._origin_sample) / self.samples_per_beat)
+        last = self._origin_beat + math.floor((start_sample + frames - 1 - self._origin_sample) / self.samples_per_beat)
+        for beat in range(max(first, self._origin_beat), last + 1):
+            click = self.click_strong if beat % self.beats_per_bar == 0 else self.click_weak
+            offset = self.beat_position(beat) - start_sample
+            src0 = max(0, -offset); dst0 = max(0, offset); n = min(click_len - src0, frames - dst0)
+            if n > 0: out[dst0:dst0 + n] += click[src0:src0 + n, None]
+        return out
@@ -0,0 +1,88 @@
+import numpy as np
+
+# --- MIXER EM TEMPO REAL ---
+# Volume/mute/solo ficam em arrays compartilhados: a interface escreve, o callback lê a cada bloco.
+# O ganho muda com uma rampa linear dentro do bloco (sem cliques) e todas as trilhas são somadas
+# numa única operação vetorizada.
+
+
+class MixerState:
+    def __init__(self, num_tracks=0):
+        self.volume = np.zeros(0, dtype=np.float32); self.muted = np.zeros(0, dtype=bool); self.soloed = np.zeros(0, dtype=bool)
+        self._applied_gain = np.zeros(0, dtype=np.float32); self._ramp = np.zeros(0, dtype=np.float32)
+        self._post = np.zeros((0, 0, 0), dtype=np.float32); self._gains = np.zeros((0, 0), dtype=np.float32)  # buffers do callback, reusados
+        self.inserts = []  # EffectChain (pré-fader) de cada trilha, ou None
+        self.resize(num_tracks)
+
+    @property
+    def num_tracks(self): return len(self.volume)
+
+    def resize(self, num_tracks):
+        # Mantém os valores das trilhas que já existiam; os arrays novos entram numa única atribuição cada
+        def grown(array, fill):
+            new = np.full(num_tracks, fill, dtype=array.dtype); n = min(num_tracks, len(array)); new[:n] = array[:n]
+            return new
+        self.volume = grown(self.volume, 0.8); self.muted = grown(self.muted, False); self.soloed = grown(self.soloed, False)
+        self._applied_gain = grown(self._applied_gain, 0.0)
+        self.inserts = (self.inserts + [None] * num_tracks)[:num_tracks]
+
+    def set_volume(self, index, value):
+        if index < len(self.volume): self.volume[index] = value
+    def set_muted(self, index, value):
+        if index < len(self.muted): self.muted[index] = value
+    def set_soloed(self, index, value):
+        if index < len(self.soloed): self.soloed[index] = value
+
+    def target_gains(self):
+        # Lê cada array uma vez só: um resize vindo da interface pode trocar as referências no meio do bloco
+        volume, muted, soloed = self.volume, self.muted, self.soloed
+        n = min(len(volume), len(muted), len(soloed))
+        audible = soloed[:n] if soloed[:n].any() else ~muted[:n]
+        return volume[:n] * audible
+
+    def reset_ramps(self):
+        # Início do transporte: começa direto no ganho atual, sem rampa a partir do zero
+        self._applied_gain = self.target_gains().astype(np.float32)
+
+    def prepare_playback(self):
+        # Chamado antes de abrir o stream: zera rampas e o estado dos efeitos (caudas da execução anterior)
+        self.reset_ramps()
+        for chain in self.inserts:
+            if chain is not None: chain.reset()
+
+    def tail_samples(self):
+        return max([chain.tail_samples() for chain in self.inserts if chain is not None] + [0])
+
+    def _ramp_shape(self, frames):
+        if len(self._ramp) != frames: self._ramp = np.linspace(1.0 / frames, 1.0, frames, dtype=np.float32)
+        return self._ramp
+
+    def _buffers(self, shape):
+        # Só realoca quando muda o número de trilhas, o tamanho do bloco ou os canais
+        if self._post.shape != shape: self._post = np.zeros(shape, dtype=np.float32); self._gains = np.zeros(shape[:2], dtype=np.float32)
+        return self._post, self._gains
+
+    def mix(self, tracks, out, meters=None, apply_inserts=True, position=None):
+        # `tracks` é (trilhas, frames, canais) pré-fader; soma o pós-fader em `out` (frames, canais).
+        # Com apply_inserts=False as linhas já chegam processadas (pré-renderização em segundo plano);
+        # `position` (amostra do início do bloco) marca os níveis para os medidores seguirem o transporte
+        n, frames = tracks.shape[0], tracks.shape[1]
+        inserts = self.inserts if apply_inserts else []
+        for index in range(min(n, len(inserts))):
+            chain = inserts[index]
+            if chain is not None and chain.processors: tracks[index] = chain.process(tracks[index])
+        target = self.target_gains()[:n]; applied = self._applied_gain[:n]
+        if len(target) < n: target = np.pad(target, (0, n - len(target))); applied = np.pad(applied, (0, n - len(applied)))
+        post, gains = self._buffers(tracks.shape)
+        if np.array_equal(applied, target): np.multiply(tracks, target[:, None, None], out=post)
+        else:
+            np.multiply((target - applied)[:, None], self._ramp_shape(frames)[None, :], out=gains); gains += applied[:, None]
+            np.multiply(tracks, gains[:, :, None], out=post)
+        np.sum(post, axis=0, out=out)
+        self._applied_gain[:len(target)] = target[:len(self._applied_gain)]
+        if meters is not None:
+            peaks, rms = meters.new_levels(); count = min(n, len(peaks) - 1)
+            peaks[:count] = np.max(np.abs(post[:count]), axis=(1, 2)); rms[:count] = np.sqrt(np.mean(np.square(post[:count]), axis=(1, 2)))
+            peaks[-1] = np.max(np.abs(out)); rms[-1] = np.sqrt(np.mean(np.square(out)))
+            meters.update(peaks, rms, frames, position)
+        return out
@@ -0,0 +1,131 @@
+import os
+import struct
+import threading
+import numpy as np
+
+from cache import clip_store, pcm_to_float32
+from lazy import lazy_import
+
+Image = lazy_import("PIL.Image")
+
+# --- PIRÂMIDE DE PICOS (min/max) PARA DESENHAR FORMAS DE ONDA ---
+# O arquivo .peaks fica ao lado do .wav: cabeçalho + níveis em int8 (pares min/max por bloco)
+
+PEAKS_MAGIC = b"DAWPEAK1"
+BASE_SAMPLES_PER_BIN = 64
+LEVEL_FACTOR = 4
+NUM_LEVELS = 6  # 64, 256, 1024, 4096, 16384, 65536 amostras por bloco
+CHUNK_BINS = 16384
+
+WAVEFORM_COLOR = (0, 255, 255)  # mesmo ciano dos PNGs antigos
+WAVEFORM_BG = (0x34, 0x36, 0x38)
+
+
+def peaks_path_for(wav_path): return os.path.splitext(wav_path)[0] + ".peaks"
+
+
+class PeakPyramid:
+    def __init__(self, length, levels):
+        self.length = length
+        self.levels = levels  # lista de (amostras_por_bloco, array int8 (n, 2))
+
+    def _level_for(self, samples_per_pixel):
+        # Nível mais grosso que ainda tem pelo menos um bloco por pixel
+        chosen = self.levels[0]
+        for level in self.levels:
+            if level[0] <= samples_per_pixel: chosen = level
+        return chosen
+
+    def column_extents(self, start_ratio, end_ratio, width):
+        # Retorna (mins, maxs) em [-1, 1] com um valor por coluna de pixel
+        width = max(1, int(width))
+        start_sample = int(self.length * start_ratio); end_sample = max(start_sample + 1, int(self.length * end_ratio))
+        samples_per_bin, bins = self._level_for((end_sample - start_sample) / width)
+        if len(bins) == 0: return np.zeros(width, np.float32), np.zeros(width, np.float32)
+        edges = np.linspace(start_sample, end_sample, width + 1) / samples_per_bin
+        first = np.clip(edges[:-1].astype(np.int64), 0, len(bins) - 1)
+        last = np.clip(np.ceil(edges[1:]).astype(np.int64), first + 1, len(bins))
+        # Índices intercalados [first, last) por coluna; o elemento extra no fim deixa `last` sempre válido
+        idx = np.empty(width * 2, dtype=np.int64); idx[0::2] = first; idx[1::2] = last
+        mins = np.minimum.reduceat(np.append(bins[:, 0], 0), idx)[0::2]
+        maxs = np.maximum.reduceat(np.append(bins[:, 1], 0), idx)[0::2]
+        return mins.astype(np.float32) / 127.0, maxs.astype(np.float32) / 127.0
+
+    def to_bytes(self):
+        header = PEAKS_MAGIC + struct.pack("<QI", self.length, len(self.levels))
+        header += b"".join(struct.pack("<II", spb, len(bins)) for spb, bins in self.levels)
+        return header + b"".join(np.ascontiguousarray(bins, dtype=np.int8).tobytes() for _, bins in self.levels)
+
+    @classmethod
+    def from_bytes(cls, payload):
+        if payload[:8] != PEAKS_MAGIC: raise ValueError("arquivo de picos inválido")
+        length, num_levels = struct.unpack_from("<QI", payload, 8); offset = 20
+        shapes = [struct.unpack_from("<II", payload, offset + 8 * i) for i in range(num_levels)]; offset += 8 * num_levels
+        levels = []
+        for spb, n in shapes:
+            levels.append((spb, np.frombuffer(payload, dtype=np.int8, count=n * 2, offset=offset).reshape(n, 2))); offset += n * 2
+        return cls(length, levels)
+
+
+def compute_peaks(data):
+    # Nível base em blocos, para não converter o arquivo inteiro para float de uma vez
+    length = len(data); base = []
+    step = BASE_SAMPLES_PER_BIN * CHUNK_BINS
+    for pos in range(0, length, step):
+        chunk = pcm_to_float32(np.asarray(data[pos:pos + step]))
+        if chunk.ndim == 2: chunk_min, chunk_max = chunk.min(axis=1), chunk.max(axis=1)
+        else: chunk_min = chunk_max = chunk
+        pad = (-len(chunk)) % BASE_SAMPLES_PER_BIN
+        if pad: chunk_min = np.pad(chunk_min, (0, pad), mode="edge"); chunk_max = np.pad(chunk_max, (0, pad), mode="edge")
+        base.append(np.stack([chunk_min.reshape(-1, BASE_SAMPLES_PER_BIN).min(axis=1), chunk_max.reshape(-1, BASE_SAMPLES_PER_BIN).max(axis=1)], axis=1))
+    bins = np.concatenate(base) if base else np.zeros((0, 2), np.float32)
+    bins = np.clip(np.round(bins * 127.0), -127, 127).astype(np.int8)
+    levels = [(BASE_SAMPLES_PER_BIN, bins)]
+    for _ in range(1, NUM_LEVELS):
+        prev = levels[-1][1]
+        pad = (-len(prev)) % LEVEL_FACTOR
+        if pad: prev = np.concatenate([prev, np.repeat(prev[-1:], pad, axis=0)])
+        grouped = prev.reshape(-1, LEVEL_FACTOR, 2)
+        levels.append((levels[-1][0] * LEVEL_FACTOR, np.stack([grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)], axis=1)))
+    return PeakPyramid(length, levels)
+
+
+_memory_cache = {}; _memory_lock = threading.Lock()
+
+
+def build_peaks(wav_path):
+    # Gera (ou regenera) o arquivo .peaks a partir do WAV
+    samplerate, data = clip_store.get_raw(wav_path)
+    if data is None: return None
+    pyramid = compute_peaks(data)
+    with open(peaks_path_for(wav_path), "wb") as f: f.write(pyramid.to_bytes())
+    with _memory_lock: _memory_cache[os.path.abspath(wav_path)] = (os.path.getmtime(wav_path), pyramid)
+    return pyramid
+
+
+def get_peaks(wav_path):
+    # Usa o .peaks em disco se for mais novo que o WAV; senão recalcula
+    if not os.path.exists(wav_path): return None
+    key = os.path.abspath(wav_path); wav_mtime = os.path.getmtime(wav_path)
+    with _memory_lock: cached = _memory_cache.get(key)
+    if cached and cached[0] == wav_mtime: return cached[1]
+    sidecar = peaks_path_for(wav_path)
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= wav_mtime:
+        try:
+            with open(sidecar, "rb") as f: pyramid = PeakPyramid.from_bytes(f.read())
+            with _memory_lock: _memory_cache[key] = (wav_mtime, pyramid)
+            return pyramid
+        except (ValueError, struct.error) as e: print(f"Arquivo de picos corrompido, recalculando: {e}")
+    return build_peaks(wav_path)
+
+
+def render_waveform_image(pyramid, start_ratio, end_ratio, width, height, color=WAVEFORM_COLOR, background=WAVEFORM_BG):
+    # Desenha a forma de onda direto dos picos, uma coluna por pixel, sem reamostrar imagem
+    width, height = max(1, int(width)), max(1, int(height))
+    mins, maxs = pyramid.column_extents(start_ratio, end_ratio, width)
+    half = (height - 1) / 2.0
+    top = np.floor(half - maxs * half); bottom = np.ceil(half - mins * half)
+    rows = np.arange(height, dtype=np.float32)[:, None]
+    mask = (rows >= top[None, :]) & (rows <= bottom[None, :])
+    pixels = np.empty((height, width, 3), dtype=np.uint8); pixels[:] = background; pixels[mask] = color
+    return Image.fromarray(pixels, "RGB")
@@ -0,0 +1,83 @@
+import json
+import time
+import numpy as np
+
+from core import SAMPLE_RATE
+
+# --- INSTRUMENTAÇÃO DO CALLBACK DE ÁUDIO ---
+# Mede quanto cada callback leva em relação ao prazo do bloco (frames / taxa). A thread de áudio
+# é a única que escreve: contadores, histograma e o rastro circular são arrays pré-alocados,
+# então não há lock nem alocação no caminho quente. A interface só lê (no pior caso, um bloco atrás).
+
+LOAD_BIN_PERCENT = 2  # largura de cada faixa do histograma (% do prazo)
+LOAD_BINS = 101  # 0..200% + uma faixa final para tudo acima
+TRACE_CAPACITY = 8192
+LOAD_SMOOTHING = 0.05
+TRACE_START, TRACE_DURATION, TRACE_FRAMES, TRACE_FLAGS = 0, 1, 2, 3
+FLAG_OUTPUT_UNDERFLOW, FLAG_INPUT_OVERFLOW = 1, 2
+
+
+class CallbackMonitor:
+    def __init__(self, sample_rate=SAMPLE_RATE, trace_capacity=TRACE_CAPACITY):
+        self.sample_rate = sample_rate
+        self.histogram = np.zeros(LOAD_BINS, dtype=np.int64)
+        self.trace = np.zeros((trace_capacity, 4), dtype=np.float64)  # início, duração (s), frames, flags
+        self.reset()
+
+    def reset(self):
+        self.histogram[:] = 0; self.trace[:] = 0; self.trace_index = 0
+        self.callbacks = 0; self.output_underflows = 0; self.input_overflows = 0
+        self.dsp_load = 0.0; self.worst_seconds = 0.0; self.worst_load = 0.0; self.deadline_misses = 0
+        self._origin = time.perf_counter()
+
+    def record(self, start, frames, status):
+        # Chamado na thread de áudio ao fim de cada callback
+        duration = time.perf_counter() - start
+        load = duration * self.sample_rate / frames if frames else 0.0
+        flags = 0
+        if status:
+            if getattr(status, "output_underflow", False): self.output_underflows += 1; flags |= FLAG_OUTPUT_UNDERFLOW
+            if getattr(status, "input_overflow", False): self.input_overflows += 1; flags |= FLAG_INPUT_OVERFLOW
+        self.histogram[min(LOAD_BINS - 1, int(load * 100 / LOAD_BIN_PERCENT))] += 1
+        if load > 1.0: self.deadline_misses += 1
+        if duration > self.worst_seconds: self.worst_seconds = duration
+        if load > self.worst_load: self.worst_load = load
+        self.dsp_load = load if self.callbacks == 0 else self.dsp_load + (load - self.dsp_load) * LOAD_SMOOTHING
+        row = self.trace[self.trace_index % len(self.trace)]
+        row[TRACE_START] = start - self._origin; row[TRACE_DURATION] = duration; row[TRACE_FRAMES] = frames; row[TRACE_FLAGS] = flags
+        self.trace_index += 1; self.callbacks += 1
+
+    def instrument(self, callback):
+        # Envolve um callback do sounddevice (entrada, saída ou duplex): frames é o antepenúltimo argumento e status o último
+        def instrumented(*args):
+            start = time.perf_counter()
+            try: return callback(*args)
+            finally: self.record(start, args[-3], args[-1])
+        return instrumented
+
+    def xruns(self): return self.output_underflows + self.input_overflows
+
+    def percentile_load(self, q):
+        # Percentil da carga (fração do prazo) a partir do histograma
+        counts = self.histogram.copy(); total = counts.sum()
+        if total == 0: return 0.0
+        index = int(np.searchsorted(np.cumsum(counts), total * q / 100.0))
+        return (index + 1) * LOAD_BIN_PERCENT / 100.0
+
+    def stats(self):
+        return {"callbacks": int(self.callbacks), "dsp_load_percent": self.dsp_load * 100, "p99_load_percent": self.percentile_load(99) * 100,
+                "worst_load_percent": self.worst_load * 100, "worst_callback_ms": self.worst_seconds * 1000, "deadline_misses": int(self.deadline_misses),
+                "output_underflows": int(self.output_underflows), "input_overflows": int(self.input_overflows)}
+
+    def trace_rows(self):
+        # Rastro em ordem cronológica (só os últimos `capacidade` callbacks)
+        count = min(self.trace_index, len(self.trace)); start = self.trace_index % len(self.trace) if self.trace_index > len(self.trace) else 0
+        return np.roll(self.trace, -start, axis=0)[:count].copy()
+
+    def dump_trace(self, path):
+        rows = self.trace_rows()
+        payload = {"sample_rate": self.sample_rate, "stats": self.stats(), "histogram_bin_percent": LOAD_BIN_PERCENT, "histogram": self.histogram.tolist(),
+                   "trace": [{"start_s": round(r[TRACE_START], 6), "duration_ms": round(r[TRACE_DURATION] * 1000, 4), "frames": int(r[TRACE_FRAMES]),
+                              "output_underflow": bool(int(r[TRACE_FLAGS]) & FLAG_OUTPUT_UNDERFLOW), "input_overflow": bool(int(r[TRACE_FLAGS]) & FLAG_INPUT_OVERFLOW)} for r in rows]}
+        with open(path, "w") as f: json.dump(payload, f, indent=1)
+        return len(rows)
@@ -0,0 +1,135 @@
+import os
+import math
+import time
+import threading
+import numpy as np
+
+from core import SAMPLE_RATE, CHANNELS
+from engine import BLOCK_SIZE, fit_channels
+from ringbuffer import RingBuffer
+
+# --- PRÉ-RENDERIZAÇÃO DAS TRILHAS EM SEGUNDO PLANO ---
+# Threads de trabalho renderizam os próximos blocos de cada trilha (fonte + inserts) com alguns
+# milissegundos de antecedência, cada trilha no seu buffer circular sem lock. O callback só pega os
+# blocos prontos e aplica volume/mute/solo (que continuam instantâneos); mudanças nos efeitos valem
+# dentro da janela de antecedência. O NumPy solta o GIL nas contas pesadas, então as trilhas usam vários núcleos.
+# Ajuste com DAW_PRERENDER_MS (antecedência) e DAW_PRERENDER_WORKERS (threads; 0 = automático).
+# Com um backend que não anda em tempo real (simulado, render offline) o callback espera o bloco em
+# vez de tocar silêncio: ali não há prazo a cumprir, só a saída tem que sair igual.
+
+DEFAULT_LOOKAHEAD_MS = float(os.environ.get("DAW_PRERENDER_MS", "150"))
+DEFAULT_WORKERS = int(os.environ.get("DAW_PRERENDER_WORKERS", "0"))
+BLOCKING_TIMEOUT = 5.0  # segundos esperando um bloco no modo sem tempo real antes de desistir (trilha travada)
+BLOCKING_POLL = 0.0005
+
+
+def array_source(data, channels=CHANNELS):
+    # Fonte de um array já no formato do projeto (clip da sessão ou render congelada)
+    def source(out, t0):
+        chunk = data[t0:t0 + len(out)]
+        if len(chunk): out[:len(chunk)] = fit_channels(chunk, channels)
+    return source
+
+
+class TrackRenderer:
+    # Produtor: uma thread de trabalho (`render_next`). Consumidor: o callback (`take`).
+    # Cada bloco vai para o buffer junto com a posição em amostras, então um bloco atrasado nunca toca fora do lugar.
+
+    def __init__(self, track_index, source, mixer, blocks_ahead, start, block_size=BLOCK_SIZE, channels=CHANNELS):
+        # `source(out, t0)` soma em `out` (zerado, (frames, canais)) o trecho pré-insert da trilha a partir de t0
+        self.track_index = track_index; self.source = source; self.mixer = mixer; self.block_size = block_size
+        self.audio = RingBuffer(blocks_ahead * block_size, channels); self.positions = RingBuffer(blocks_ahead, 1, dtype=np.int64)
+        self.position = start; self.failed = False  # lado do produtor
+        self.wanted = start; self.next_position = None  # lado do consumidor
+        self._block = np.zeros((block_size, channels), dtype=np.float32); self._position_scratch = np.zeros((1, 1), dtype=np.int64)
+        self._discard = np.zeros((block_size, channels), dtype=np.float32)
+
+    def ready(self): return self.positions.free_space() == 0 or self.failed
+
+    def has_room(self):
+        # O callback libera a posição antes do áudio, então confere os dois buffers
+        return self.positions.free_space() > 0 and self.audio.free_space() >= self.block_size
+
+    def render_next(self):
+        # Thread de trabalho: renderiza um bloco se houver espaço; False quando não há nada a fazer
+        if self.failed or not self.has_room(): return False
+        wanted = self.wanted
+        if self.position < wanted: self.position = wanted  # o callback já passou deste ponto: pula o que ficou para trás
+        block = self._block; block.fill(0); self.source(block, self.position)
+        inserts = self.mixer.inserts; chain = inserts[self.track_index] if self.track_index < len(inserts) else None
+        if chain is not None and chain.processors: block = chain.process(block)
+        self.audio.write(block)
+        self._position_scratch[0, 0] = self.position; self.positions.write(self._position_scratch)  # a posição só entra depois do áudio
+        self.position += self.block_size
+        return True
+
+    def take(self, out, t0, timeout=0.0):
+        # Callback: copia para `out` o bloco de t0 se já estiver pronto; descarta os que ficaram para trás.
+        # Com timeout > 0 espera o bloco chegar, e a thread de trabalho não pula o trecho que ainda falta
+        self.wanted = t0 if timeout else t0 + len(out); deadline = None
+        while True:
+            if self.next_position is None:
+                if self.positions.available() == 0:
+                    if not timeout or self.failed: return False
+                    if deadline is None: deadline = time.monotonic() + timeout
+                    elif time.monotonic() > deadline: return False
+                    time.sleep(BLOCKING_POLL); continue
+                self.next_position = int(self.positions.read(1, out=self._position_scratch)[0, 0])
+            if self.next_position > t0: return False  # só há blocos do futuro: este trecho fica em silêncio
+            hit = self.next_position == t0; self.next_position = None
+            self.audio.read(self.block_size, out=out if hit else self._discard)
+            if hit: return True
+
+
+class PrerenderScheduler:
+    def __init__(self, mixer, lookahead_ms=DEFAULT_LOOKAHEAD_MS, workers=DEFAULT_WORKERS, block_size=BLOCK_SIZE, sample_rate=SAMPLE_RATE, channels=CHANNELS, blocking=False):
+        # blocking=True: `read` espera os blocos que faltam (backend sem tempo real); False: bloco atrasado vira silêncio
+        self.mixer = mixer; self.block_size = block_size; self.sample_rate = sample_rate; self.channels = channels
+        self.timeout = BLOCKING_TIMEOUT if blocking else 0.0
+        self.blocks_ahead = max(2, math.ceil(lookahead_ms * sample_rate / 1000.0 / block_size))
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.renderers = []; self.late_blocks = 0
+        self._tracks = np.zeros((mixer.num_tracks, block_size, channels), dtype=np.float32)
+        self._threads = []; self._stop_event = threading.Event()
+
+    def lookahead_seconds(self): return self.blocks_ahead * self.block_size / self.sample_rate
+
+    def add_track(self, track_index, source, start=0):
+        if track_index >= len(self._tracks): return None
+        renderer = TrackRenderer(track_index, source, self.mixer, self.blocks_ahead, start, self.block_size, self.channels)
+        self.renderers.append(renderer)
+        return renderer
+
+    def _worker(self, renderers):
+        # Cada trilha pertence a uma thread só: os efeitos dela sempre processam em ordem, sem lock
+        idle_wait = self.block_size / self.sample_rate / 4
+        while not self._stop_event.is_set():
+            progressed = False
+            for renderer in renderers:
+                try: progressed = renderer.render_next() or progressed
+                except Exception as e: print(f"Erro ao pré-renderizar a trilha {renderer.track_index + 1}: {e}"); renderer.failed = True
+            if not progressed: self._stop_event.wait(idle_wait)
+
+    def start(self, wait=True, timeout=2.0):
+        # Com wait=True só volta quando os buffers estão cheios (ou no timeout), para o stream abrir já com folga
+        count = min(self.workers, len(self.renderers))
+        self._threads = [threading.Thread(target=self._worker, args=(self.renderers[k::count],), daemon=True) for k in range(count)]
+        for thread in self._threads: thread.start()
+        if wait: self.wait_ready(timeout)
+
+    def wait_ready(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not all(r.ready() for r in self.renderers): time.sleep(0.005)
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads: thread.join()
+        self._threads = []
+
+    def read(self, t0, frames):
+        # Callback: linhas pré-fader (já com inserts) do trecho [t0, t0 + frames); trilha atrasada toca silêncio
+        if self._tracks.shape[1] < frames: self._tracks = np.zeros((len(self._tracks), frames, self.channels), dtype=np.float32)
+        tracks = self._tracks[:, :frames]; tracks.fill(0)
+        for renderer in self.renderers:
+            if frames != self.block_size or not renderer.take(tracks[renderer.track_index], t0, self.timeout): self.late_blocks += 1
+        return tracks
@@ -0,0 +1,50 @@
+import os
+import json
+from core import Clip
+from media import MediaIndex, media_index, media_index_path_for
+
+# Leitura/escrita do formato .dawpe sem depender de nenhum widget
+
+
+def resolve_media_path(audio_file_path, project_dir):
+    # Projetos antigos guardam caminhos relativos ao diretório de trabalho; tenta também a pasta do projeto
+    if os.path.isabs(audio_file_path) or os.path.exists(audio_file_path): return audio_file_path
+    candidate = os.path.join(project_dir, audio_file_path)
+    return candidate if os.path.exists(candidate) else audio_file_path
+
+
+def read_project(filepath):
+    with open(filepath, 'r') as f: project_data = json.load(f)
+    project_dir = os.path.dirname(os.path.abspath(filepath))
+    # Metadados dos clips vêm do índice salvo ao lado do projeto; só arquivos alterados têm o cabeçalho relido
+    media = MediaIndex.load(media_index_path_for(filepath)); probes_before = media.probes
+    clips = {}  # (arquivo, trim) -> Clip: o mesmo clip na sessão e no arranjo vira um objeto só, como ao vivo
+    def clip_from_dict(clip_data):
+        clip_data = dict(clip_data, audio_file_path=resolve_media_path(clip_data["audio_file_path"], project_dir))
+        key = (clip_data["audio_file_path"], clip_data["trim_start_ratio"], clip_data["trim_end_ratio"])
+        if key not in clips: clips[key] = Clip.from_dict(clip_data, media)
+        return clips[key]
+    tracks = []
+    for track_data in project_data.get("tracks", []):
+        tracks.append({"name": track_data["name"], "volume": track_data.get("volume", 0.8), "is_muted": track_data.get("is_muted", False), "is_soloed": track_data.get("is_soloed", False),
+                       "clips": [clip_from_dict(c) for c in track_data.get("clips", [])], "effects": track_data.get("effects", []), "frozen": track_data.get("frozen", False)})
+    arrangement = [{"clip": clip_from_dict(item["clip"]), "track_index": item["track_index"], "start_beat": item["start_beat"]} for item in project_data.get("arrangement", [])]
+    if media.probes != probes_before: media.save(media_index_path_for(filepath))
+    media_index.merge(media)
+    return {"bpm": project_data.get("bpm", 120), "tracks": tracks, "arrangement": arrangement}
+
+
+def write_project(filepath, bpm, tracks, arrangement):
+    project_data = {"bpm": bpm, "tracks": [{"name": t["name"], "volume": t["volume"], "is_muted": t["is_muted"], "is_soloed": t["is_soloed"], "clips": [c.to_dict() for c in t["clips"]], "effects": t.get("effects", []), "frozen": t.get("frozen", False)} for t in tracks],
+                    "arrangement": [{"clip": item["clip"].to_dict(), "track_index": item["track_index"], "start_beat": item["start_beat"]} for item in arrangement]}
+    with open(filepath, 'w') as f: json.dump(project_data, f, indent=4)
+    clips = [c for t in tracks for c in t["clips"]] + [item["clip"] for item in arrangement]
+    for clip in clips: media_index.info(clip.audio_file_path)
+    media_index.subset(c.audio_file_path for c in clips).save(media_index_path_for(filepath))
+
+
+def track_gains(tracks):
+    # Ganho efetivo de cada trilha respeitando volume, mute e solo (mesma regra do _play_session)
+    has_solo = any(t["is_soloed"] for t in tracks)
+    if has_solo: return [t["volume"] if t["is_soloed"] else 0.0 for t in tracks]
+    return [0.0 if t["is_muted"] else t["volume"] for t in tracks]
@@ -0,0 +1,87 @@
+import os
+import threading
+import wave
+import numpy as np
+
+from core import SAMPLE_RATE, CHANNELS
+from ringbuffer import RingBuffer
+from cache import clip_store
+from audio_backend import get_backend
+
+# --- GRAVAÇÃO EM STREAMING PARA O DISCO ---
+# O callback só copia o bloco para o buffer circular; uma thread grava o PCM no WAV aos poucos.
+# O cabeçalho do WAV é corrigido no fechamento, então a memória usada não depende da duração do take.
+
+RING_SECONDS = 10
+WRITER_INTERVAL = 0.05
+EXTRA_LATENCY_MS = float(os.environ.get("DAW_LATENCY_OFFSET_MS", "0"))  # calibração: o que o driver não informa (conversores, cabos)
+
+
+def round_trip_latency_frames(stream, sample_rate=SAMPLE_RATE, extra_ms=EXTRA_LATENCY_MS):
+    # Entrada + saída informadas pelo stream duplex, em amostras: é quanto o take chega atrasado
+    # em relação ao que o músico ouviu ao tocar
+    latency = stream.latency
+    seconds = sum(latency) if isinstance(latency, (tuple, list)) else 2 * latency
+    return max(0, int(round((seconds + extra_ms / 1000.0) * sample_rate)))
+
+
+class StreamingRecorder:
+    def __init__(self, wav_path, sample_rate=SAMPLE_RATE, channels=CHANNELS, monitor=None, instrument=None, backend=None, transport=None):
+        # `monitor(out, posição)` preenche a saída de retorno (ex.: metrônomo) no mesmo stream da captura;
+        # `instrument(callback)` envolve o callback para medir o tempo de cada bloco;
+        # `transport` (TransportClock) recebe a posição da captura a cada bloco
+        self.wav_path = wav_path; self.sample_rate = sample_rate; self.channels = channels; self.monitor = monitor; self.instrument = instrument; self.backend = backend; self.transport = transport
+        self.position = 0
+        self.ring = RingBuffer(sample_rate * RING_SECONDS, channels)
+        self.frames_written = 0; self.overflows = 0
+        self.skip_frames = 0  # compensação de latência: amostras iniciais descartadas antes do WAV
+        self._stream = None; self._writer_thread = None
+        self._stop_event = threading.Event()
+
+    def callback(self, indata, frames, time, status):
+        # Roda na thread de áudio: nada de alocação nem I/O aqui
+        if status and status.input_overflow: self.overflows += 1
+        if self.transport: self.transport.publish(self.position, time, frames)
+        self.ring.write(indata); self.position += frames
+
+    def duplex_callback(self, indata, outdata, frames, time, status):
+        position = self.position; self.callback(indata, frames, time, status)
+        outdata.fill(0); self.monitor(outdata, position)
+
+    def _writer(self):
+        with wave.open(self.wav_path, "wb") as wav_file:
+            wav_file.setnchannels(self.channels); wav_file.setsampwidth(2); wav_file.setframerate(self.sample_rate)
+            scratch = np.empty((self.sample_rate, self.channels), dtype=np.float32); skip = self.skip_frames
+            while True:
+                stopping = self._stop_event.wait(WRITER_INTERVAL)
+                while self.ring.available() > 0:
+                    block = self.ring.read(len(scratch), out=scratch)
+                    if skip: dropped = min(skip, len(block)); block = block[dropped:]; skip -= dropped
+                    pcm = (np.clip(block, -1.0, 1.0) * np.iinfo(np.int16).max).astype("<i2")
+                    wav_file.writeframesraw(pcm.tobytes()); self.frames_written += len(block)
+                if stopping: break
+        # O `with` fecha o arquivo e o wave reescreve o tamanho dos dados no cabeçalho
+
+    def start(self, open_stream=True):
+        # Com open_stream=False quem chama alimenta `callback` a partir do próprio stream (e acerta `skip_frames` antes)
+        clip_store.invalidate(self.wav_path)  # um take antigo com o mesmo nome não pode continuar mapeado
+        self._writer_thread = threading.Thread(target=self._writer, daemon=True); self._writer_thread.start()
+        if open_stream:
+            callback = self.duplex_callback if self.monitor else self.callback
+            if self.instrument: callback = self.instrument(callback)
+            backend = self.backend or get_backend()
+            if self.monitor: self._stream = backend.open_duplex(callback, self.sample_rate, self.channels)
+            else: self._stream = backend.open_input(callback, self.sample_rate, self.channels)
+            if self.transport: self.transport.start(self._stream, "input")  # a posição é a do que está sendo capturado
+            self._stream.start()
+
+    def stop(self):
+        # Só falta gravar o que ainda está no buffer circular (no máximo alguns segundos)
+        if self._stream is not None: self._stream.stop(); self._stream.close(); self._stream = None
+        if self.transport: self.transport.stop()
+        self._stop_event.set()
+        if self._writer_thread: self._writer_thread.join()
+        if self.ring.dropped_frames: print(f"Aviso: {self.ring.dropped_frames} amostras descartadas na gravação (disco lento?)")
+        return self.wav_path
+
+    def duration_seconds(self): return self.frames_written / self.sample_rate
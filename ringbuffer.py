@@ -0,0 +1,38 @@
+import numpy as np
+
+# --- BUFFER CIRCULAR DE UM PRODUTOR E UM CONSUMIDOR ---
+# Sem locks: só o produtor mexe em `_write_pos` e só o consumidor mexe em `_read_pos`.
+# As posições crescem sem parar (o índice real é pos % capacity), então cheio/vazio nunca se confundem.
+
+
+class RingBuffer:
+    def __init__(self, capacity_frames, channels=1, dtype=np.float32):
+        self.capacity = int(capacity_frames)
+        self._buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self._write_pos = 0; self._read_pos = 0
+        self.dropped_frames = 0
+
+    def available(self): return self._write_pos - self._read_pos
+    def free_space(self): return self.capacity - self.available()
+
+    def write(self, data):
+        # Chamado pelo produtor (ex.: callback de áudio); descarta o que não couber em vez de bloquear
+        frames = min(len(data), self.free_space())
+        self.dropped_frames += len(data) - frames
+        if frames <= 0: return 0
+        start = self._write_pos % self.capacity; first = min(frames, self.capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        if frames > first: self._buffer[:frames - first] = data[first:frames]
+        self._write_pos += frames
+        return frames
+
+    def read(self, max_frames=None, out=None):
+        # Chamado pelo consumidor; devolve uma cópia com até `max_frames` quadros
+        frames = self.available() if max_frames is None else min(max_frames, self.available())
+        if out is None: out = np.empty((frames, self._buffer.shape[1]), dtype=self._buffer.dtype)
+        frames = min(frames, len(out))
+        start = self._read_pos % self.capacity; first = min(frames, self.capacity - start)
+        out[:first] = self._buffer[start:start + first]
+        if frames > first: out[first:frames] = self._buffer[:frames - first]
+        self._read_pos += frames
+        return out[:frames]
@@ -1,5 +1,23 @@
 import customtkinter as ctk
-import sounddevice as sd
+import threading
+from lazy import lazy_import
+
+sd = lazy_import("sounddevice")
+
+_device_cache = None; _device_lock = threading.Lock()
+
+def query_audio_devices():
+    # Importar o sounddevice e enumerar o PortAudio é lento: roda fora da thread da interface e fica em cache
+    global _device_cache
+    with _device_lock:
+        if _device_cache is None:
+            try: _device_cache = (list(sd.query_devices()), list(sd.query_hostapis()), sd.default.hostapi)
+            except Exception as e:
+                print(f"Erro ao consultar dispositivos de áudio: {e}")
+                return [], [], None
+        return _device_cache
+
+def prefetch_audio_devices(): threading.Thread(target=query_audio_devices, daemon=True).start()
 
 class AudioSettingsWindow(ctk.CTkToplevel):
     def __init__(self, master):
@@ -9,21 +27,15 @@ class AudioSettingsWindow(ctk.CTkToplevel):
         self.transient(master)
         self.grab_set()
 
-        try:
-            self.devices = sd.query_devices()
-            self.hostapis = sd.query_hostapis()
-        except Exception as e:
-            print(f"Erro ao consultar dispositivos de áudio: {e}")
-            self.devices, self.hostapis = [], []
+        self.devices, self.hostapis, self._device_result = [], [], None
 
         # --- Seleção da API de Áudio (ASIO, MME, etc) ---
         api_frame = ctk.CTkFrame(self)
         api_frame.pack(padx=20, pady=10, fill="x")
         ctk.CTkLabel(api_frame, text="API de Áudio (Driver):", width=150, anchor="w").pack(side="left")
         
-        api_names = [api['name'] for api in self.hostapis]
-        self.selected_api = ctk.StringVar()
-        self.api_menu = ctk.CTkOptionMenu(api_frame, variable=self.selected_api, values=api_names, command=self.update_device_lists)
+        self.selected_api = ctk.StringVar(value="Carregando...")
+        self.api_menu = ctk.CTkOptionMenu(api_frame, variable=self.selected_api, values=["Carregando..."], command=self.update_device_lists)
         self.api_menu.pack(side="left", expand=True, fill="x")
 
         # --- Seleção do Dispositivo de Entrada ---
@@ -49,15 +61,29 @@ class AudioSettingsWindow(ctk.CTkToplevel):
         ctk.CTkButton(button_frame, text="OK", command=self.apply_and_close).pack(side="left", padx=10)
         ctk.CTkButton(button_frame, text="Cancelar", command=self.destroy).pack(side="left", padx=10)
 
+        # A enumeração roda numa thread; a janela abre na hora e as listas são preenchidas depois
+        threading.Thread(target=self._query_devices_worker, daemon=True).start()
+        self._poll_devices()
+
+    def _query_devices_worker(self): self._device_result = query_audio_devices()
+
+    def _poll_devices(self):
+        if not self.winfo_exists(): return
+        if self._device_result is None: self.after(50, self._poll_devices); return
+        self.devices, self.hostapis, default_hostapi = self._device_result
+        api_names = [api['name'] for api in self.hostapis]
+        self.api_menu.configure(values=api_names if api_names else ["Nenhum"])
+
         # Popula as listas iniciais
         try:
-            default_api_name = sd.query_hostapis(sd.default.hostapi)['name']
+            default_api_name = self.hostapis[default_hostapi]['name']
             self.selected_api.set(default_api_name)
             self.update_device_lists(default_api_name)
         except Exception as e:
             if api_names:
                 self.selected_api.set(api_names[0])
                 self.update_device_lists(api_names[0])
+            else: self.selected_api.set("Nenhum")
 
     def update_device_lists(self, selected_api_name):
         try:
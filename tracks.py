@@ -0,0 +1,50 @@
+from dsp import EffectChain
+
+# --- MODELO DAS TRILHAS (SEM WIDGETS) ---
+# Todo o estado da trilha mora aqui. A lista da sessão e o mixer só criam widgets para as linhas
+# visíveis e os reaproveitam na rolagem: cada widget se inscreve na trilha que está mostrando
+# e sai da lista de ouvintes quando passa a mostrar outra.
+
+
+class Track:
+    def __init__(self, track_name, track_index, volume=0.8, is_muted=False, is_soloed=False, color=None):
+        self.track_name = track_name; self.track_index = track_index; self.color = color
+        self.volume = float(volume); self.is_muted = bool(is_muted); self.is_soloed = bool(is_soloed)
+        self.clips = []; self.effect_chain = EffectChain()
+        self.frozen_effects = None  # lista de efeitos da render congelada (None = toca ao vivo)
+        self.freezing = False
+        self._listeners = []
+
+    @property
+    def is_frozen(self): return self.frozen_effects is not None
+
+    def watch(self, listener):
+        if listener not in self._listeners: self._listeners.append(listener)
+    def unwatch(self, listener):
+        if listener in self._listeners: self._listeners.remove(listener)
+    def notify(self):
+        # Sempre na thread da interface: ouvintes são widgets e a sincronização com o mixer
+        for listener in list(self._listeners): listener(self)
+
+    def get_active_clip(self): return self.clips[0] if self.clips else None
+    def add_clip(self, clip): self.clips = [clip]; self.notify()
+
+    def set_volume(self, value):
+        value = float(value)
+        if value != self.volume: self.volume = value; self.notify()
+    def set_muted(self, value):
+        if bool(value) != self.is_muted: self.is_muted = bool(value); self.notify()
+    def set_soloed(self, value):
+        if bool(value) != self.is_soloed: self.is_soloed = bool(value); self.notify()
+    def set_trim_points(self, start_ratio, end_ratio):
+        clip = self.get_active_clip()
+        if clip: clip.trim_start_ratio = start_ratio; clip.trim_end_ratio = end_ratio
+        return clip
+
+    def set_freezing(self): self.freezing = True; self.notify()
+    def set_frozen(self, effects):
+        # effects=None descongela; a cadeia de inserts volta a valer
+        self.freezing = False; self.frozen_effects = effects; self.notify()
+
+    def to_dict(self):
+        return {"name": self.track_name, "volume": self.volume, "is_muted": self.is_muted, "is_soloed": self.is_soloed, "clips": self.clips, "effects": self.effect_chain.to_list(), "frozen": self.is_frozen}
@@ -0,0 +1,55 @@
+import time
+
+from core import SAMPLE_RATE
+
+# --- POSIÇÃO DO TRANSPORTE PELO RELÓGIO DO ÁUDIO ---
+# O callback publica a amostra do início de cada bloco junto com o horário em que esse bloco
+# chega ao conversor (outputBufferDacTime; na gravação, inputBufferAdcTime). Quem lê (playhead,
+# relógio, medidores, gravação) interpola com o relógio do próprio stream, então a posição é a
+# do que está soando agora, já com a latência de saída, e não a de quando o play foi apertado.
+
+
+class TransportClock:
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.stream = None; self.kind = "output"; self.delay_samples = 0
+        self._anchor = None  # (amostra do bloco, horário no relógio do stream, perf_counter da publicação, frames)
+
+    def start(self, stream, kind="output", delay_samples=0):
+        # `delay_samples`: atraso fixo antes da saída (ex.: look-ahead do limitador do master)
+        self.stream = stream; self.kind = kind; self.delay_samples = delay_samples
+
+    def stop(self): self._anchor = None; self.stream = None
+
+    @property
+    def running(self): return self._anchor is not None
+
+    def publish(self, position, time_info, frames=0):
+        # Thread de áudio: uma troca de referência só, sem lock
+        if time_info is None: return
+        device_time = getattr(time_info, "inputBufferAdcTime" if self.kind == "input" else "outputBufferDacTime", 0.0) or 0.0
+        self._anchor = (position, device_time, time.perf_counter(), frames)
+
+    def _latency(self):
+        latency = getattr(self.stream, "latency", 0.0) or 0.0
+        if isinstance(latency, (tuple, list)): latency = latency[0 if self.kind == "input" else 1]
+        return latency
+
+    def position(self):
+        # Amostra do transporte que está soando (ou sendo capturada) agora; None parado
+        anchor = self._anchor; stream = self.stream
+        if anchor is None: return None
+        block_position, device_time, published_at, frames = anchor
+        try: now = stream.time if stream is not None and device_time else None
+        except Exception: now = None
+        if now is not None: position = block_position + (now - device_time) * self.sample_rate
+        else:
+            # Host sem horário do dispositivo: quadros entregues corrigidos pela latência informada
+            elapsed = time.perf_counter() - published_at
+            if self.kind == "input": position = block_position + frames + (elapsed + self._latency()) * self.sample_rate
+            else: position = block_position + (elapsed - self._latency()) * self.sample_rate
+        return max(0, int(position) - self.delay_samples)
+
+    def seconds(self):
+        position = self.position()
+        return position / self.sample_rate if position is not None else 0.0
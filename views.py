@@ -1,31 +1,36 @@
 import customtkinter as ctk
-from PIL import Image, ImageTk
 import os
 
 # Importa as peças que vamos usar, do nosso arquivo de componentes
-from components import TrackFrame, WaveformCanvas 
+from components import TrackFrame, VirtualList, ROW_HEIGHT
+from waveform_cache import waveform_bitmaps
 
 # --- Constantes de Cor ---
 SELECTED_BG_COLOR = "#F1C40F"
 
-class ContentFrame(ctk.CTkFrame):
+class ContentFrame(VirtualList):
+    # Lista da sessão: mesmo com centenas de trilhas, só as linhas visíveis têm widgets
     def __init__(self, master, app_instance):
-        super().__init__(master, corner_radius=0)
-        self.app = app_instance
-        
-        self.scrollable_frame = ctk.CTkScrollableFrame(self, label_text="Trilhas")
-        self.scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
-        
-    def add_new_track(self, track_name, track_index):
-        track = TrackFrame(self.scrollable_frame, track_name, self.app, track_index)
-        track.pack(fill="x", expand=True, padx=5, pady=5)
-        return track
+        # Altura fixa no construtor da linha (o CTk não aceita no place)
+        super().__init__(master, app_instance, TrackFrame, lambda widget, position: widget.place(x=0, y=position + 5, relwidth=1.0), ROW_HEIGHT + 10,
+                         label_text="Trilhas", corner_radius=0)
+        self.pack_viewport()
+
+    def update_selection(self):
+        for widget in self.visible.values(): widget.update_selection()
+
+VIEWPORT_MARGIN_PX = 600  # itens criados além da área visível, para a rolagem não mostrar buracos
+MIN_ARRANGEMENT_BARS = 32
+PLAYHEAD_FOLLOW_MARGIN_PX = 40  # ao virar a página, o playhead fica um pouco depois da borda esquerda
+HANDLE_WIDTH = 8
+MIN_TRIM_RATIO = 0.01
 
 class ArrangementFrame(ctk.CTkFrame):
     def __init__(self, master, app_instance):
         super().__init__(master, corner_radius=0, fg_color="#2B2B2B")
         self.app = app_instance
         self.track_height = 100
+        self.pixels_per_beat = 100.0; self.beats_per_bar = 4
 
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
@@ -37,11 +42,13 @@ class ArrangementFrame(ctk.CTkFrame):
         self.v_scrollbar.grid(row=0, column=1, sticky="ns")
         self.h_scrollbar = ctk.CTkScrollbar(self, orientation="horizontal", command=self.grid_canvas.xview)
         self.h_scrollbar.grid(row=1, column=0, sticky="ew")
-        self.grid_canvas.configure(yscrollcommand=self.v_scrollbar.set, xscrollcommand=self.h_scrollbar.set)
+        self.grid_canvas.configure(yscrollcommand=self._on_yscroll, xscrollcommand=self._on_xscroll)
         
-        self.grid_canvas.bind("<Configure>", self.redraw)
+        # Só existem itens de canvas para o que está visível (mais uma margem); o resto é criado ao rolar
+        self.grid_canvas.bind("<Configure>", self._on_configure)
         self.playhead_id = None
-        self.clip_visuals = {}
+        self.item_visuals = {}  # id(item do arranjo) -> ids dos itens de canvas + imagem
+        self._grid_extent = None; self._viewport_pending = False; self._scroll_size = (0, 0)
         
         self._drag_data = {}
         
@@ -56,79 +63,107 @@ class ArrangementFrame(ctk.CTkFrame):
         self.grid_canvas.tag_bind("handle", "<ButtonRelease-1>", self.on_release)
         self.grid_canvas.tag_bind("handle", "<Enter>", lambda e: self.grid_canvas.config(cursor="sb_h_double_arrow"))
         self.grid_canvas.tag_bind("handle", "<Leave>", lambda e: self.grid_canvas.config(cursor=""))
-    
+
+    def _on_configure(self, event=None): self._update_scrollregion(); self._schedule_viewport_update()
+    def _on_xscroll(self, first, last): self.h_scrollbar.set(first, last); self._schedule_viewport_update()
+    def _on_yscroll(self, first, last): self.v_scrollbar.set(first, last); self._schedule_viewport_update()
+
+    def _schedule_viewport_update(self, event=None):
+        # Vários eventos de rolagem/redimensionamento no mesmo quadro viram uma atualização só
+        if not self._viewport_pending: self._viewport_pending = True; self.after_idle(self._update_viewport)
+
     def redraw(self, event=None):
-        self.grid_canvas.delete("all")
-        self.draw_grid()
-        self.draw_clips()
-        if self.playhead_id:
-            self.move_playhead(self.app.playhead_position_pixels)
-
-    def draw_grid(self):
-        canvas_width_virtual = 30000
-        canvas_height_virtual = max(self.app.track_count * self.track_height, self.winfo_height())
-        
-        bpm = self.app.bpm.get()
-        beats_per_bar = 4
-        self.pixels_per_beat = 100.0
-        pixels_per_bar = self.pixels_per_beat * beats_per_bar
-        total_bars = int(canvas_width_virtual / pixels_per_bar)
+        # Os dados do arranjo mudaram: recalcula a região de rolagem e atualiza no lugar os itens visíveis
+        self._update_scrollregion(); self._update_viewport(refresh=True)
 
-        for bar in range(total_bars):
+    def clip_width_pixels(self, clip): return self.samples_to_pixels(clip.duration_samples)
+    def samples_to_pixels(self, samples):
+        samples_per_beat = self.app.arrangement_data.samples_per_beat
+        return samples / samples_per_beat * self.pixels_per_beat if samples_per_beat > 0 else 0.0
+    def pixels_to_samples(self, x): return int(x / self.pixels_per_beat * self.app.arrangement_data.samples_per_beat)
+
+    def item_geometry(self, item):
+        # (x0, x1, y0, y1) do trecho aparado do clip no canvas, na mesma posição em que o motor toca
+        start, end = self.app.arrangement_data.span(item); y = item["track_index"] * self.track_height
+        return self.samples_to_pixels(start), self.samples_to_pixels(end), y, y + self.track_height - 2
+
+    def _update_scrollregion(self):
+        # A largura vem do fim real do arranjo (mais algumas barras livres para arrastar clips)
+        pixels_per_bar = self.pixels_per_beat * self.beats_per_bar
+        content_end = self.samples_to_pixels(self.app.arrangement_data.end_sample())
+        width = max(content_end + 8 * pixels_per_bar, MIN_ARRANGEMENT_BARS * pixels_per_bar, self.grid_canvas.winfo_width())
+        height = max(self.app.track_count * self.track_height, self.grid_canvas.winfo_height())
+        if (width, height) != self._scroll_size:
+            self._scroll_size = (width, height); self.grid_canvas.config(scrollregion=(0, 0, width, height))
+
+    def _visible_extent(self):
+        canvas = self.grid_canvas
+        x0 = canvas.canvasx(0) - VIEWPORT_MARGIN_PX; x1 = canvas.canvasx(canvas.winfo_width()) + VIEWPORT_MARGIN_PX
+        y0 = canvas.canvasy(0) - VIEWPORT_MARGIN_PX; y1 = canvas.canvasy(canvas.winfo_height()) + VIEWPORT_MARGIN_PX
+        return x0, x1, y0, y1
+
+    def _update_viewport(self, refresh=False):
+        self._viewport_pending = False
+        if self._scroll_size == (0, 0): self._update_scrollregion()
+        x0, x1, y0, y1 = self._visible_extent()
+        self.draw_grid(x0, x1)
+        tracks = range(max(0, int(y0 // self.track_height)), int(y1 // self.track_height) + 1)
+        visible = {id(item): item for item in self.app.arrangement_data.query(self.pixels_to_samples(x0), self.pixels_to_samples(x1) + 1, tracks)}
+        for key in [key for key in self.item_visuals if key not in visible]:
+            self.grid_canvas.delete(f"item_{key}"); del self.item_visuals[key]
+        for key, item in visible.items():
+            if key not in self.item_visuals: self._create_item(item)
+            elif refresh: self._place_item(key)
+        if self.playhead_id: self.grid_canvas.tag_raise(self.playhead_id)
+
+    def draw_grid(self, x0, x1):
+        # Recria a grade só quando a área visível sai do trecho já desenhado (ou a altura muda)
+        height = self._scroll_size[1]
+        if self._grid_extent and self._grid_extent[0] <= x0 and x1 <= self._grid_extent[1] and self._grid_extent[2] == height: return
+        x0 = max(0, x0 - VIEWPORT_MARGIN_PX); x1 = x1 + VIEWPORT_MARGIN_PX
+        self.grid_canvas.delete("grid")
+        pixels_per_bar = self.pixels_per_beat * self.beats_per_bar
+        for bar in range(int(x0 // pixels_per_bar), int(x1 // pixels_per_bar) + 1):
             x = bar * pixels_per_bar
-            self.grid_canvas.create_line(x, 0, x, canvas_height_virtual, fill="#555555", width=2)
-            self.grid_canvas.create_text(x + 5, 10, text=str(bar + 1), anchor="nw", fill="white", font=("Arial", 10))
-            for beat in range(1, beats_per_bar):
+            self.grid_canvas.create_line(x, 0, x, height, fill="#555555", width=2, tags="grid")
+            self.grid_canvas.create_text(x + 5, 10, text=str(bar + 1), anchor="nw", fill="white", font=("Arial", 10), tags="grid")
+            for beat in range(1, self.beats_per_bar):
                 x_beat = x + (beat * self.pixels_per_beat)
-                self.grid_canvas.create_line(x_beat, 0, x_beat, canvas_height_virtual, fill="#444444", width=1)
-        
-        self.grid_canvas.config(scrollregion=(0, 0, canvas_width_virtual, canvas_height_virtual))
-
-    def draw_clips(self):
-        self.clip_visuals = {}
-        for item in self.app.arrangement_data:
-            clip = item["clip"]
-            track_index = item["track_index"]
-            start_beat = item["start_beat"]
-            
-            clip_total_duration_beats = (clip.duration_seconds * self.app.bpm.get()) / 60.0
-            clip_total_width_px = clip_total_duration_beats * self.pixels_per_beat
-            
-            trim_start_pixels = clip_total_width_px * clip.trim_start_ratio
-            trim_end_pixels = clip_total_width_px * clip.trim_end_ratio
-            trimmed_width = trim_end_pixels - trim_start_pixels
-            
-            x = start_beat * self.pixels_per_beat
-            y = track_index * self.track_height
-            height = self.track_height
-            
-            item_tag = f"clip_{id(clip)}"
-            
-            body_id = self.grid_canvas.create_rectangle(x + trim_start_pixels, y, x + trim_end_pixels, y + height - 2, fill="#5DADE2", outline="black", width=2, tags=("clip_body", item_tag))
-            img_id, text_id = None, None
-            
-            if os.path.exists(clip.waveform_image_path):
-                try:
-                    pil_img = Image.open(clip.waveform_image_path)
-                    crop_x1 = int(pil_img.width * clip.trim_start_ratio)
-                    crop_x2 = int(pil_img.width * clip.trim_end_ratio)
-                    if crop_x1 < crop_x2:
-                        pil_img_cropped = pil_img.crop((crop_x1, 0, crop_x2, pil_img.height))
-                        pil_img_resized = pil_img_cropped.resize((int(trimmed_width), int(height - 4)), Image.Resampling.LANCZOS)
-                        tk_img = ImageTk.PhotoImage(pil_img_resized)
-                        self.clip_visuals[item_tag] = tk_img 
-                        img_id = self.grid_canvas.create_image(x + trim_start_pixels + 2, y + 2, image=tk_img, anchor="nw", tags=("clip_body", item_tag))
-                except Exception as e:
-                    pass # Evita crash se a imagem estiver corrompida
-            
-            clip_name = os.path.basename(clip.audio_file_path)
-            text_id = self.grid_canvas.create_text(x + trim_start_pixels + 5, y + 5, text=clip_name, anchor="nw", fill="white", tags=("clip_body", item_tag))
-            
-            handle_width = 8
-            start_handle_id = self.grid_canvas.create_rectangle(x + trim_start_pixels, y, x + trim_start_pixels + handle_width, y + height - 2, fill=SELECTED_BG_COLOR, outline="", tags=("handle", "start_handle", item_tag))
-            end_handle_id = self.grid_canvas.create_rectangle(x + trim_end_pixels - handle_width, y, x + trim_end_pixels, y + height - 2, fill=SELECTED_BG_COLOR, outline="", tags=("handle", "end_handle", item_tag))
+                self.grid_canvas.create_line(x_beat, 0, x_beat, height, fill="#444444", width=1, tags="grid")
+        self.grid_canvas.tag_lower("grid")
+        self._grid_extent = (x0, x1, height)
+
+    def _waveform_photo(self, clip, width, height):
+        try:
+            # Só o trecho aparado; rolar, redimensionar ou mudar o BPM de volta reaproveita o bitmap do cache
+            return waveform_bitmaps.get(clip.audio_file_path, clip.trim_start_ratio, clip.trim_end_ratio, width, height)
+        except Exception as e:
+            return None # Evita crash se a imagem estiver corrompida
 
-            self.clip_visuals[item_tag] = {"body": body_id, "image_tk": tk_img if 'tk_img' in locals() else None, "image_id": img_id, "text": text_id, "start_handle": start_handle_id, "end_handle": end_handle_id}
+    def _create_item(self, item):
+        clip = item["clip"]; key = id(item); item_tag = f"item_{key}"
+        x0, x1, y0, y1 = self.item_geometry(item)
+        body_id = self.grid_canvas.create_rectangle(x0, y0, x1, y1, fill="#5DADE2", outline="black", width=2, tags=("clip_body", item_tag))
+        image_size = (int(x1 - x0), int(self.track_height - 4)); tk_img = self._waveform_photo(clip, *image_size)
+        img_id = self.grid_canvas.create_image(x0 + 2, y0 + 2, image=tk_img, anchor="nw", tags=("clip_body", item_tag)) if tk_img else None
+        text_id = self.grid_canvas.create_text(x0 + 5, y0 + 5, text=os.path.basename(clip.audio_file_path), anchor="nw", fill="white", tags=("clip_body", item_tag))
+        start_handle_id = self.grid_canvas.create_rectangle(x0, y0, x0 + HANDLE_WIDTH, y1, fill=SELECTED_BG_COLOR, outline="", tags=("handle", "start_handle", item_tag))
+        end_handle_id = self.grid_canvas.create_rectangle(x1 - HANDLE_WIDTH, y0, x1, y1, fill=SELECTED_BG_COLOR, outline="", tags=("handle", "end_handle", item_tag))
+        self.item_visuals[key] = {"item": item, "body": body_id, "image_tk": tk_img, "image_id": img_id, "image_size": image_size, "text": text_id, "start_handle": start_handle_id, "end_handle": end_handle_id}
+
+    def _place_item(self, key, update_image=True):
+        # Move/redimensiona os itens já existentes; a imagem só é refeita se o tamanho mudou
+        visuals = self.item_visuals[key]; item = visuals["item"]; canvas = self.grid_canvas
+        x0, x1, y0, y1 = self.item_geometry(item)
+        canvas.coords(visuals["body"], x0, y0, x1, y1); canvas.coords(visuals["text"], x0 + 5, y0 + 5)
+        canvas.coords(visuals["start_handle"], x0, y0, x0 + HANDLE_WIDTH, y1); canvas.coords(visuals["end_handle"], x1 - HANDLE_WIDTH, y0, x1, y1)
+        image_size = (int(x1 - x0), int(self.track_height - 4))
+        if update_image and image_size != visuals["image_size"]:
+            if visuals["image_id"]: canvas.delete(visuals["image_id"])
+            visuals["image_tk"] = self._waveform_photo(item["clip"], *image_size); visuals["image_size"] = image_size
+            visuals["image_id"] = canvas.create_image(x0 + 2, y0 + 2, image=visuals["image_tk"], anchor="nw", tags=("clip_body", f"item_{key}")) if visuals["image_tk"] else None
+            if visuals["image_id"]: canvas.tag_raise(visuals["text"], visuals["image_id"]); canvas.tag_raise(f"item_{key}&&handle")
+        elif visuals["image_id"]: canvas.coords(visuals["image_id"], x0 + 2, y0 + 2)
 
     def on_press(self, event):
         canvas_x = self.grid_canvas.canvasx(event.x)
@@ -136,71 +171,70 @@ class ArrangementFrame(ctk.CTkFrame):
         self._drag_data["x"] = canvas_x
         self._drag_data["y"] = canvas_y
         
-        try:
-            item_id = self.grid_canvas.find_closest(canvas_x, canvas_y)[0]
-            self._drag_data["item_tags"] = self.grid_canvas.gettags(item_id)
-        except IndexError:
+        # Busca binária no modelo do arranjo em vez de procurar o item nas tags do canvas
+        item = self.app.arrangement_data.item_at(int(canvas_y // self.track_height), self.pixels_to_samples(canvas_x))
+        if item is None or id(item) not in self.item_visuals:
             return
+        x0, x1, _, _ = self.item_geometry(item)
 
-        if "start_handle" in self._drag_data["item_tags"]:
+        if canvas_x <= x0 + HANDLE_WIDTH:
             self._drag_data["drag_type"] = "trim_start"
-        elif "end_handle" in self._drag_data["item_tags"]:
+        elif canvas_x >= x1 - HANDLE_WIDTH:
             self._drag_data["drag_type"] = "trim_end"
-        elif "clip_body" in self._drag_data["item_tags"]:
-            self._drag_data["drag_type"] = "move"
         else:
-            return
+            self._drag_data["drag_type"] = "move"
             
-        unique_tag = [t for t in self._drag_data["item_tags"] if t.startswith("clip_")][0]
-        for item in self.app.arrangement_data:
-            if f"clip_{id(item['clip'])}" == unique_tag:
-                self._drag_data["clip_object_item"] = item
-                break
-        
+        unique_tag = f"item_{id(item)}"
+        self._drag_data["key"] = id(item); self._drag_data["tag"] = unique_tag
+        # Onde ficaria o início do áudio sem trim: o conteúdo não sai do lugar enquanto o trim muda
+        self._drag_data["origin_x"] = x0 - item["clip"].trim_start_ratio * self.clip_width_pixels(item["clip"])
         self.grid_canvas.tag_raise(unique_tag)
 
     def on_drag(self, event):
-        if not self._drag_data.get("clip_object_item"):
+        key = self._drag_data.get("key")
+        if key not in self.item_visuals:
             return
         
         current_x = self.grid_canvas.canvasx(event.x)
-        delta_x = current_x - self._drag_data["x"]
         
         if self._drag_data["drag_type"] == "move":
-            unique_tag = [t for t in self._drag_data["item_tags"] if t.startswith("clip_")][0]
-            self.grid_canvas.move(unique_tag, delta_x, 0)
+            self.grid_canvas.move(self._drag_data["tag"], current_x - self._drag_data["x"], 0)
             self._drag_data["x"] = current_x
         else:
-            self.on_release(event) # Simplificado para redesenhar no arrasto de handles
+            # Ajusta o trim e só reposiciona os itens deste clip; a forma de onda é refeita ao soltar
+            item = self.item_visuals[key]["item"]; clip = item["clip"]; width = self.clip_width_pixels(clip)
+            if width <= 0: return
+            origin_x = self._drag_data["origin_x"]; ratio = (current_x - origin_x) / width
+            if self._drag_data["drag_type"] == "trim_start":
+                clip.trim_start_ratio = min(max(0.0, ratio), clip.trim_end_ratio - MIN_TRIM_RATIO)
+                self.app.arrangement_data.move(item, item["track_index"], (origin_x + clip.trim_start_ratio * width) / self.pixels_per_beat)
+            else: clip.trim_end_ratio = max(min(1.0, ratio), clip.trim_start_ratio + MIN_TRIM_RATIO)
+            self.app.arrangement_data.invalidate(); self._place_item(key, update_image=False)
 
     def on_release(self, event):
-        if self._drag_data.get("clip_object_item"):
-            clip_item = self._drag_data["clip_object_item"]
-            clip_obj = clip_item["clip"]
+        key = self._drag_data.get("key")
+        if key in self.item_visuals:
+            clip_item = self.item_visuals[key]["item"]
             
             if self._drag_data["drag_type"] == "move":
                 current_y = self.grid_canvas.canvasy(event.y)
-                unique_tag = [t for t in self._drag_data["item_tags"] if t.startswith("clip_")][0]
-                item_coords = self.grid_canvas.coords(unique_tag)
+                item_coords = self.grid_canvas.coords(self.item_visuals[key]["body"])
                 final_x = item_coords[0] if item_coords else 0
                 
-                new_track_index = max(0, int(current_y / self.track_height))
+                new_track_index = min(max(0, int(current_y / self.track_height)), max(0, self.app.track_count - 1))
                 new_start_beat = max(0, round(final_x / self.pixels_per_beat))
                 
-                clip_item["track_index"] = new_track_index
-                clip_item["start_beat"] = new_start_beat
+                self.app.arrangement_data.move(clip_item, new_track_index, new_start_beat)
             
-            self._drag_data = {}
-            self.redraw()
+            self.redraw()  # o mesmo Clip pode estar em mais de um lugar do arranjo
+        self._drag_data = {}
             
-    def move_playhead(self, x_pos):
-        try:
-            scroll_region = self.grid_canvas.cget("scrollregion")
-            height = int(scroll_region.split(' ')[3]) if scroll_region else self.winfo_height()
-            if self.playhead_id:
-                self.coords(self.playhead_id, x_pos, 0, x_pos, height)
-            else:
-                self.playhead_id = self.grid_canvas.create_line(x_pos, 0, x_pos, height, fill="red", width=2)
-            self.tag_raise(self.playhead_id)
-        except:
-             pass
\ No newline at end of file
+    def move_playhead(self, x_pos, follow=False):
+        # Um único item de canvas, só reposicionado; com follow=True a vista pula de página quando o playhead sai dela
+        canvas = self.grid_canvas; height = self._scroll_size[1] or canvas.winfo_height()
+        if self.playhead_id: canvas.coords(self.playhead_id, x_pos, 0, x_pos, height)
+        else: self.playhead_id = canvas.create_line(x_pos, 0, x_pos, height, fill="red", width=2)
+        canvas.tag_raise(self.playhead_id)
+        if not follow or not self._scroll_size[0]: return
+        left = canvas.canvasx(0); right = canvas.canvasx(canvas.winfo_width())
+        if x_pos < left or x_pos >= right: canvas.xview_moveto(max(0.0, x_pos - PLAYHEAD_FOLLOW_MARGIN_PX) / self._scroll_size[0])
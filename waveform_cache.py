@@ -0,0 +1,56 @@
+import os
+from collections import OrderedDict
+
+from peaks import get_peaks, render_waveform_image
+from lazy import lazy_import
+
+ImageTk = lazy_import("PIL.ImageTk")
+
+# --- CACHE DE BITMAPS DE FORMA DE ONDA ---
+# Sessão e arranjo pedem a mesma imagem (clip, trecho aparado, largura, altura) várias vezes:
+# a cada rolagem, redimensionamento ou mudança de BPM. O PhotoImage pronto fica num LRU limitado
+# pelo total de pixels. Só pode ser usado na thread da interface (o PhotoImage pertence ao Tk).
+
+DEFAULT_MAX_PIXELS = int(os.environ.get("DAW_WAVEFORM_CACHE_MPIXELS", "32")) * 1_000_000
+
+
+class WaveformBitmapCache:
+    def __init__(self, max_pixels=DEFAULT_MAX_PIXELS):
+        self.max_pixels = max_pixels
+        self._images = OrderedDict()  # chave -> PhotoImage (ordem = LRU)
+        self._pixels = 0
+        self.hits = 0; self.misses = 0
+
+    def get(self, wav_path, start_ratio, end_ratio, width, height):
+        # PhotoImage do trecho [start_ratio, end_ratio] do clip no tamanho pedido, ou None se não há áudio
+        width, height = int(width), int(height)
+        if width <= 0 or height <= 0: return None
+        try: mtime = os.stat(wav_path).st_mtime_ns
+        except OSError: return None
+        key = (os.path.abspath(wav_path), mtime, round(start_ratio, 6), round(end_ratio, 6), width, height)
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key); self.hits += 1
+            return image
+        self.misses += 1
+        pyramid = get_peaks(wav_path)
+        if pyramid is None: return None
+        image = ImageTk.PhotoImage(render_waveform_image(pyramid, start_ratio, end_ratio, width, height))
+        # Quem está exibindo guarda a própria referência, então sair do cache não apaga a imagem da tela
+        if width * height <= self.max_pixels:
+            self._images[key] = image; self._pixels += width * height
+            self._evict()
+        return image
+
+    def _evict(self):
+        while self._images and self._pixels > self.max_pixels:
+            key, _ = self._images.popitem(last=False)
+            self._pixels -= key[4] * key[5]
+
+    def clear(self): self._images.clear(); self._pixels = 0
+
+    def cached_pixels(self): return self._pixels
+
+
+# Instância única compartilhada pelas visões de sessão e arranjo
+waveform_bitmaps = WaveformBitmapCache()